@@ -2,7 +2,9 @@
 
 import time
 from utils.result import create_result
-from utils.parallel import run_tasks_parallel
+from utils.scheduler import run_task_graph
+from utils.cache import TaskCache
+from utils.background import collect_background_results, get_budget_ms, spawn_background
 from tasks.config import migration_cleanup, init_config, ensure_commit_policy, get_context_files
 from tasks.session import check_crash, mark_active, acquire_session_lock, release_session_lock
 from tasks.version import check_update
@@ -10,20 +12,48 @@ from tasks.security import cleanup_dialogs, export_dialogs
 from tasks.hooks import install_git_hooks
 
 
-def run_cold_start():
+COLD_START_TASKS = [
+    init_config,
+    acquire_session_lock,
+    check_crash,
+    migration_cleanup,
+    check_update,
+    cleanup_dialogs,
+    export_dialogs,
+    ensure_commit_policy,
+    install_git_hooks,
+    mark_active,
+]
+
+
+def run_cold_start(use_cache=True):
     """Run cold start protocol.
 
-    Executes all 10 tasks in parallel and returns structured result.
+    Runs the cold-start tasks through the dependency scheduler (see each
+    task's @declare_task) and returns structured result. The lock gates the
+    crash check, which gates everything that touches session state.
+
+    With FRAMEWORK_COLDSTART_BUDGET_MS set, deferrable tasks still running
+    when the budget expires are reported as "deferred" and finished by a
+    background worker; the next cold-start or completion reports them.
+
+    Args:
+        use_cache: Replay cached results of tasks whose inputs are unchanged
+            (see utils.cache); False runs every task
 
     Returns:
-        dict: Result with status, tasks, and timing info
+        dict: Result with status, tasks, schedule and timing info
     """
     start_time = time.time()
 
-    # Init/normalize config first so downstream tasks read consistent defaults.
-    config_result = init_config()
-    lock_result = acquire_session_lock()
-    task_results = [config_result, lock_result]
+    background = collect_background_results()
+    cache = TaskCache(read=use_cache)
+    task_results, schedule = run_task_graph(COLD_START_TASKS, budget_ms=get_budget_ms(), cache=cache)
+    cache.save()
+    if schedule["deferred"]:
+        schedule["background_pid"] = spawn_background("cold-start", schedule["deferred"])
+    by_name = {r.get("name"): r for r in task_results}
+    lock_result = by_name["session_lock"]
 
     if lock_result.get("status") == "needs_input":
         result_str = lock_result.get("result", "")
@@ -36,6 +66,9 @@ def run_cold_start():
             status="needs_input",
             command="cold-start",
             tasks=task_results,
+            schedule=schedule,
+            background=background,
+            cache=cache.stats(),
             data={
                 "reason": "session_locked",
                 "locked_by": locked_by,
@@ -59,12 +92,15 @@ def run_cold_start():
                 "task": lock_result.get("name"),
                 "message": lock_result.get("error", "Unknown error")
             }],
-            duration_ms=duration_ms
+            duration_ms=duration_ms,
+            schedule=schedule,
+            background=background,
+            cache=cache.stats()
         )
 
-    # Crash check must run before mark_active to avoid race in session status.
-    crash_result = check_crash()
-    task_results.append(crash_result)
+    # Crash check runs before mark_active (declared dependency) to avoid a
+    # race in session status; on needs_input nothing after it has run.
+    crash_result = by_name.get("crash_detection")
 
     if crash_result and crash_result.get("status") == "needs_input":
         # Extract file count from result
@@ -78,6 +114,9 @@ def run_cold_start():
             status="needs_input",
             command="cold-start",
             tasks=task_results,
+            schedule=schedule,
+            background=background,
+            cache=cache.stats(),
             data={
                 "reason": "crash_detected",
                 "uncommitted_files": file_count,
@@ -85,19 +124,6 @@ def run_cold_start():
             }
         )
 
-    # Define tasks safe to run in parallel after crash-check phase.
-    tasks = [
-        migration_cleanup,      # Task 1
-        check_update,          # Task 2
-        cleanup_dialogs,       # Task 3
-        export_dialogs,        # Task 4
-        ensure_commit_policy,  # Task 5
-        install_git_hooks,     # Task 6
-    ]
-
-    task_results.extend(run_tasks_parallel(tasks))
-    task_results.append(mark_active())
-
     # Check for errors
     errors = [
         {
@@ -136,12 +162,18 @@ def run_cold_start():
             command="cold-start",
             tasks=task_results,
             errors=errors,
-            duration_ms=duration_ms
+            duration_ms=duration_ms,
+            schedule=schedule,
+            background=background,
+            cache=cache.stats()
         )
 
     return create_result(
         status="success",
         command="cold-start",
         tasks=task_results,
-        duration_ms=duration_ms
+        duration_ms=duration_ms,
+        schedule=schedule,
+        background=background,
+        cache=cache.stats()
     )
@@ -1,45 +1,54 @@
 """Completion command implementation."""
 
 import time
+from functools import partial
 from utils.result import create_result
-from utils.parallel import run_tasks_parallel
+from utils.scheduler import run_task_graph
+from utils.cache import TaskCache
+from utils.background import collect_background_results
 from tasks.git import check_git_status, get_git_diff
 from tasks.security import cleanup_dialogs, export_dialogs
 from tasks.config import init_config, ensure_project_baseline
 from tasks.session import mark_clean_task, release_session_lock
 
 
-def run_completion():
+def run_completion(use_cache=True):
     """Run completion protocol.
 
-    Executes completion tasks and returns structured result.
+    Runs the completion tasks through the dependency scheduler and returns
+    structured result.
+
+    Args:
+        use_cache: Replay cached results of tasks whose inputs are unchanged
+            (see utils.cache); False runs every task
 
     Returns:
-        dict: Result with status, tasks, and timing info
+        dict: Result with status, tasks, schedule and timing info
     """
     start_time = time.time()
 
-    # Normalize config and refresh only existing baseline files.
-    # Missing baseline files must be created during migration/upgrade flows.
-    bootstrap_results = [
-        init_config(),
-        ensure_project_baseline(create_missing=False),
-    ]
+    # Report what the background worker of the last cold-start finished.
+    background = collect_background_results()
 
-    # Define tasks to run in parallel
     tasks = [
-        cleanup_dialogs,     # Security cleanup
-        export_dialogs,      # Dialog export
-        check_git_status,    # Git status
-        get_git_diff         # Git diff
+        init_config,
+        # Refresh only existing baseline files; missing ones are created
+        # during migration/upgrade flows.
+        partial(ensure_project_baseline, create_missing=False),
+        cleanup_dialogs,
+        export_dialogs,
+        check_git_status,
+        get_git_diff,
+        mark_clean_task,
+        release_session_lock,
     ]
-
-    # Run all tasks in parallel
-    task_results = bootstrap_results + run_tasks_parallel(tasks)
-
-    # Finalize session state and release ownership lock.
-    task_results.append(mark_clean_task())
-    task_results.append(release_session_lock())
+    # The session is marked clean (then the lock released) only after every
+    # other completion task has finished.
+    work = ["init_config", "ensure_project_baseline", "cleanup_dialogs", "export_dialogs",
+            "check_git_status", "get_git_diff"]
+    cache = TaskCache(read=use_cache)
+    task_results, schedule = run_task_graph(tasks, after={"mark_clean_task": work}, cache=cache)
+    cache.save()
 
     # Check for errors
     errors = [
@@ -62,12 +71,18 @@ def run_completion():
             command="completion",
             tasks=task_results,
             errors=errors,
-            duration_ms=duration_ms
+            duration_ms=duration_ms,
+            schedule=schedule,
+            background=background,
+            cache=cache.stats()
         )
 
     return create_result(
         status="success",
         command="completion",
         tasks=task_results,
-        duration_ms=duration_ms
+        duration_ms=duration_ms,
+        schedule=schedule,
+        background=background,
+        cache=cache.stats()
     )
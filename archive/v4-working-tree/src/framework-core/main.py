@@ -3,8 +3,9 @@
 Framework Core - CLI entry point
 
 Usage:
-    python3 main.py cold-start
-    python3 main.py completion
+    python3 main.py cold-start [--no-cache]
+    python3 main.py completion [--no-cache]
+    python3 main.py background <command> <task>...   (spawned by cold-start)
     python3 main.py --version
 """
 
@@ -14,8 +15,10 @@ import argparse
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from commands.cold_start import run_cold_start
+from commands.cold_start import run_cold_start, COLD_START_TASKS
 from commands.completion import run_completion
+from utils.background import run_background
+from utils.scheduler import task_name
 from utils.result import print_result
 from utils.logger import setup_logging
 
@@ -31,10 +34,19 @@ def main():
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Cold start command
-    subparsers.add_parser("cold-start", help="Run cold start protocol")
+    cold_start = subparsers.add_parser("cold-start", help="Run cold start protocol")
 
     # Completion command
-    subparsers.add_parser("completion", help="Run completion protocol")
+    completion = subparsers.add_parser("completion", help="Run completion protocol")
+
+    for command in (cold_start, completion):
+        command.add_argument("--no-cache", action="store_true",
+                             help="Run every task instead of replaying cached results")
+
+    # Background worker for tasks deferred past the cold-start budget
+    background = subparsers.add_parser("background", help="Run deferred tasks (internal)")
+    background.add_argument("origin", help="Command that deferred the tasks")
+    background.add_argument("tasks", nargs="+", help="Task function names")
 
     args = parser.parse_args()
 
@@ -45,12 +57,17 @@ def main():
     # Setup logging
     setup_logging(args.command)
 
+    if args.command == "background":
+        registry = {task_name(task): task for task in COLD_START_TASKS}
+        run_background(args.origin, args.tasks, registry)
+        sys.exit(0)
+
     # Execute command
     try:
         if args.command == "cold-start":
-            result = run_cold_start()
+            result = run_cold_start(use_cache=not args.no_cache)
         elif args.command == "completion":
-            result = run_completion()
+            result = run_completion(use_cache=not args.no_cache)
         else:
             print_result({
                 "status": "error",
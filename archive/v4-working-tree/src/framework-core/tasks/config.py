@@ -2,10 +2,11 @@
 
 import json
 import os
-import subprocess
 from datetime import datetime
 from pathlib import Path
 from utils.parallel import time_task
+from utils.git_snapshot import git_snapshot
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
@@ -118,14 +119,7 @@ def _read_text(path: Path, max_chars: int = 140000) -> str:
 
 def _detect_branch(root: Path) -> str:
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-            cwd=root,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        value = result.stdout.strip()
+        value = git_snapshot().status().branch
         if value:
             return value
     except Exception:
@@ -306,6 +300,7 @@ def _extract_items(doc_texts: list) -> tuple:
     return task_items[:18], roadmap_items[:18], idea_items[:18], headings[:18]
 
 
+@declare_task(after=["check_crash"], writes=["CLAUDE.md"], inputs=["file:.claude/CLAUDE.production.md"])
 @time_task
 def migration_cleanup():
     """Check and cleanup migration files."""
@@ -326,6 +321,10 @@ def migration_cleanup():
         return create_task_result("migration_cleanup", "error", "", error=str(e))
 
 
+@declare_task(
+    writes=[".claude/.framework-config"],
+    inputs=["file:.claude/.framework-config", "env:FRAMEWORK_PROJECT_TYPE"],
+)
 @time_task
 def init_config():
     """Initialize or normalize .framework-config."""
@@ -379,6 +378,7 @@ def init_config():
         return create_task_result("config_init", "error", "", error=str(e))
 
 
+@declare_task(after=["check_crash"], writes=[".claude/COMMIT_POLICY.md"], inputs=["file:.claude/COMMIT_POLICY.md"])
 @time_task
 def ensure_commit_policy():
     """Ensure COMMIT_POLICY.md exists."""
@@ -426,6 +426,10 @@ def ensure_commit_policy():
         return create_task_result("commit_policy", "error", "", error=str(e))
 
 
+# No cache inputs: the files it generates draw on docs, the branch and the
+# stack found by scanning the project, which costs as much to fingerprint as
+# running the task.
+@declare_task(after=["init_config"], writes=[".gitignore", "CHANGELOG.md", "project-state"], needs_git=True)
 @time_task
 def ensure_project_baseline(create_missing: bool = True):
     """Refresh project baseline files.
@@ -452,6 +456,9 @@ def ensure_project_baseline(create_missing: bool = True):
             "*.key",
             ".claude/.last_session",
             ".claude/.session-owner",
+            ".claude/.task-cache",
+            ".claude/.background-results.json",
+            ".claude/.locks/",
             ".claude/logs/",
             "reports/",
         ]
@@ -685,6 +692,10 @@ def ensure_project_baseline(create_missing: bool = True):
                 path.write_text(content, encoding="utf-8")
                 updated.append(rel)
 
+        if created or updated:
+            # Later tasks (git status/diff) must see the files written here.
+            git_snapshot().invalidate()
+
         return create_task_result(
             "project_baseline",
             "success",
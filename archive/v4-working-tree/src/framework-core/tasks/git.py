@@ -1,28 +1,12 @@
 """Git operations tasks."""
 
-import subprocess
 from utils.parallel import time_task
+from utils.git_snapshot import git_snapshot
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
-def _run_git(args):
-    return subprocess.run(
-        ["git", *args],
-        capture_output=True,
-        text=True,
-        check=False
-    )
-
-
-def _is_not_git_repo(stderr: str) -> bool:
-    return "not a git repository" in (stderr or "").lower()
-
-
-def _is_unborn_head(stderr: str) -> bool:
-    text = (stderr or "").lower()
-    return "ambiguous argument 'head'" in text or "bad revision 'head'" in text
-
-
+@declare_task(after=["ensure_project_baseline"], needs_git=True)
 @time_task
 def check_git_status():
     """Check git status for uncommitted changes.
@@ -31,23 +15,15 @@ def check_git_status():
         dict: Task result with file counts
     """
     try:
-        result = _run_git(["status", "--short"])
-        if result.returncode != 0:
-            if _is_not_git_repo(result.stderr):
-                return create_task_result(
-                    "git_status",
-                    "success",
-                    "STATUS:skipped:not_git_repo"
-                )
+        status = git_snapshot().status()
+        if not status.is_repo:
             return create_task_result(
                 "git_status",
-                "error",
-                "",
-                error=(result.stderr.strip() or f"git status failed with code {result.returncode}")
+                "success",
+                "STATUS:skipped:not_git_repo"
             )
 
-        files = result.stdout.strip().split("\n") if result.stdout.strip() else []
-        file_count = len(files)
+        file_count = len(status.entries)
 
         return create_task_result(
             "git_status",
@@ -59,36 +35,32 @@ def check_git_status():
         return create_task_result("git_status", "error", "", error=str(e))
 
 
+@declare_task(after=["ensure_project_baseline"], needs_git=True)
 @time_task
 def get_git_diff():
-    """Get git diff for all changes.
+    """Count changed lines in tracked files since HEAD.
 
     Returns:
-        dict: Task result with diff
+        dict: Task result with the number of added plus deleted lines
     """
     try:
-        result = _run_git(["diff", "HEAD"])
-        if result.returncode != 0:
-            if _is_not_git_repo(result.stderr):
-                return create_task_result(
-                    "git_diff",
-                    "success",
-                    "DIFF:skipped:not_git_repo"
-                )
-            if _is_unborn_head(result.stderr):
-                return create_task_result(
-                    "git_diff",
-                    "success",
-                    "DIFF:0 lines (no commits yet)"
-                )
+        snapshot = git_snapshot()
+        status = snapshot.status()
+        if not status.is_repo:
+            return create_task_result(
+                "git_diff",
+                "success",
+                "DIFF:skipped:not_git_repo"
+            )
+        if status.oid is None:
             return create_task_result(
                 "git_diff",
-                "error",
-                "",
-                error=(result.stderr.strip() or f"git diff failed with code {result.returncode}")
+                "success",
+                "DIFF:0 lines (no commits yet)"
             )
 
-        lines = len(result.stdout.split("\n")) if result.stdout else 0
+        diff = snapshot.diff_stat()
+        lines = diff.added + diff.deleted
 
         return create_task_result(
             "git_diff",
@@ -3,9 +3,14 @@
 import subprocess
 from pathlib import Path
 from utils.parallel import time_task
+from utils.processes import run_command
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
+@declare_task(after=["check_crash"], writes=[".git/hooks"], needs_git=True, timeout=60,
+              deferrable=True, restartable=True,
+              inputs=["hash:.claude/scripts/install-git-hooks.sh", "tree:.git/hooks"])
 @time_task
 def install_git_hooks():
     """Install git hooks silently.
@@ -20,11 +25,7 @@ def install_git_hooks():
             return create_task_result("git_hooks", "success", "HOOKS:skipped")
 
         # Run installation script
-        subprocess.run(
-            ["bash", str(hook_script)],
-            capture_output=True,
-            check=True
-        )
+        run_command(["bash", str(hook_script)], check=True, text=False)
 
         return create_task_result("git_hooks", "success", "HOOKS:done")
 
@@ -3,10 +3,14 @@
 import logging
 import subprocess
 from pathlib import Path
+from utils.locks import file_lock
 from utils.parallel import time_task
+from utils.processes import run_command
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
+@declare_task(after=["init_config", "check_crash"], writes=["dialog/"], timeout=120)
 @time_task
 def cleanup_dialogs():
     """Run security cleanup on dialog files.
@@ -34,12 +38,9 @@ def cleanup_dialogs():
         if not cleanup_script.exists():
             return create_task_result("security_cleanup", "success", "SECURITY:skipped:script_missing")
 
-        # Run cleanup script
-        result = subprocess.run(
-            ["bash", str(cleanup_script), "--last"],
-            capture_output=True,
-            text=True
-        )
+        # Run cleanup script (the background worker may be exporting)
+        with file_lock("dialog"):
+            result = run_command(["bash", str(cleanup_script), "--last"])
 
         if "Credentials detected and redacted" in result.stdout or "credential pattern(s) redacted" in result.stdout:
             # Extract count from "Total redactions: N" in summary
@@ -58,6 +59,8 @@ def cleanup_dialogs():
         return create_task_result("security_cleanup", "error", "", error=str(e))
 
 
+@declare_task(after=["init_config", "check_crash"], writes=["dialog/"], timeout=120,
+              deferrable=True)
 @time_task
 def export_dialogs():
     """Export dialogs using npm script.
@@ -80,12 +83,9 @@ def export_dialogs():
         if not dialog_enabled:
             return create_task_result("dialog_export", "success", "EXPORT:skipped:disabled")
 
-        # Run npm export
-        subprocess.run(
-            ["npm", "run", "dialog:export", "--no-html"],
-            capture_output=True,
-            check=True
-        )
+        # Run npm export (cold-start and its background worker may overlap)
+        with file_lock("dialog"):
+            run_command(["npm", "run", "dialog:export", "--no-html"], check=True, text=False)
 
         return create_task_result("dialog_export", "success", "EXPORT:done")
 
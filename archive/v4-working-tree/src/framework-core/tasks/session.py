@@ -2,10 +2,11 @@
 
 import json
 import os
-import subprocess
 from datetime import datetime, timezone
 from pathlib import Path
 from utils.parallel import time_task
+from utils.git_snapshot import git_snapshot, has_staged, has_unstaged
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
@@ -112,6 +113,7 @@ def _write_lock(agent_name: str, owner_pid: int):
         json.dump(payload, f, indent=2)
 
 
+@declare_task(writes=[".claude/.session-owner"], critical=True)
 @time_task
 def acquire_session_lock():
     """Acquire shared session lock for current agent."""
@@ -147,6 +149,7 @@ def acquire_session_lock():
         return create_task_result("session_lock", "error", "", error=str(e))
 
 
+@declare_task(after=["mark_clean_task"], writes=[".claude/.session-owner"])
 @time_task
 def release_session_lock():
     """Release shared session lock for current agent when ownership allows."""
@@ -176,6 +179,7 @@ def release_session_lock():
         return create_task_result("session_lock_release", "error", "", error=str(e))
 
 
+@declare_task(writes=[".claude/.last_session"])
 @time_task
 def mark_clean_task():
     """Mark session as clean and return task-style result."""
@@ -186,6 +190,7 @@ def mark_clean_task():
         return create_task_result("mark_clean", "error", "", error=str(e))
 
 
+@declare_task(after=["acquire_session_lock"], writes=[".claude/.last_session"], needs_git=True)
 @time_task
 def check_crash():
     """Check if previous session crashed with uncommitted changes.
@@ -209,42 +214,19 @@ def check_crash():
             return create_task_result("crash_detection", "success", "CRASH:none")
 
         # Non-git folders cannot have tracked uncommitted changes for crash recovery.
-        repo_check = subprocess.run(
-            ["git", "rev-parse", "--is-inside-work-tree"],
-            capture_output=True,
-            text=True
-        )
-        if repo_check.returncode != 0:
+        status = git_snapshot().status()
+        if not status.is_repo:
             mark_clean()
             return create_task_result("crash_detection", "success", "CRASH:recovered_auto")
 
         # Check for uncommitted changes
-        result = subprocess.run(
-            ["git", "diff", "--quiet"],
-            capture_output=True
-        )
-
-        has_unstaged = result.returncode != 0
-
-        result = subprocess.run(
-            ["git", "diff", "--staged", "--quiet"],
-            capture_output=True
-        )
-
-        has_staged = result.returncode != 0
-
-        if not has_unstaged and not has_staged:
+        if not has_unstaged(status) and not has_staged(status):
             # Auto-recovery: no uncommitted changes
             mark_clean()
             return create_task_result("crash_detection", "success", "CRASH:recovered_auto")
 
         # True crash with uncommitted changes
-        result = subprocess.run(
-            ["git", "status", "--short"],
-            capture_output=True,
-            text=True
-        )
-        file_count = len(result.stdout.strip().split("\n")) if result.stdout.strip() else 0
+        file_count = len(status.entries)
 
         return create_task_result(
             "crash_detection",
@@ -268,6 +250,7 @@ def mark_clean():
         }, f, indent=2)
 
 
+@declare_task(after=["check_crash"], writes=[".claude/.last_session"])
 @time_task
 def mark_active():
     """Mark session as active.
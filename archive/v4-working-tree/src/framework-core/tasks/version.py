@@ -4,9 +4,13 @@ import re
 import subprocess
 from pathlib import Path
 from utils.parallel import time_task
+from utils.processes import run_command
+from utils.scheduler import declare_task
 from utils.result import create_task_result
 
 
+@declare_task(after=["check_crash", "migration_cleanup"], reads=["CLAUDE.md"], timeout=15,
+              deferrable=True, restartable=True)
 @time_task
 def check_update():
     """Check for framework updates on GitHub.
@@ -32,10 +36,8 @@ def check_update():
 
         # Get latest version from GitHub
         try:
-            result = subprocess.run(
+            result = run_command(
                 ["curl", "-s", "https://api.github.com/repos/alexeykrol/claude-code-starter/releases/latest"],
-                capture_output=True,
-                text=True,
                 timeout=5
             )
 
@@ -0,0 +1,171 @@
+"""Background worker for tasks deferred past the cold-start latency budget.
+
+Cold-start hands deferred tasks to a detached `main.py background` process
+(see spawn_background). The worker runs them and writes their results to
+.claude/.background-results.json; the next cold-start or completion picks
+that file up (collect_background_results) and reports it.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from utils.locks import file_lock
+from utils.scheduler import run_task_graph
+
+
+BACKGROUND_RESULTS_FILE = Path(".claude/.background-results.json")
+MAIN_SCRIPT = Path(__file__).resolve().parent.parent / "main.py"
+LOCK_TIMEOUT_S = 10
+
+
+def get_budget_ms():
+    """Cold-start latency budget from FRAMEWORK_COLDSTART_BUDGET_MS, or None."""
+    raw = os.environ.get("FRAMEWORK_COLDSTART_BUDGET_MS", "").strip()
+    if raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    return None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _write_state(state):
+    BACKGROUND_RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = BACKGROUND_RESULTS_FILE.with_name(BACKGROUND_RESULTS_FILE.name + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, BACKGROUND_RESULTS_FILE)
+
+
+def _read_state():
+    try:
+        with open(BACKGROUND_RESULTS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+
+def _pid_is_alive(pid):
+    try:
+        pid = int(pid)
+        if pid <= 0:
+            return False
+        os.kill(pid, 0)
+        return True
+    except Exception:
+        return False
+
+
+def _worker_running(state):
+    return bool(state) and state.get("status") == "running" and _pid_is_alive(state.get("pid"))
+
+
+def background_running():
+    """Whether a background worker from an earlier run is still going."""
+    return _worker_running(_read_state())
+
+
+def spawn_background(command, names):
+    """Hand tasks to the background worker, starting one if none is running.
+
+    A running worker takes the names onto its queue and runs them after its
+    current batch, so nothing deferred is dropped. Results of a finished
+    worker nobody has collected yet are kept for the next report.
+
+    Args:
+        command: Command that deferred them (e.g. "cold-start")
+        names: Task function names
+
+    Returns:
+        int: Pid of the worker that will run them, or None without names
+    """
+    if not names:
+        return None
+    with file_lock("background", timeout=LOCK_TIMEOUT_S):
+        state = _read_state()
+        if _worker_running(state):
+            queued = state.get("queued", [])
+            state["queued"] = queued + [name for name in names if name not in queued]
+            _write_state(state)
+            return state["pid"]
+        proc = subprocess.Popen(
+            [sys.executable, str(MAIN_SCRIPT), "background", command, *names],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            close_fds=True,
+        )
+        # Written here rather than by the worker, so a second cold-start
+        # right after this one finds it running.
+        _write_state({
+            "status": "running",
+            "command": command,
+            "pid": proc.pid,
+            "started": _now(),
+            "tasks": state.get("tasks", []) if state else [],
+            "queued": [],
+        })
+        return proc.pid
+
+
+def run_background(command, names, registry):
+    """Worker body: run the named tasks, then whatever was queued meanwhile.
+
+    Args:
+        command: Command that deferred them
+        names: Task function names
+        registry: Task name -> task callable
+    """
+    while names:
+        try:
+            results, _ = run_task_graph([registry[name] for name in names if name in registry])
+            error = None
+        except Exception as e:
+            results, error = [], str(e)
+        with file_lock("background", timeout=LOCK_TIMEOUT_S):
+            state = _read_state() or {"command": command, "pid": os.getpid(), "started": _now()}
+            state["tasks"] = state.get("tasks", []) + results
+            names = [] if error else state.get("queued", [])
+            state["queued"] = []
+            if not names:
+                state["status"] = "error" if error else "done"
+                if error:
+                    state["error"] = error
+                state["finished"] = _now()
+            _write_state(state)
+
+
+def collect_background_results():
+    """Results of the last background worker, if any, for the result JSON.
+
+    A finished (or dead) worker's file is consumed, so each result is
+    reported once; a running worker is reported as such and left alone.
+    A dead worker's queued tasks are reported as never run.
+
+    Returns:
+        dict: {"status", "command", "tasks", ...}, or None
+    """
+    try:
+        with file_lock("background", timeout=LOCK_TIMEOUT_S):
+            state = _read_state()
+            if state is None:
+                return None
+            if state.get("status") == "running":
+                if _pid_is_alive(state.get("pid")):
+                    return {
+                        "status": "running",
+                        "command": state.get("command"),
+                        "started": state.get("started"),
+                        "queued": state.get("queued", []),
+                    }
+                state["status"] = "lost"
+            BACKGROUND_RESULTS_FILE.unlink(missing_ok=True)
+            return state
+    except TimeoutError:
+        return None
@@ -0,0 +1,190 @@
+"""Task result cache keyed by input fingerprints.
+
+Idempotent tasks declare what their outcome depends on with
+`@declare_task(inputs=[...])`:
+
+- "file:<path>"   the file's mtime and size (or its absence)
+- "hash:<path>"   the file's content hash (or its absence)
+- "tree:<dir>"    names and content hashes of the files in a directory
+- "env:<NAME>"    an environment variable
+- "config:<key>"  a (dotted) key of .claude/.framework-config
+
+The task's own module is always an input, so a framework update invalidates
+its entries. A result is only stored when the task left its inputs as it
+found them: replaying it is then exactly what running the task again would
+return. Entries live in .claude/.task-cache.
+
+Inputs must cover everything the result depends on. A task whose outcome
+rests on scanning the project (ensure_project_baseline) declares none and
+always runs.
+"""
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from utils.scheduler import task_name, task_spec
+
+
+CACHE_FILE = Path(".claude/.task-cache")
+CONFIG_FILE = Path(".claude/.framework-config")
+CACHE_VERSION = 1
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def _hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _tree(path):
+    try:
+        entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+    except OSError:
+        return None
+    digest = hashlib.sha256()
+    for entry in entries:
+        if entry.is_file():
+            digest.update(f"{entry.name}\0{_hash(entry.path)}\0".encode())
+    return digest.hexdigest()
+
+
+def _config_value(key):
+    try:
+        value = json.loads(CONFIG_FILE.read_text(encoding="utf-8"))
+        for part in key.split("."):
+            value = value[part]
+        return value
+    except Exception:
+        return None
+
+
+_READERS = {
+    "file": _stat,
+    "hash": _hash,
+    "tree": _tree,
+    "env": os.environ.get,
+    "config": _config_value,
+}
+
+
+def _entry_key(task):
+    """Task name plus the arguments bound by functools.partial."""
+    name = task_name(task)
+    args = [repr(arg) for arg in getattr(task, "args", ())]
+    args += [f"{key}={value!r}" for key, value in sorted(getattr(task, "keywords", {}).items())]
+    return f"{name}({', '.join(args)})" if args else name
+
+
+def _module_file(task):
+    func = getattr(task, "func", task)
+    module = sys.modules.get(getattr(func, "__module__", ""))
+    return getattr(module, "__file__", None)
+
+
+class TaskCache:
+    """Cached results of tasks that declare inputs.
+
+    Args:
+        path: Cache file
+        read: Whether to replay stored results; with False (--no-cache)
+            every task runs, but fresh results are still recorded
+    """
+
+    def __init__(self, path=CACHE_FILE, read=True):
+        self.path = Path(path)
+        self.read = read
+        self.hits = 0
+        self.misses = 0
+        self._entries = self._load()
+        self._dirty = False
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return {}
+        entries = data.get("entries")
+        return entries if isinstance(entries, dict) else {}
+
+    def fingerprint(self, task):
+        """Current values of the task's inputs, or None if it declares none.
+
+        Returns:
+            dict: Input spec -> value
+        """
+        inputs = task_spec(task).inputs
+        if not inputs:
+            return None
+        values = {"module": _stat(_module_file(task))}
+        for spec in inputs:
+            kind, _, arg = spec.partition(":")
+            values[spec] = _READERS[kind](arg)
+        return values
+
+    def lookup(self, task, fingerprint):
+        """Stored result for `task` if its inputs are unchanged, else None.
+
+        Counts a hit or a miss for every task that declares inputs.
+        """
+        if fingerprint is None:
+            return None
+        entry = self._entries.get(_entry_key(task)) if self.read else None
+        if entry is None or entry.get("inputs") != fingerprint:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = dict(entry["result"], cached=True)
+        result.pop("duration_ms", None)
+        return result
+
+    def record(self, task, before, result):
+        """Store `result` if the run left the task's inputs unchanged.
+
+        Args:
+            task: Task callable
+            before: Its fingerprint taken right before it ran
+            result: Its result
+        """
+        if before is None or not isinstance(result, dict):
+            return
+        key = _entry_key(task)
+        if result.get("status") != "success" or result.get("deadline_exceeded"):
+            self._dirty |= self._entries.pop(key, None) is not None
+            return
+        if self.fingerprint(task) != before:
+            self._dirty |= self._entries.pop(key, None) is not None
+            return
+        self._entries[key] = {"inputs": before, "result": result}
+        self._dirty = True
+
+    def save(self):
+        """Write the cache file if anything changed."""
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": CACHE_VERSION, "entries": self._entries}, indent=2),
+                           encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            pass
+
+    def stats(self):
+        """Hit/miss counts for the result JSON."""
+        return {"enabled": self.read, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,200 @@
+"""Shared, lazily computed view of the git worktree.
+
+Crash detection, the git status/diff tasks and the baseline's branch lookup
+used to run their own git commands, each re-scanning the worktree. They now
+share one GitSnapshot per invocation (`git_snapshot()`): a single
+`git status --porcelain=v2 --branch -z`, plus one `git diff HEAD --numstat`
+for the first caller that needs line counts. Both are computed on first use,
+once, even when several tasks ask at the same time.
+
+A task that changes tracked files calls `invalidate()` so later tasks see
+the new state.
+"""
+
+import threading
+from collections import namedtuple
+from utils.processes import run_command
+
+
+GIT_TIMEOUT_S = 60
+
+# index/worktree use porcelain v2 codes: "." unmodified, "M", "A", "D", "R"...
+GitEntry = namedtuple("GitEntry", ["kind", "path", "index", "worktree", "orig_path"])
+GitStatus = namedtuple(
+    "GitStatus", ["is_repo", "branch", "oid", "upstream", "ahead", "behind", "entries"]
+)
+DiffStat = namedtuple("DiffStat", ["files", "added", "deleted"])
+
+NOT_A_REPO = GitStatus(False, None, None, None, 0, 0, ())
+EMPTY_DIFF = DiffStat(0, 0, 0)
+
+# Fields before the path in each porcelain v2 record type.
+_FIELDS_BEFORE_PATH = {"1": 8, "2": 9, "u": 10}
+_KINDS = {"1": "changed", "2": "renamed", "u": "unmerged", "?": "untracked", "!": "ignored"}
+
+
+def _is_not_git_repo(stderr):
+    return "not a git repository" in (stderr or "").lower()
+
+
+def parse_status(output):
+    """Parse `git status --porcelain=v2 --branch -z` output.
+
+    Args:
+        output: Raw command output
+
+    Returns:
+        GitStatus
+    """
+    headers = {}
+    entries = []
+    records = output.split("\0")
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            headers[key] = value
+            continue
+        kind = record[0]
+        if kind in ("?", "!"):
+            entries.append(GitEntry(_KINDS[kind], record[2:], kind, kind, None))
+            continue
+        if kind not in _FIELDS_BEFORE_PATH:
+            continue
+        fields = record.split(" ", _FIELDS_BEFORE_PATH[kind])
+        orig_path = None
+        if kind == "2":
+            orig_path = records[i] if i < len(records) else None
+            i += 1
+        xy = fields[1]
+        entries.append(GitEntry(_KINDS[kind], fields[-1], xy[0], xy[1], orig_path))
+
+    oid = headers.get("branch.oid")
+    branch = headers.get("branch.head")
+    ahead = behind = 0
+    ab = headers.get("branch.ab", "").split()
+    if len(ab) == 2:
+        ahead, behind = int(ab[0]), -int(ab[1])
+    return GitStatus(
+        True,
+        "HEAD" if branch == "(detached)" else branch,
+        None if oid == "(initial)" else oid,
+        headers.get("branch.upstream"),
+        ahead,
+        behind,
+        tuple(entries),
+    )
+
+
+def parse_numstat(output):
+    """Parse `git diff --numstat -z` output (binary files count 0 lines).
+
+    Args:
+        output: Raw command output
+
+    Returns:
+        DiffStat
+    """
+    records = output.split("\0")
+    files = added = deleted = 0
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if not record:
+            continue
+        plus, minus, path = record.split("\t", 2)
+        if not path:
+            i += 2  # rename: old and new path follow as their own records
+        files += 1
+        added += int(plus) if plus.isdigit() else 0
+        deleted += int(minus) if minus.isdigit() else 0
+    return DiffStat(files, added, deleted)
+
+
+class GitSnapshot:
+    """Worktree status and diff stats, computed once on first use.
+
+    Failed commands are not remembered; the next caller tries again.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._status = None
+        self._diff = None
+
+    def status(self):
+        """Branch and changed paths (NOT_A_REPO outside a repository).
+
+        Returns:
+            GitStatus
+
+        Raises:
+            RuntimeError: If git status fails for another reason
+        """
+        with self._lock:
+            if self._status is None:
+                result = run_command(["git", "status", "--porcelain=v2", "--branch", "-z"],
+                                     timeout=GIT_TIMEOUT_S)
+                if result.returncode != 0:
+                    if _is_not_git_repo(result.stderr):
+                        self._status = NOT_A_REPO
+                    else:
+                        raise RuntimeError(result.stderr.strip()
+                                           or f"git status failed with code {result.returncode}")
+                else:
+                    self._status = parse_status(result.stdout)
+            return self._status
+
+    def diff_stat(self):
+        """Lines added/deleted in tracked files relative to HEAD.
+
+        Runs no diff when status shows no tracked changes or no commits yet.
+
+        Returns:
+            DiffStat
+
+        Raises:
+            RuntimeError: If git diff fails
+        """
+        with self._lock:
+            status = self.status()
+            if self._diff is None:
+                tracked = [entry for entry in status.entries if entry.kind not in ("untracked", "ignored")]
+                if not status.is_repo or status.oid is None or not tracked:
+                    self._diff = EMPTY_DIFF
+                else:
+                    result = run_command(["git", "diff", "HEAD", "--numstat", "-z"], timeout=GIT_TIMEOUT_S)
+                    if result.returncode != 0:
+                        raise RuntimeError(result.stderr.strip()
+                                           or f"git diff failed with code {result.returncode}")
+                    self._diff = parse_numstat(result.stdout)
+            return self._diff
+
+    def invalidate(self):
+        """Forget cached results after the worktree was changed."""
+        with self._lock:
+            self._status = None
+            self._diff = None
+
+
+_snapshot = GitSnapshot()
+
+
+def git_snapshot():
+    """The GitSnapshot shared by every task of this invocation."""
+    return _snapshot
+
+
+def has_staged(status):
+    """Whether the index differs from HEAD."""
+    return any(entry.index not in (".", "?", "!") for entry in status.entries)
+
+
+def has_unstaged(status):
+    """Whether tracked files differ from the index."""
+    return any(entry.worktree not in (".", "?", "!") for entry in status.entries)
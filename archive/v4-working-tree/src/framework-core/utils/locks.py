@@ -0,0 +1,49 @@
+"""Cross-process locks on project state.
+
+The scheduler keeps tasks of one invocation from writing the same state at
+once, but the background worker (utils.background) runs tasks in a process
+of its own, next to a later cold-start or completion. Tasks that write
+state both may touch take a file lock named after it.
+"""
+
+import fcntl
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from utils.processes import current_scope
+
+
+LOCK_DIR = Path(".claude/.locks")
+_POLL_S = 0.05
+
+
+@contextmanager
+def file_lock(name, timeout=None):
+    """Hold an exclusive lock on `name` across processes.
+
+    Args:
+        name: Lock name (one file under .claude/.locks)
+        timeout: Seconds to wait; default is what is left of the running
+            task's deadline, or no limit outside a task
+
+    Raises:
+        TimeoutError: If another process holds the lock past the timeout
+    """
+    if timeout is None:
+        scope = current_scope()
+        timeout = scope.remaining() if scope is not None else None
+    deadline = None if timeout is None else time.monotonic() + timeout
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_DIR / f"{name}.lock", "a") as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"'{name}' is locked by another process")
+                time.sleep(_POLL_S)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
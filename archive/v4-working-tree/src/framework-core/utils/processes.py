@@ -0,0 +1,207 @@
+"""Subprocess execution with deadlines, cancellation and bounded output.
+
+Tasks shell out through `run_command`, a drop-in for `subprocess.run` that
+is built on `asyncio.create_subprocess_exec`:
+
+- every child starts in its own session, so a timeout or cancellation kills
+  the whole process group (`npm` and its node children, `bash` scripts and
+  whatever they spawned), not just the direct child;
+- stdout/stderr are drained concurrently and capped at MAX_OUTPUT_BYTES each;
+- at most FRAMEWORK_MAX_PROCESSES children run at once across all tasks.
+
+Each task runs inside a TaskScope carrying its deadline. Commands started by
+the task never outlive it: their timeout is capped at the time left, and
+when the deadline passes the scope kills every process group still running.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+
+
+MAX_OUTPUT_BYTES = 4 * 1024 * 1024
+DEFAULT_TASK_TIMEOUT_S = 120
+_READ_CHUNK = 64 * 1024
+
+
+def _env_int(name, default):
+    raw = os.environ.get(name, "").strip()
+    if raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    return default
+
+
+_process_slots = threading.BoundedSemaphore(_env_int("FRAMEWORK_MAX_PROCESSES", 4))
+_current_scope = contextvars.ContextVar("framework_task_scope", default=None)
+
+
+def default_task_timeout():
+    """Task deadline in seconds (FRAMEWORK_TASK_TIMEOUT_S, default 120)."""
+    return _env_int("FRAMEWORK_TASK_TIMEOUT_S", DEFAULT_TASK_TIMEOUT_S)
+
+
+class TaskScope:
+    """Deadline and live process groups of one running task."""
+
+    def __init__(self, name, timeout=None):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.cancelled = False
+        self._groups = set()
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def add(self, pid):
+        with self._lock:
+            if self.cancelled:
+                _kill_group(pid)
+            self._groups.add(pid)
+
+    def discard(self, pid):
+        with self._lock:
+            self._groups.discard(pid)
+
+    def cancel(self):
+        """Kill every process group the task still has running."""
+        with self._lock:
+            self.cancelled = True
+            groups = list(self._groups)
+        for pid in groups:
+            _kill_group(pid)
+        if groups:
+            logging.warning(f"Task '{self.name}': deadline exceeded, killed {len(groups)} process group(s)")
+
+
+def current_scope():
+    """The TaskScope of the task running in this context, if any."""
+    return _current_scope.get()
+
+
+def _kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _read_bounded(stream, limit):
+    """Read `stream` to EOF, keeping at most `limit` bytes."""
+    kept = bytearray()
+    dropped = 0
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            break
+        room = limit - len(kept)
+        if room > 0:
+            kept += chunk[:room]
+            dropped += max(0, len(chunk) - room)
+        else:
+            dropped += len(chunk)
+    return bytes(kept), dropped
+
+
+async def run_command_async(args, timeout=None, cwd=None, text=True, check=False,
+                            max_output=MAX_OUTPUT_BYTES):
+    """Run a command; same result and exceptions as `subprocess.run`.
+
+    Args:
+        args: Command and arguments
+        timeout: Seconds before the process group is killed (capped by the
+            task deadline)
+        cwd: Working directory
+        text: Decode output as UTF-8
+        check: Raise CalledProcessError on a non-zero exit code
+        max_output: Bytes of stdout and of stderr to keep
+
+    Returns:
+        subprocess.CompletedProcess
+
+    Raises:
+        subprocess.TimeoutExpired: On timeout or task deadline
+        subprocess.CalledProcessError: With check=True, on failure
+    """
+    args = [str(arg) for arg in args]
+    scope = current_scope()
+    if scope is not None:
+        if scope.cancelled:
+            raise subprocess.TimeoutExpired(args, scope.timeout)
+        left = scope.remaining()
+        if left is not None:
+            timeout = left if timeout is None else min(timeout, left)
+
+    proc = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=True,
+    )
+    if scope is not None:
+        scope.add(proc.pid)
+    try:
+        (out, out_dropped), (err, err_dropped), _ = await asyncio.wait_for(
+            asyncio.gather(
+                _read_bounded(proc.stdout, max_output),
+                _read_bounded(proc.stderr, max_output),
+                proc.wait(),
+            ),
+            timeout,
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        _kill_group(proc.pid)
+        await proc.wait()
+        if isinstance(e, asyncio.CancelledError):
+            raise
+        raise subprocess.TimeoutExpired(args, timeout) from None
+    finally:
+        if scope is not None:
+            scope.discard(proc.pid)
+
+    if scope is not None and scope.cancelled:
+        raise subprocess.TimeoutExpired(args, scope.timeout)
+    if out_dropped or err_dropped:
+        logging.warning(f"Command {args[0]}: output truncated ({out_dropped + err_dropped} bytes dropped)")
+    if text:
+        out = out.decode("utf-8", errors="replace")
+        err = err.decode("utf-8", errors="replace")
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args, out, err)
+    return subprocess.CompletedProcess(args, proc.returncode, out, err)
+
+
+def run_command(args, **kwargs):
+    """Blocking `run_command_async` for task code; see there for arguments."""
+    with _process_slots:
+        return asyncio.run(run_command_async(args, **kwargs))
+
+
+def run_in_scope(task, scope):
+    """Call `task` inside `scope` and return its result.
+
+    A timer cancels the scope at its deadline, killing whatever the task is
+    still waiting on so that it returns. Others may cancel it earlier.
+    """
+    timer = threading.Timer(scope.timeout, scope.cancel) if scope.timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        context = contextvars.copy_context()
+        context.run(_current_scope.set, scope)
+        return context.run(task)
+    finally:
+        if timer is not None:
+            timer.cancel()
@@ -5,7 +5,8 @@ import sys
 from datetime import datetime
 
 
-def create_result(status, command, tasks=None, errors=None, warnings=None, data=None, duration_ms=0):
+def create_result(status, command, tasks=None, errors=None, warnings=None, data=None, duration_ms=0,
+                  schedule=None, background=None, cache=None):
     """Create standardized result object.
 
     Args:
@@ -16,6 +17,9 @@ def create_result(status, command, tasks=None, errors=None, warnings=None, data=
         warnings: List of warnings
         data: Additional data (for needs_input)
         duration_ms: Total duration in milliseconds
+        schedule: Scheduler report (critical path, per-task slack)
+        background: Results of tasks deferred to the background by an earlier run
+        cache: Task cache hit/miss counts
 
     Returns:
         dict: Standardized result object
@@ -41,6 +45,15 @@ def create_result(status, command, tasks=None, errors=None, warnings=None, data=
     if duration_ms > 0:
         result["duration_total_ms"] = duration_ms
 
+    if schedule is not None:
+        result["schedule"] = schedule
+
+    if background is not None:
+        result["background"] = background
+
+    if cache is not None:
+        result["cache"] = cache
+
     return result
 
 
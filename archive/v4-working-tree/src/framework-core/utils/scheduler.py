@@ -0,0 +1,353 @@
+"""Dependency-graph task scheduling.
+
+Tasks declare what they need with `@declare_task(...)`: the tasks they must
+run after (by function name), the state files they read and write, and
+whether they look at the git worktree. `run_task_graph` then starts every
+task as soon as its dependencies have finished and no running task holds a
+conflicting resource, so independent tasks overlap as much as the graph
+allows. Dependencies on tasks that are not part of the current run are
+ignored, which lets the same declarations serve cold-start and completion.
+"""
+
+import concurrent.futures
+import time
+from collections import namedtuple
+from utils.logger import log_task
+from utils.processes import TaskScope, default_task_timeout, run_in_scope
+
+
+TaskSpec = namedtuple(
+    "TaskSpec",
+    ["after", "reads", "writes", "needs_git", "critical", "timeout", "deferrable", "restartable",
+     "inputs"],
+)
+
+GIT_RESOURCE = "git"
+_DEFAULT_SPEC = TaskSpec((), (), (), False, False, None, False, False, ())
+
+
+def declare_task(after=(), reads=(), writes=(), needs_git=False, critical=False, timeout=None,
+                 deferrable=False, restartable=False, inputs=()):
+    """Decorator attaching scheduling needs to a task function.
+
+    Args:
+        after: Names of task functions that must finish first
+        reads: State files (or other resource names) the task reads
+        writes: State files the task writes; held exclusively while it runs
+        needs_git: Whether the task reads the git worktree
+        critical: Skip dependents when this task errors, not only when it
+            returns needs_input
+        timeout: Deadline in seconds (default: FRAMEWORK_TASK_TIMEOUT_S)
+        deferrable: May be moved to the background worker when a latency
+            budget runs out (see run_task_graph)
+        restartable: Safe to kill midway and run again from the start, so
+            a deferrable task may be moved even while it runs
+        inputs: What the task's outcome depends on, making its result
+            cacheable (see utils.cache)
+
+    Returns:
+        The decorator
+    """
+    def decorate(func):
+        func.task_spec = TaskSpec(
+            tuple(after), tuple(reads), tuple(writes), needs_git, critical, timeout, deferrable,
+            restartable, tuple(inputs),
+        )
+        return func
+    return decorate
+
+
+def task_name(task):
+    """Function name of a task (unwrapping functools.partial)."""
+    return getattr(task, "__name__", None) or getattr(task, "func").__name__
+
+
+def task_spec(task):
+    """The TaskSpec declared on a task, or an empty one."""
+    spec = getattr(task, "task_spec", None) or getattr(getattr(task, "func", None), "task_spec", None)
+    return spec or _DEFAULT_SPEC
+
+
+def task_scope(task):
+    """A fresh TaskScope with the task's deadline."""
+    return TaskScope(task_name(task), task_spec(task).timeout or default_task_timeout())
+
+
+def run_task(task, scope=None):
+    """Run one task under its deadline (see utils.processes.TaskScope).
+
+    Commands the task is still waiting on at the deadline are killed. The
+    task's own result is kept, flagged with `deadline_exceeded`; if the task
+    raises instead, an error result takes its place.
+
+    Args:
+        task: Task callable
+        scope: TaskScope to run in (default: a new one from task_scope)
+
+    Returns:
+        dict: Task result
+    """
+    name = task_name(task)
+    scope = scope or task_scope(task)
+    try:
+        result = run_in_scope(task, scope)
+    except Exception as e:
+        return {"name": name, "status": "error", "error": str(e)}
+    if scope.cancelled and isinstance(result, dict):
+        result["deadline_exceeded"] = True
+    return result
+
+
+def _resources(spec):
+    reads = set(spec.reads)
+    if spec.needs_git:
+        reads.add(GIT_RESOURCE)
+    return reads, set(spec.writes)
+
+
+def _build_graph(tasks, extra_after):
+    names = [task_name(task) for task in tasks]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate task in graph")
+    present = set(names)
+    deps = {}
+    for name, task in zip(names, tasks):
+        wanted = list(task_spec(task).after) + list(extra_after.get(name, ()))
+        deps[name] = [dep for dep in dict.fromkeys(wanted) if dep in present]
+
+    # Kahn's algorithm, only to reject cycles up front.
+    remaining = {name: len(deps[name]) for name in names}
+    users = {name: [] for name in names}
+    for name in names:
+        for dep in deps[name]:
+            users[dep].append(name)
+    ready = [name for name in names if not remaining[name]]
+    seen = 0
+    while ready:
+        name = ready.pop()
+        seen += 1
+        for user in users[name]:
+            remaining[user] -= 1
+            if not remaining[user]:
+                ready.append(user)
+    if seen != len(names):
+        raise ValueError("task dependencies contain a cycle")
+    return names, deps
+
+
+def _critical_path(names, deps, timings):
+    """Critical path and per-task slack over measured durations.
+
+    Args:
+        names: Task names in declaration order
+        deps: Task name -> names it depends on
+        timings: Task name -> (start_ms, end_ms) for tasks that ran
+
+    Returns:
+        tuple: (critical path names, its length in ms, name -> slack_ms)
+    """
+    ran = [name for name in names if name in timings]
+    duration = {name: timings[name][1] - timings[name][0] for name in ran}
+    order = []  # topological, dependencies first
+    placed = set()
+    while len(order) < len(ran):
+        for name in ran:
+            if name not in placed and all(dep in placed or dep not in timings for dep in deps[name]):
+                order.append(name)
+                placed.add(name)
+
+    finish = {}
+    for name in order:
+        finish[name] = max((finish[dep] for dep in deps[name] if dep in finish), default=0) + duration[name]
+    length = max(finish.values(), default=0)
+
+    latest = {}
+    for name in reversed(order):
+        users = [user for user in ran if name in deps[user]]
+        latest[name] = min((latest[user] - duration[user] for user in users), default=length)
+    slack = {name: latest[name] - finish[name] for name in ran}
+
+    path = []
+    current = max(order, key=lambda name: finish[name], default=None)
+    while current is not None:
+        path.append(current)
+        before = [dep for dep in deps[current] if dep in finish]
+        current = max(before, key=lambda dep: finish[dep], default=None)
+    path.reverse()
+    return path, length, slack
+
+
+def run_task_graph(tasks, max_workers=10, after=None, budget_ms=None, cache=None):
+    """Run tasks as concurrently as their declared dependencies allow.
+
+    A task whose dependency returned needs_input (or errored, for critical
+    dependencies) is skipped, as are its own dependents. Two tasks never run
+    at the same time when one writes a resource the other reads or writes;
+    among ready tasks, earlier ones in `tasks` start first.
+
+    When `budget_ms` runs out, deferrable tasks that have not started are
+    deferred, as are tasks depending on them. A running deferrable task is
+    cancelled (its commands killed) and deferred only if it is restartable;
+    otherwise it runs to completion here, so side effects never happen
+    twice. Deferred tasks get a "deferred" result; the caller hands them to
+    the background worker (see utils.background).
+
+    With a `cache` (utils.cache.TaskCache), a task whose declared inputs are
+    unchanged since a stored run gets that result, marked "cached", instead
+    of running.
+
+    Args:
+        tasks: Task callables (plain or functools.partial)
+        max_workers: Maximum number of parallel workers
+        after: Extra dependencies for this run, task name -> names
+        budget_ms: Latency budget for deferrable tasks, or None
+        cache: TaskCache to replay and record results, or None
+
+    Returns:
+        tuple: (task results in `tasks` order, schedule report with the
+        critical path, per-task start/end/slack, skipped and deferred tasks)
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    names, deps = _build_graph(tasks, after or {})
+    by_name = dict(zip(names, tasks))
+    results = {}
+    timings = {}
+    skipped = set()
+    deferred = set()
+    pending = list(names)
+    running = {}  # future -> name
+    scopes = {}
+    fingerprints = {}  # name -> inputs right before the task started
+    held_reads = {}  # resource -> count of running readers
+    held_writes = set()
+    start = time.perf_counter()
+    budget_at = start + budget_ms / 1000 if budget_ms else None
+
+    def elapsed_ms():
+        return round((time.perf_counter() - start) * 1000, 1)
+
+    def blocks(dep):
+        if dep in skipped:
+            return True
+        status = results[dep].get("status")
+        return status == "needs_input" or (status == "error" and task_spec(by_name[dep]).critical)
+
+    def timed(task, scope):
+        began = elapsed_ms()
+        try:
+            return run_task(task, scope), began, elapsed_ms(), None
+        except Exception as e:
+            return None, began, elapsed_ms(), e
+
+    def release(name):
+        reads, writes = _resources(task_spec(by_name[name]))
+        held_writes.difference_update(writes)
+        for resource in reads:
+            held_reads[resource] -= 1
+            if not held_reads[resource]:
+                del held_reads[resource]
+
+    def defer_unfinished():
+        for future, name in list(running.items()):
+            spec = task_spec(by_name[name])
+            if spec.deferrable and spec.restartable:
+                del running[future]
+                release(name)
+                scopes[name].cancel()
+                deferred.add(name)
+        changed = True
+        while changed:
+            changed = False
+            for name in list(pending):
+                if task_spec(by_name[name]).deferrable or any(dep in deferred for dep in deps[name]):
+                    pending.remove(name)
+                    deferred.add(name)
+                    changed = True
+        for name in names:
+            if name in deferred:
+                log_task(name, "deferred")
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while pending or running:
+            if budget_at is not None and time.perf_counter() >= budget_at:
+                budget_at = None
+                defer_unfinished()
+            for name in list(pending):
+                if not all(dep in results or dep in skipped for dep in deps[name]):
+                    continue
+                if any(blocks(dep) for dep in deps[name]):
+                    pending.remove(name)
+                    skipped.add(name)
+                    log_task(name, "skipped")
+                    continue
+                reads, writes = _resources(task_spec(by_name[name]))
+                if writes & (held_writes | set(held_reads)) or reads & held_writes:
+                    continue
+                if len(running) >= max_workers:
+                    break
+                if cache is not None:
+                    fingerprints[name] = cache.fingerprint(by_name[name])
+                    cached = cache.lookup(by_name[name], fingerprints[name])
+                    if cached is not None:
+                        pending.remove(name)
+                        results[name] = cached
+                        timings[name] = (elapsed_ms(), elapsed_ms())
+                        log_task(name, "cached")
+                        continue
+                pending.remove(name)
+                held_writes |= writes
+                for resource in reads:
+                    held_reads[resource] = held_reads.get(resource, 0) + 1
+                scopes[name] = task_scope(by_name[name])
+                running[executor.submit(timed, by_name[name], scopes[name])] = name
+
+            if not running:
+                continue
+            wait_s = None if budget_at is None else max(0.0, budget_at - time.perf_counter())
+            done, _ = concurrent.futures.wait(
+                running, timeout=wait_s, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                name = running.pop(future)
+                release(name)
+                result, began, ended, error = future.result()
+                if error is None:
+                    log_task(name, "completed", duration_ms=result.get("duration_ms", 0))
+                else:
+                    log_task(name, "failed", details=str(error))
+                    result = {"name": name, "status": "error", "error": str(error)}
+                results[name] = result
+                timings[name] = (began, ended)
+                if cache is not None:
+                    cache.record(by_name[name], fingerprints.get(name), result)
+    finally:
+        # Deferred tasks were cancelled; don't hold the caller up while
+        # they unwind.
+        executor.shutdown(wait=not deferred)
+
+    path, length, slack = _critical_path(names, deps, timings)
+    schedule = {
+        "critical_path": path,
+        "critical_path_ms": round(length, 1),
+        "wall_ms": elapsed_ms(),
+        "tasks": {
+            name: {
+                "after": deps[name],
+                "start_ms": timings[name][0],
+                "end_ms": timings[name][1],
+                "slack_ms": round(slack[name], 1),
+            }
+            for name in names
+            if name in timings
+        },
+        "skipped": [name for name in names if name in skipped],
+        "deferred": [name for name in names if name in deferred],
+    }
+    if budget_ms:
+        schedule["budget_ms"] = budget_ms
+    for name in deferred:
+        results[name] = {"name": name, "status": "deferred", "result": "DEFERRED:background"}
+    return [results[name] for name in names if name in results], schedule
@@ -25,6 +25,10 @@
 TIMESTAMP=$(date -u +"%Y-%m-%dT%H:%M:%SZ")
 BACKUP_TAG=$(date +%Y%m%d-%H%M%S)
 BACKUP_DIR=""
+# Template, из которого установлен текущий CLAUDE.md. Следующий upgrade
+# мержит трёхсторонне (base → новый template): секции, которые фреймворк не
+# менял, переносятся из CLAUDE.md как есть, без similarity-эвристик.
+CLAUDE_MD_BASE=".claude/CLAUDE.md.base"
 
 # Colors
 RED='\033[0;31m'
@@ -379,6 +383,10 @@ backup_existing() {
         cp "CLAUDE.md" "$BACKUP_DIR/CLAUDE.md"
         files_backed_up+=("CLAUDE.md")
     fi
+    if [ -f "$CLAUDE_MD_BASE" ]; then
+        cp "$CLAUDE_MD_BASE" "$BACKUP_DIR/CLAUDE.md.base"
+        files_backed_up+=("$CLAUDE_MD_BASE")
+    fi
     if [ -f ".claude/settings.json" ]; then
         cp ".claude/settings.json" "$BACKUP_DIR/settings.json"
         files_backed_up+=(".claude/settings.json")
@@ -440,6 +448,13 @@ rollback() {
         cp "$last_backup/CLAUDE.md" "CLAUDE.md"
         log_success "Restored: CLAUDE.md"
         restored=$((restored + 1))
+        # base должна соответствовать восстановленному CLAUDE.md
+        if [ -f "$last_backup/CLAUDE.md.base" ]; then
+            cp "$last_backup/CLAUDE.md.base" "$CLAUDE_MD_BASE"
+        else
+            rm -f "$CLAUDE_MD_BASE"
+        fi
+        rm -f "$CLAUDE_MD_BASE.pending"
     fi
     if [ -f "$last_backup/settings.json" ]; then
         cp "$last_backup/settings.json" ".claude/settings.json"
@@ -467,14 +482,16 @@ rollback() {
 }
 
 # Применяет CLAUDE.md.merge-proposal.md.
-# MVP: вызывает merger Python с режимом apply-proposal, если он поддерживает,
-# иначе печатает инструкцию для ручного резолвинга.
+# Merger применяет машиночитаемую версию (CLAUDE.md.merge-proposal.json) без
+# повторного merge; если входы изменились после propose или JSON нет —
+# печатает инструкцию для ручного резолвинга.
 apply_proposal() {
     local proposal=".claude/CLAUDE.md.merge-proposal.md"
+    local proposal_json=".claude/CLAUDE.md.merge-proposal.json"
     local merger
     merger="$(merger_py)"
 
-    if [ ! -f "$proposal" ]; then
+    if [ ! -f "$proposal" ] && [ ! -f "$proposal_json" ]; then
         log_error "Proposal file not found: $proposal"
         exit 1
     fi
@@ -485,17 +502,21 @@ apply_proposal() {
         return 0
     fi
 
-    if python3 "$merger" apply-proposal "CLAUDE.md" "$proposal" > "CLAUDE.md.merged.tmp" 2>/dev/null; then
+    if python3 "$merger" apply-proposal "CLAUDE.md" "$proposal_json" > "CLAUDE.md.merged.tmp" 2>/dev/null; then
         # Бэкапим текущий CLAUDE.md в свежий backup
         BACKUP_DIR=".claude/backup-$BACKUP_TAG"
         mkdir -p "$BACKUP_DIR"
         [ -f "CLAUDE.md" ] && cp "CLAUDE.md" "$BACKUP_DIR/CLAUDE.md"
         mv "CLAUDE.md.merged.tmp" "CLAUDE.md"
         log_success "Applied proposal to CLAUDE.md (backup at $BACKUP_DIR)"
-        rm -f "$proposal"
+        rm -f "$proposal" "$proposal_json"
+        # Template, против которого строился proposal, — база следующего merge3
+        if [ -f "$CLAUDE_MD_BASE.pending" ]; then
+            mv "$CLAUDE_MD_BASE.pending" "$CLAUDE_MD_BASE"
+        fi
     else
         rm -f "CLAUDE.md.merged.tmp"
-        log_warning "Merger does not support apply-proposal yet (MVP)"
+        log_warning "Proposal could not be applied (missing, or CLAUDE.md/template changed since it was written)"
         log_info "Manual resolution needed: edit CLAUDE.md based on $proposal"
     fi
 }
@@ -520,6 +541,8 @@ merge_claude_md() {
     # Нет существующего — просто подставляем плейсхолдеры
     if [ ! -f "$existing" ]; then
         substitute_placeholders "$template" "$existing"
+        mkdir -p ".claude"
+        cp "$template" "$CLAUDE_MD_BASE"
         log_success "Created: $existing"
         return 0
     fi
@@ -532,30 +555,48 @@ merge_claude_md() {
         return 0
     fi
 
-    # Проверка конфликтов
-    if python3 "$merger" check "$existing" "$template" >/dev/null 2>&1; then
-        # Чистый merge
-        if python3 "$merger" merge "$existing" "$template" > "$existing.merged.tmp" 2>/dev/null; then
+    # check + merge + propose за один запуск merger'а:
+    # 0 — чистый merge, 2 — hard conflict (proposal записан), иначе — ошибка.
+    # Без $CLAUDE_MD_BASE (установка до merge3) merger мержит двусторонне.
+    mkdir -p ".claude"
+    local rc=0
+    python3 "$merger" auto "$existing" "$template" \
+        --base "$CLAUDE_MD_BASE" \
+        --output "$existing.merged.tmp" \
+        --proposal ".claude/CLAUDE.md.merge-proposal.md" \
+        --proposal-json ".claude/CLAUDE.md.merge-proposal.json" \
+        --cache ".claude/.merge-cache" \
+        >/dev/null 2>&1 || rc=$?
+
+    case "$rc" in
+        0)
             substitute_placeholders "$existing.merged.tmp" "$existing.subst.tmp"
-            mv "$existing.subst.tmp" "$existing"
             rm -f "$existing.merged.tmp"
-            log_success "$existing merged additively"
-        else
+            cp "$template" "$CLAUDE_MD_BASE"
+            # Не трогаем файл (mtime, watchers), если merge ничего не изменил
+            if cmp -s "$existing.subst.tmp" "$existing"; then
+                rm -f "$existing.subst.tmp"
+                log_info "$existing already up to date"
+            else
+                mv "$existing.subst.tmp" "$existing"
+                log_success "$existing merged additively"
+            fi
+            ;;
+        2)
+            rm -f "$existing.merged.tmp"
+            cp "$template" "$CLAUDE_MD_BASE.pending"
+            log_error "Hard conflict in CLAUDE.md detected."
+            log_info "See .claude/CLAUDE.md.merge-proposal.md"
+            log_info "To apply proposed resolution: rerun with --apply-proposal"
+            log_info "To rollback all changes:    rerun with --rollback"
+            log_info "Files NOT modified. Backup at $BACKUP_DIR"
+            exit 2
+            ;;
+        *)
             rm -f "$existing.merged.tmp"
             log_warning "Merger failed — keeping existing $existing"
-        fi
-    else
-        # Hard conflict — proposal
-        mkdir -p ".claude"
-        python3 "$merger" propose "$existing" "$template" \
-            > ".claude/CLAUDE.md.merge-proposal.md" 2>/dev/null || true
-        log_error "Hard conflict in CLAUDE.md detected."
-        log_info "See .claude/CLAUDE.md.merge-proposal.md"
-        log_info "To apply proposed resolution: rerun with --apply-proposal"
-        log_info "To rollback all changes:    rerun with --rollback"
-        log_info "Files NOT modified. Backup at $BACKUP_DIR"
-        exit 2
-    fi
+            ;;
+    esac
 }
 
 # ============================================================================
@@ -5,14 +5,89 @@ Merges a framework template CLAUDE.md into an existing user CLAUDE.md without
 losing custom content. Stdlib only.
 
 Usage:
-    python3 merge_claude_md.py merge <existing.md> <template.md>
-        Write merged result to stdout. Exit 2 if hard conflicts present.
+    python3 merge_claude_md.py merge <existing.md> <template.md> [--output <merged.md>] [--patch]
+        Write merged result to stdout, or atomically to --output (left
+        untouched if already up to date). With --patch, write a unified diff
+        against <existing.md> instead (empty if nothing changes). Exit 2 if
+        hard conflicts present.
 
     python3 merge_claude_md.py check <existing.md> <template.md>
         Exit 0 if mergeable, exit 2 if hard conflicts. Conflicts to stderr.
 
-    python3 merge_claude_md.py propose <existing.md> <template.md>
-        Generate markdown merge proposal report to stdout.
+    python3 merge_claude_md.py merge3 <existing.md> <base.md> <template.md>
+        Three-way merge; <base.md> is the template <existing.md> was installed
+        from. Only sections the framework changed since <base.md> are
+        merged; the rest are carried over from <existing.md> unscored.
+        Output and exit codes as for `merge`.
+
+    python3 merge_claude_md.py propose <existing.md> <template.md> [--json <out.json>]
+            [--format markdown|json]
+        Generate markdown merge proposal report to stdout. With --json, also
+        write the machine-readable proposal (decisions, similarity scores,
+        conflict resolutions and diffs, input hashes) to <out.json>; with
+        --format json, write that to stdout instead of the report. Each
+        conflict shows a diff of your section against the template's, or
+        excerpts of both when the sections are too large or too different.
+
+    python3 merge_claude_md.py apply-proposal <existing.md> <proposal.json>
+        Write the merged result described by a JSON proposal to stdout,
+        without re-parsing or re-scoring. A `.md` report path is accepted and
+        resolved to the `.json` next to it. Exit 1 if either input changed
+        since the proposal was written.
+
+    python3 merge_claude_md.py apply-patch <existing.md> <merge.patch>
+        Apply a `merge --patch` diff to <existing.md> in place. Exit 1 if it
+        does not apply exactly (the file changed since).
+
+    python3 merge_claude_md.py auto <existing.md> <template.md> [--output <merged.md>]
+            [--conflicts <conflicts.json>] [--proposal <proposal.md>]
+            [--proposal-json <proposal.json>]
+        check + merge + propose in one pass. Exit 0: merged result written to
+        --output (default stdout). Exit 2: hard conflicts; nothing merged,
+        proposal report(s) written if paths were given. --conflicts always
+        receives {"status", "conflicts", "sections"} as JSON.
+
+    python3 merge_claude_md.py overlay <existing.md> <layer1.md> <layer2.md>...
+            [--output <merged.md>] [--provenance <provenance.json>]
+        Merge several templates (e.g. the project template plus an addendum)
+        in one pass; later layers take precedence over earlier ones for
+        sections they share. --provenance receives, per output section, the
+        layer it came from and the layers it overrode. Exit codes as for
+        `merge`.
+
+    python3 merge_claude_md.py batch <manifest.jsonl> [--jobs N] [--chunksize N]
+            [--results <results.jsonl>]
+        Merge every {"existing", "template", "output", "base"} line of the
+        manifest ("base" as for --base).
+        Each template is parsed once; --jobs N spreads the pairs over a
+        process pool. One JSON result per pair is streamed (in manifest
+        order) to stdout or --results. Exit 0 all merged, 2 any conflict,
+        1 any error.
+
+merge, check, propose and auto accept --base <base.md> to merge three-way as
+`merge3` does; a missing base file falls back to the two-way merge (first
+upgrade after install).
+
+Every command except apply-proposal and apply-patch accepts --cache <dir> (default: the
+MERGE_CLAUDE_MD_CACHE_DIR environment variable): the parsed template is then
+compiled once into <dir>/templates/ and reused while the template and merger
+version stay the same. merge, merge3, check, auto and batch also store each result
+under <dir>/results/, keyed by both input hashes, so re-running an upgrade on
+unchanged files skips parsing entirely. Cache hit/miss counts go to stderr
+(and, for auto, into the --conflicts JSON; for batch, into each result).
+
+merge, merge3, check and propose accept --profile: a JSON line with
+perf_counter_ns timings per phase (read, parse, normalize, similarity, merge,
+list_table, render, cache, write) and the --profile-top N (default 10) most
+expensive section pairs is printed to stderr after the run. Library callers
+get the same report from `merge_outcome(..., profile=True).profile` or
+`with profiling() as prof: ...; prof.report()`.
+
+merge, merge3, check, propose and auto accept --jobs N: section pairs that
+need scoring are merged on N worker processes, in chunks sized by section
+length. The output is identical to a serial run; inputs with less than
+PARALLEL_MIN_COST of differing section text (and --profile runs) stay
+serial.
 
 Errors (file missing, parse error) -> exit 1, message to stderr.
 """
@@ -20,11 +95,25 @@ Errors (file missing, parse error) -> exit 1, message to stderr.
 from __future__ import annotations
 
 import sys
+import os
 import re
+import json
 import difflib
+import hashlib
+import heapq
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional, Tuple
+from functools import cached_property, wraps
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Bump whenever merge decisions or the proposal format change: proposals
+# written by another merger version are rejected instead of misapplied.
+MERGER_VERSION = "6"
 
 
 # ---------------------------------------------------------------------------
@@ -39,6 +128,123 @@ class Section:
     subsections: List["Section"] = field(default_factory=list)
     raw_heading: str = ""  # full original heading line, e.g. "## **Bold** Title"
     merge_status: str = ""  # "added" | "kept_custom" | "merged" | "kept_existing" | "from_template"
+    # Parsed sections don't copy their body: they keep (buffer, start, end)
+    # char offsets into the tokenized document and `content` slices it on
+    # first access. Sections built by the merger pass `content` directly.
+    span: Optional[Tuple[str, int, int]] = field(default=None, repr=False, compare=False)
+    score: Optional["SimilarityScore"] = field(default=None, repr=False, compare=False)  # set by merge_sections
+
+
+def _get_content(self: Section) -> str:
+    if self._content is None:
+        buf, start, end = self.span
+        self._content = buf[start:end]
+    return self._content
+
+
+def _set_content(self: Section, value: Optional[str]) -> None:
+    self._content = value
+
+
+# `content` stays a regular dataclass field for callers (positional/keyword
+# init, repr, eq); the property only makes parser-built sections lazy.
+Section.content = property(_get_content, _set_content)
+
+
+# ---------------------------------------------------------------------------
+# Profiling
+# ---------------------------------------------------------------------------
+#
+# Inside `with profiling() as prof:` every merge records perf_counter_ns
+# timings per phase and per merged section pair; `--profile` prints the
+# report. Outside that block the hooks below cost one global lookup.
+
+PROFILE_PHASES = (
+    "read", "parse", "normalize", "similarity", "merge", "list_table", "render", "cache", "write",
+)
+PROFILE_TOP_N = 10
+
+
+class MergeProfile:
+    """Self time per phase plus the cost of each merged section pair.
+
+    Phases nest (a section normalized while it is being scored is charged
+    to "normalize", not "similarity"): time goes to the innermost active
+    phase only, so the phases add up to the profiled total ("other" is the
+    part no phase claimed).
+    """
+
+    def __init__(self) -> None:
+        self.phases: Dict[str, int] = dict.fromkeys(PROFILE_PHASES, 0)
+        self.sections: List[Dict[str, object]] = []
+        self.total_ns: Optional[int] = None
+        self._stack: List[str] = []
+        self._start = self._mark = time.perf_counter_ns()
+
+    def enter(self, phase: str) -> None:
+        now = time.perf_counter_ns()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._mark
+        self._stack.append(phase)
+        self._mark = now
+
+    def exit(self) -> None:
+        now = time.perf_counter_ns()
+        self.phases[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def stop(self) -> None:
+        self.total_ns = time.perf_counter_ns() - self._start
+
+    def report(self, top: int = PROFILE_TOP_N) -> Dict[str, object]:
+        """JSON-ready: totals, phases and the `top` most expensive sections."""
+        total = self.total_ns if self.total_ns is not None else time.perf_counter_ns() - self._start
+        phases = dict(self.phases)
+        phases["other"] = max(0, total - sum(phases.values()))
+        return {
+            "total_ns": total,
+            "phases_ns": phases,
+            "sections": {
+                "count": len(self.sections),
+                "bytes": sum(s["bytes"] for s in self.sections),
+                "tiers": dict(Counter(s["tier"] for s in self.sections)),
+                "top": sorted(self.sections, key=lambda s: s["ns"], reverse=True)[:top],
+            },
+        }
+
+
+# The active profile, if any (see `profiling`).
+_PROFILE: List[Optional[MergeProfile]] = [None]
+
+
+@contextmanager
+def profiling() -> Iterator[MergeProfile]:
+    """Profile every merge inside the block; yields the MergeProfile."""
+    prof = MergeProfile()
+    outer = _PROFILE[0]
+    _PROFILE[0] = prof
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _PROFILE[0] = outer
+
+
+def _profiled(phase: str) -> Callable:
+    """Charge the decorated function's self time to `phase` while profiling."""
+    def decorate(fn: Callable) -> Callable:
+        @wraps(fn)
+        def run(*args, **kwargs):
+            prof = _PROFILE[0]
+            if prof is None:
+                return fn(*args, **kwargs)
+            prof.enter(phase)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.exit()
+        return run
+    return decorate
 
 
 # ---------------------------------------------------------------------------
@@ -46,32 +252,77 @@ class Section:
 # ---------------------------------------------------------------------------
 
 _HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+# Deepest heading level that gets its own Section (and is merged as a subtree).
+TREE_MAX_LEVEL = 4
 _FENCE_RE = re.compile(r"^(\s*)(```|~~~)")
+# Line separators str.splitlines() honours besides "\n". Documents containing
+# any of them are re-joined with "\n" once so offsets match splitlines().
+_OTHER_NEWLINES_RE = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
 
 
-def parse_md(text: str) -> Tuple[str, List[Section], List[Section]]:
-    """Parse markdown into (preamble, h1_sections, h2_sections).
+@dataclass
+class MdIndex:
+    """Line-offset index of a markdown buffer, built in a single pass.
 
-    - preamble: text before the first heading (may include frontmatter and H1
-      title block content). For our purposes we keep frontmatter + first H1
-      heading + any text up to the first H2 inside `preamble`.
-    - h1_sections: list of level-1 sections detected (used to flag conflicts
-      if multiple H1 are present).
-    - h2_sections: ordered list of level-2 sections (the primary merge unit).
-      Their `subsections` field contains level-3+ children.
+    `buf` is the document with "\\n" line endings; line `i` spans
+    `buf[starts[i]:ends[i]]`. `headings` lists every heading outside code
+    fences as (line_index, level, title, raw_heading), in document order.
+    """
+
+    buf: str
+    starts: List[int]
+    ends: List[int]
+    headings: List[Tuple[int, int, str, str]]
+
+    @property
+    def line_count(self) -> int:
+        return len(self.starts)
+
+    def span(self, first: int, stop: int) -> Tuple[str, int, int]:
+        """(buf, start, end) equal to "\\n".join(lines[first:stop]).
+
+        An empty range is always (buf, 0, 0); any range of one or more lines
+        after the first ends past offset 0 (see `_has_body`).
+        """
+        if stop <= first:
+            return (self.buf, 0, 0)
+        return (self.buf, self.starts[first], self.ends[stop - 1])
+
+    def text(self, first: int, stop: int) -> str:
+        buf, start, end = self.span(first, stop)
+        return buf[start:end]
+
+
+def _lf_buffer(text: str) -> str:
+    """`text` as "\\n".join(text.splitlines()), copying only when needed."""
+    if _OTHER_NEWLINES_RE.search(text):
+        return "\n".join(text.splitlines())
+    return text[:-1] if text.endswith("\n") else text
+
+
+def tokenize_md(text: str) -> MdIndex:
+    """Index lines and headings (all levels) of `text` in one pass.
 
     Code fences are tracked so that `## ` inside ``` blocks isn't treated as a
-    heading.
+    heading. Line splitting matches `str.splitlines()`.
     """
-    lines = text.splitlines(keepends=False)
+    buf = _lf_buffer(text)
+    starts: List[int] = []
+    ends: List[int] = []
+    headings: List[Tuple[int, int, str, str]] = []
+    if not text:
+        return MdIndex(buf=buf, starts=starts, ends=ends, headings=headings)
+
     in_fence = False
     fence_marker = ""
-
-    # Pass 1: locate all headings (line index, level, title, raw_heading)
-    headings: List[Tuple[int, int, str, str]] = []
-    for i, line in enumerate(lines):
-        m_fence = _FENCE_RE.match(line)
-        if m_fence:
+    pos = 0
+    for i, line in enumerate(buf.split("\n")):
+        starts.append(pos)
+        pos += len(line)
+        ends.append(pos)
+        pos += 1
+        # Cheap prefilters: fences need a backtick/tilde, headings a leading #.
+        if ("`" in line or "~" in line) and (m_fence := _FENCE_RE.match(line)):
             marker = m_fence.group(2)
             if not in_fence:
                 in_fence = True
@@ -80,106 +331,103 @@ def parse_md(text: str) -> Tuple[str, List[Section], List[Section]]:
                 in_fence = False
                 fence_marker = ""
             continue
-        if in_fence:
+        if in_fence or not line.startswith("#"):
             continue
         m = _HEADING_RE.match(line)
         if m:
-            level = len(m.group(1))
-            title = m.group(2).strip()
-            headings.append((i, level, title, line))
+            headings.append((i, len(m.group(1)), m.group(2).strip(), line))
+    return MdIndex(buf=buf, starts=starts, ends=ends, headings=headings)
 
-    # Identify preamble end: line index of first heading (any level), else EOF
-    if not headings:
-        # Whole file = preamble
-        return ("\n".join(lines), [], [])
 
-    first_heading_idx = headings[0][0]
+def parse_md(text: str) -> Tuple[str, List[Section], List[Section]]:
+    """Parse markdown into (preamble, h1_sections, h2_sections).
 
-    # Detect H1 sections (for conflict detection: multiple H1 = hard conflict)
-    h1_indices = [idx for (idx, lvl, _, _) in headings if lvl == 1]
+    - preamble: text before the first heading (may include frontmatter and H1
+      title block content). For our purposes we keep frontmatter + first H1
+      heading + any text up to the first H2 inside `preamble`.
+    - h1_sections: list of level-1 sections detected (used to flag conflicts
+      if multiple H1 are present).
+    - h2_sections: ordered list of level-2 sections (the primary merge unit).
+      Their `subsections` field holds the H3 children, whose own
+      `subsections` hold H4s (down to TREE_MAX_LEVEL); deeper headings stay
+      part of the body.
 
-    # Find first H2; if no H2, the whole post-preamble area is one virtual section
-    h2_positions = [(idx, lvl, title, raw) for (idx, lvl, title, raw) in headings if lvl == 2]
+    Built on `tokenize_md`: section bodies are offsets into the indexed
+    buffer and are only sliced out when `content` is read.
+    """
+    return parse_index(tokenize_md(text))
 
-    if h2_positions:
-        # Preamble = lines[0 : first H2 index]
-        preamble_end = h2_positions[0][0]
-    else:
-        preamble_end = len(lines)
 
-    preamble = "\n".join(lines[:preamble_end])
+def parse_index(index: MdIndex) -> Tuple[str, List[Section], List[Section]]:
+    """`parse_md` for an already tokenized document."""
+    headings = index.headings
+    n_lines = index.line_count
+    if not headings:
+        # Whole file = preamble
+        return (index.text(0, n_lines), [], [])
 
     # Build H1 sections list (mainly for counting)
-    h1_sections: List[Section] = []
-    for idx, lvl, title, raw in headings:
-        if lvl == 1:
-            h1_sections.append(Section(level=1, title=title, content="", raw_heading=raw))
+    h1_sections = [
+        Section(level=1, title=title, content="", raw_heading=raw)
+        for (_, lvl, title, raw) in headings
+        if lvl == 1
+    ]
 
-    # Build H2 sections with H3+ subsections
-    h2_sections: List[Section] = []
+    # Positions (into `headings`) of H2 headings; if there are none, the whole
+    # post-preamble area stays in the preamble.
+    h2_positions = [hi for hi, h in enumerate(headings) if h[1] == 2]
     if not h2_positions:
-        return (preamble, h1_sections, h2_sections)
+        return (index.text(0, n_lines), h1_sections, [])
 
-    # Compute end positions for H2 sections
-    for i, (idx, lvl, title, raw) in enumerate(h2_positions):
+    # Preamble = lines[0 : first H2 index]
+    preamble = index.text(0, headings[h2_positions[0]][0])
+
+    h2_sections: List[Section] = []
+    for i, hi in enumerate(h2_positions):
+        idx, _, title, raw = headings[hi]
         # End = next H2 start, or EOF
-        if i + 1 < len(h2_positions):
-            end = h2_positions[i + 1][0]
-        else:
-            end = len(lines)
-        body_lines = lines[idx + 1 : end]
-        body = "\n".join(body_lines)
-
-        # Extract H3+ subsections from this block
-        subs = _extract_subsections(body_lines, base_level=3)
-
-        sec = Section(
-            level=2,
-            title=title,
-            content=body,
-            subsections=subs,
-            raw_heading=raw,
+        stop_hi = h2_positions[i + 1] if i + 1 < len(h2_positions) else len(headings)
+        end = headings[stop_hi][0] if stop_hi < len(headings) else n_lines
+        h2_sections.append(
+            Section(
+                level=2,
+                title=title,
+                content=None,
+                subsections=_extract_subsections(index, hi + 1, stop_hi, end, base_level=3),
+                raw_heading=raw,
+                span=index.span(idx + 1, end),
+            )
         )
-        h2_sections.append(sec)
-
     return (preamble, h1_sections, h2_sections)
 
 
-def _extract_subsections(lines: List[str], base_level: int) -> List[Section]:
-    """Extract subsections of `base_level` (and deeper) from a block of lines."""
-    in_fence = False
-    fence_marker = ""
-    headings: List[Tuple[int, int, str, str]] = []
-    for i, line in enumerate(lines):
-        m_fence = _FENCE_RE.match(line)
-        if m_fence:
-            marker = m_fence.group(2)
-            if not in_fence:
-                in_fence = True
-                fence_marker = marker
-            elif marker == fence_marker:
-                in_fence = False
-                fence_marker = ""
-            continue
-        if in_fence:
-            continue
-        m = _HEADING_RE.match(line)
-        if m:
-            level = len(m.group(1))
-            title = m.group(2).strip()
-            if level == base_level:
-                headings.append((i, level, title, line))
+def _extract_subsections(
+    index: MdIndex, first: int, stop: int, end_line: int, base_level: int
+) -> List[Section]:
+    """Sections of exactly `base_level` among `index.headings[first:stop]`.
 
+    Each runs up to the next heading of `base_level` in that range, or to
+    `end_line` (the enclosing section's end), and gets its own children of
+    the next level, down to TREE_MAX_LEVEL.
+    """
+    positions = [hi for hi in range(first, stop) if index.headings[hi][1] == base_level]
     sections: List[Section] = []
-    for i, (idx, lvl, title, raw) in enumerate(headings):
-        end = headings[i + 1][0] if i + 1 < len(headings) else len(lines)
-        body = "\n".join(lines[idx + 1 : end])
+    for i, hi in enumerate(positions):
+        idx, lvl, title, raw = index.headings[hi]
+        stop_hi = positions[i + 1] if i + 1 < len(positions) else stop
+        end = index.headings[stop_hi][0] if stop_hi < stop else end_line
         sections.append(
             Section(
                 level=lvl,
                 title=title,
-                content=body,
+                content=None,
+                subsections=(
+                    _extract_subsections(index, hi + 1, stop_hi, end, base_level + 1)
+                    if base_level < TREE_MAX_LEVEL
+                    else []
+                ),
                 raw_heading=raw,
+                span=index.span(idx + 1, end),
             )
         )
     return sections
@@ -189,33 +437,58 @@ def _extract_subsections(lines: List[str], base_level: int) -> List[Section]:
 # Normalization & similarity
 # ---------------------------------------------------------------------------
 
-_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
-_WS_RE = re.compile(r"\s+", re.UNICODE)
-_MD_FORMAT_RE = re.compile(r"[*_`~]+")
-_EMOJI_RE = re.compile(
-    "["
-    "\U0001F300-\U0001FAFF"
-    "\U00002600-\U000027BF"
-    "\U0001F1E6-\U0001F1FF"
-    "]+",
-    flags=re.UNICODE,
+# Single-pass normalizer: one str.translate() drops markdown format chars
+# (and emoji, for titles) and turns every other non-word, non-space char into a
+# space; split/join then collapses whitespace. Equivalent to the regex chain
+#   [*_`~]+ -> ""   [^\w\s] -> " "   \s+ -> " "   strip().lower()
+_MD_FORMAT_CHARS = frozenset("*_`~")
+_EMOJI_RANGES = (
+    (0x1F300, 0x1FAFF),
+    (0x2600, 0x27BF),
+    (0x1F1E6, 0x1F1FF),
 )
 
 
+def _is_emoji(cp: int) -> bool:
+    return any(lo <= cp <= hi for lo, hi in _EMOJI_RANGES)
+
+
+class _NormalizeTable(dict):
+    """str.translate() table, filled lazily one code point at a time.
+
+    Precomputing all 0x110000 code points would cost more at import than most
+    merges; `__missing__` classifies a code point on first sight and caches it.
+    """
+
+    def __init__(self, drop_emoji: bool) -> None:
+        super().__init__()
+        self.drop_emoji = drop_emoji
+        for cp in range(128):  # warm the ASCII range
+            self.__missing__(cp)
+
+    def __missing__(self, cp: int) -> Optional[object]:
+        ch = chr(cp)
+        if ch in _MD_FORMAT_CHARS or (self.drop_emoji and _is_emoji(cp)):
+            value: Optional[object] = None
+        elif ch.isalnum() or ch == "_" or ch.isspace():
+            value = cp
+        else:
+            value = " "
+        self[cp] = value
+        return value
+
+
+_CONTENT_TABLE = _NormalizeTable(drop_emoji=False)
+_TITLE_TABLE = _NormalizeTable(drop_emoji=True)
+
+
 def normalize_title(title: str) -> str:
-    t = _EMOJI_RE.sub("", title)
-    t = _MD_FORMAT_RE.sub("", t)
-    t = _PUNCT_RE.sub(" ", t)
-    t = _WS_RE.sub(" ", t).strip().lower()
-    return t
+    return " ".join(title.translate(_TITLE_TABLE).split()).lower()
 
 
 def normalize_content(text: str) -> str:
     """Normalize for similarity comparison: strip whitespace + punctuation."""
-    t = _MD_FORMAT_RE.sub("", text)
-    t = _PUNCT_RE.sub(" ", t)
-    t = _WS_RE.sub(" ", t).strip().lower()
-    return t
+    return " ".join(text.translate(_CONTENT_TABLE).split()).lower()
 
 
 def similarity(a: str, b: str) -> float:
@@ -228,6 +501,127 @@ def similarity(a: str, b: str) -> float:
     return difflib.SequenceMatcher(None, na, nb).ratio()
 
 
+# Similarity bands used by merge_sections.
+SIM_KEEP_EXISTING = 0.85
+SIM_HARD_CONFLICT = 0.40
+
+BAND_KEEP = "keep"  # score >= SIM_KEEP_EXISTING
+BAND_MEDIUM = "medium"  # SIM_HARD_CONFLICT <= score < SIM_KEEP_EXISTING
+BAND_CONFLICT = "conflict"  # score < SIM_HARD_CONFLICT
+
+# MinHash tier: only for very large pairs, and only when the estimate is far
+# from the band edges. Below this size the exact ratio is cheap enough.
+MINHASH_MIN_CHARS = 50_000
+MINHASH_SKETCH_SIZE = 128
+MINHASH_SHINGLE_WORDS = 3
+MINHASH_KEEP = 0.90
+MINHASH_CONFLICT = 0.05
+
+
+@dataclass
+class SimilarityScore:
+    """Which similarity band a section pair falls in, and how we know.
+
+    `value` is the exact ratio when `tier == "exact"`; otherwise it is the
+    upper bound ("length", "quick") or the Jaccard estimate ("minhash") that
+    settled the band.
+    """
+
+    band: str
+    value: float
+    tier: str  # "hash" | "empty" | "length" | "quick" | "minhash" | "exact"
+
+    @property
+    def exact(self) -> bool:
+        return self.tier in ("hash", "empty", "exact")
+
+    def describe(self) -> str:
+        if self.exact:
+            return f"{self.value:.2f}"
+        if self.tier == "minhash":
+            return f"~{self.value:.2f}, {self.tier}"
+        return f"<={self.value:.2f}, {self.tier}"
+
+
+def _band(value: float) -> str:
+    if value >= SIM_KEEP_EXISTING:
+        return BAND_KEEP
+    if value < SIM_HARD_CONFLICT:
+        return BAND_CONFLICT
+    return BAND_MEDIUM
+
+
+def _shingle_sketch(text: str, size: int = MINHASH_SKETCH_SIZE) -> List[int]:
+    """Bottom-k MinHash sketch over word shingles of normalized text."""
+    words = text.split(" ")
+    n = max(1, len(words) - MINHASH_SHINGLE_WORDS + 1)
+    hashes = {
+        int.from_bytes(
+            hashlib.blake2b(
+                " ".join(words[i : i + MINHASH_SHINGLE_WORDS]).encode("utf-8"),
+                digest_size=8,
+            ).digest(),
+            "big",
+        )
+        for i in range(n)
+    }
+    return heapq.nsmallest(size, hashes)
+
+
+def _estimate_jaccard(sketch_a: List[int], sketch_b: List[int]) -> float:
+    size = max(len(sketch_a), len(sketch_b))
+    union = heapq.nsmallest(size, set(sketch_a) | set(sketch_b))
+    if not union:
+        return 1.0
+    in_a, in_b = set(sketch_a), set(sketch_b)
+    shared = sum(1 for h in union if h in in_a and h in in_b)
+    return shared / len(union)
+
+
+def score_similarity(a: str, b: str) -> SimilarityScore:
+    """Tiered version of `similarity()` that stops once the band is known."""
+    return score_normalized(normalize_content(a), normalize_content(b))
+
+
+@_profiled("similarity")
+def score_normalized(na: str, nb: str) -> SimilarityScore:
+    """Decide the similarity band of two normalized texts as cheaply as possible.
+
+    Tiers, cheapest first:
+      1. length  — 2*min/(la+lb) (difflib's real_quick_ratio), an upper bound
+      2. quick   — shared character multiset (difflib's quick_ratio), an upper
+                   bound
+      3. minhash — word-shingle Jaccard estimate, only for pairs over
+                   MINHASH_MIN_CHARS and only far from the band edges
+      4. exact   — SequenceMatcher.ratio()
+    Upper bounds can only prove "below a threshold"; a KEEP or MEDIUM band
+    always needs the exact ratio (or, for huge pairs, a confident estimate).
+    """
+    if not na and not nb:
+        return SimilarityScore(BAND_KEEP, 1.0, "empty")
+    if not na or not nb:
+        return SimilarityScore(BAND_CONFLICT, 0.0, "empty")
+
+    total = len(na) + len(nb)
+    bound = 2.0 * min(len(na), len(nb)) / total
+    if bound < SIM_HARD_CONFLICT:
+        return SimilarityScore(BAND_CONFLICT, bound, "length")
+
+    bound = 2.0 * sum((Counter(na) & Counter(nb)).values()) / total
+    if bound < SIM_HARD_CONFLICT:
+        return SimilarityScore(BAND_CONFLICT, bound, "quick")
+
+    if total >= MINHASH_MIN_CHARS:
+        estimate = _estimate_jaccard(_shingle_sketch(na), _shingle_sketch(nb))
+        if estimate >= MINHASH_KEEP and bound >= SIM_KEEP_EXISTING:
+            return SimilarityScore(BAND_KEEP, estimate, "minhash")
+        if estimate <= MINHASH_CONFLICT:
+            return SimilarityScore(BAND_CONFLICT, estimate, "minhash")
+
+    ratio = difflib.SequenceMatcher(None, na, nb).ratio()
+    return SimilarityScore(_band(ratio), ratio, "exact")
+
+
 _PLACEHOLDER_RE = re.compile(r"\{\{[^}]+\}\}")
 
 
@@ -258,36 +652,233 @@ _TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$")
 _TABLE_SEP_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)+\|?\s*$")
 
 
-def is_list_block(text: str) -> bool:
-    lines = [l for l in text.splitlines() if l.strip()]
-    if not lines:
-        return False
-    list_lines = sum(1 for l in lines if _LIST_ITEM_RE.match(l))
-    return list_lines >= max(2, int(len(lines) * 0.6))
-
-
-def parse_list_items(text: str) -> List[str]:
+def _scan_list(text: str) -> Tuple[bool, List[str]]:
+    """One pass over `text`: (is_list_block, list item texts)."""
+    non_empty = 0
     items: List[str] = []
     for line in text.splitlines():
+        if not line.strip():
+            continue
+        non_empty += 1
         m = _LIST_ITEM_RE.match(line)
         if m:
             items.append(m.group(3).strip())
-    return items
+    is_list = non_empty > 0 and len(items) >= max(2, int(non_empty * 0.6))
+    return (is_list, items)
 
 
-def merge_lists(template_text: str, existing_text: str) -> str:
-    """Merge two markdown list blocks: template first, then unique-from-existing."""
-    t_items = parse_list_items(template_text)
-    e_items = parse_list_items(existing_text)
-    seen = set()
-    merged = []
-    for item in t_items + e_items:
-        key = normalize_content(item)
-        if key in seen:
+def is_list_block(text: str) -> bool:
+    return _scan_list(text)[0]
+
+
+def parse_list_items(text: str) -> List[str]:
+    return _scan_list(text)[1]
+
+
+def _anchored_join(
+    t_keys: List[str], e_keys: List[str]
+) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Join two keyed sequences into (existing index, template index) pairs.
+
+    Linear in the total length. Output follows template order; the first
+    occurrence of a key wins on each side. Entries only the user has follow
+    the nearest preceding shared entry, the way a diff keeps insertions in
+    place, and go last when nothing is shared.
+    """
+    e_index: Dict[str, int] = {}
+    for i, key in enumerate(e_keys):
+        e_index.setdefault(key, i)
+
+    # User-only entries are bucketed by the shared entry they follow (-1 =
+    # start), so the result is built without list inserts.
+    t_seen = set()
+    order: List[Tuple[Optional[int], int]] = []
+    for ti, key in enumerate(t_keys):
+        if key in t_seen:
             continue
-        seen.add(key)
-        merged.append(item)
-    return "\n".join(f"- {it}" for it in merged)
+        t_seen.add(key)
+        order.append((e_index.get(key), ti))
+    after: Dict[int, List[int]] = {}
+    anchor = -1
+    for i, key in enumerate(e_keys):
+        if e_index[key] != i:
+            continue  # duplicate within the existing sequence
+        if key in t_seen:
+            anchor = i
+        else:
+            after.setdefault(anchor, []).append(i)
+
+    lead = after.pop(-1, [])
+    joined: List[Tuple[Optional[int], Optional[int]]] = []
+    if anchor >= 0:
+        joined.extend((i, None) for i in lead)
+    for ei, ti in order:
+        joined.append((ei, ti))
+        if ei is not None:
+            joined.extend((i, None) for i in after.get(ei, ()))
+    if anchor < 0:
+        joined.extend((i, None) for i in lead)
+    return joined
+
+
+@dataclass
+class ListItem:
+    """One list item; `line` parts are kept verbatim so it renders unchanged."""
+
+    indent: str
+    marker: str  # "-", "*", "+" or "<n>."
+    gap: str  # whitespace between marker and text
+    text: str
+    key: str  # normalize_content(text)
+    extra: List[str] = field(default_factory=list)  # continuation lines
+    children: List["ListItem"] = field(default_factory=list)
+
+    @property
+    def ordered(self) -> bool:
+        return self.marker.endswith(".")
+
+
+@dataclass
+class ListBlock:
+    """A list body parsed into an item tree, plus the lines around it."""
+
+    lead: List[str]  # lines before the first item
+    items: List[ListItem]
+    tail: List[str]  # blank lines after the last item
+
+    @classmethod
+    def parse(cls, text: str) -> "ListBlock":
+        lead: List[str] = []
+        roots: List[ListItem] = []
+        stack: List[Tuple[int, ListItem]] = []
+        last: Optional[ListItem] = None
+        for line in text.split("\n"):
+            m = _LIST_ITEM_RE.match(line)
+            if m is None:
+                (lead if last is None else last.extra).append(line)
+                continue
+            indent, marker, text_ = m.group(1), m.group(2), m.group(3)
+            item = ListItem(
+                indent=indent,
+                marker=marker,
+                gap=line[m.end(2):m.start(3)],
+                text=text_,
+                key=normalize_content(text_),
+            )
+            width = len(indent.expandtabs(4))
+            while stack and stack[-1][0] >= width:
+                stack.pop()
+            (stack[-1][1].children if stack else roots).append(item)
+            stack.append((width, item))
+            last = item
+        tail: List[str] = []
+        if last is not None:
+            while last.extra and not last.extra[-1].strip():
+                tail.append(last.extra.pop())
+        return cls(lead=lead, items=roots, tail=tail)
+
+    def flat(self) -> List[Tuple[str, str]]:
+        """(item text, key) pairs in document order."""
+        out: List[Tuple[str, str]] = []
+        todo = list(reversed(self.items))
+        while todo:
+            it = todo.pop()
+            out.append((it.text.strip(), it.key))
+            todo.extend(reversed(it.children))
+        return out
+
+    def to_json(self) -> Dict[str, object]:
+        def item(it: ListItem) -> list:
+            return [it.indent, it.marker, it.gap, it.text, it.key, it.extra,
+                    [item(c) for c in it.children]]
+        return {"lead": self.lead, "items": [item(i) for i in self.items], "tail": self.tail}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, object]) -> "ListBlock":
+        def item(e: list) -> ListItem:
+            return ListItem(*e[:6], children=[item(c) for c in e[6]])
+        return cls(lead=data["lead"], items=[item(i) for i in data["items"]], tail=data["tail"])
+
+
+def merge_lists(template_text: str, existing_text: str) -> str:
+    """Merge two markdown list blocks, keeping template order and user items.
+
+    See `_merge_list_blocks`.
+    """
+    return _merge_list_blocks(ListBlock.parse(template_text), ListBlock.parse(existing_text))
+
+
+@_profiled("list_table")
+def _merge_list_blocks(t_block: ListBlock, e_block: ListBlock) -> str:
+    """Merge parsed list trees in time linear in the total number of items.
+
+    Each sibling group is joined by normalized key with `_anchored_join`.
+    Matched items render as the user wrote them and their children merge
+    recursively; template-only items are re-indented into the existing
+    layout and take the group's bullet. Ordered groups are renumbered.
+    """
+    out: List[str] = list(e_block.lead if e_block.items else t_block.lead)
+    _merge_list_group(t_block.items, e_block.items, ("", ""), out)
+    out.extend(e_block.tail if e_block.items else t_block.tail)
+    return "\n".join(out)
+
+
+def _shift_indent(line: str, shift: Tuple[str, str]) -> str:
+    old, new = shift
+    if old == new or not line.startswith(old):
+        return line
+    return new + line[len(old):]
+
+
+def _emit_list_item(
+    item: ListItem, marker: str, shift: Tuple[str, str], out: List[str], deep: bool
+) -> None:
+    """Append `item` (and, if `deep`, its subtree) re-indented by `shift`."""
+    out.append(_shift_indent(item.indent, shift) + marker + item.gap + item.text)
+    out.extend(_shift_indent(l, shift) if l.strip() else l for l in item.extra)
+    if deep:
+        for child in item.children:
+            _emit_list_item(child, child.marker, shift, out, True)
+
+
+def _merge_list_group(
+    t_items: List[ListItem],
+    e_items: List[ListItem],
+    shift: Tuple[str, str],
+    out: List[str],
+) -> None:
+    """Merge one sibling group; `shift` maps template indents onto existing ones."""
+    if not t_items and not e_items:
+        return
+    if t_items and e_items:
+        shift = (t_items[0].indent, e_items[0].indent)
+    merged = [
+        (None if ei is None else e_items[ei], None if ti is None else t_items[ti])
+        for ei, ti in _anchored_join([it.key for it in t_items], [it.key for it in e_items])
+    ]
+
+    first = e_items[0] if e_items else t_items[0]
+    numbers: Optional[List[int]] = None
+    if first.ordered:
+        start = int(first.marker[:-1])
+        lazy = len(e_items) > 1 and all(it.marker == first.marker for it in e_items)
+        numbers = [start if lazy else start + k for k in range(len(merged))]
+    bullet = e_items[0].marker if e_items and not first.ordered else None
+
+    for k, (e_it, t_it) in enumerate(merged):
+        if e_it is not None:
+            marker = e_it.marker if numbers is None else f"{numbers[k]}."
+            _emit_list_item(e_it, marker, ("", ""), out, deep=t_it is None)
+            if t_it is not None:
+                _merge_list_group(
+                    t_it.children, e_it.children, (t_it.indent, e_it.indent), out
+                )
+        else:
+            if numbers is not None:
+                marker = f"{numbers[k]}."
+            else:
+                marker = bullet or t_it.marker
+            _emit_list_item(t_it, marker, shift, out, deep=True)
 
 
 def parse_table(text: str) -> Optional[Tuple[List[str], List[List[str]]]]:
@@ -322,61 +913,546 @@ def is_table_block(text: str) -> bool:
     return parse_table(text) is not None
 
 
+# Header names (normalized) preferred as the join key when a table has them;
+# otherwise the template's first column is the key.
+TABLE_KEY_COLUMNS: Tuple[str, ...] = ()
+
+
+@dataclass
+class ParsedTable:
+    header: List[str]
+    rows: List[List[str]]
+    header_keys: List[str]  # normalized header cells
+    cell_keys: List[List[str]]  # normalized cells, row by row
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["ParsedTable"]:
+        tab = parse_table(text)
+        if tab is None:
+            return None
+        header, rows = tab
+        return cls(
+            header=header,
+            rows=rows,
+            header_keys=[normalize_content(c) for c in header],
+            cell_keys=[[normalize_content(c) for c in row] for row in rows],
+        )
+
+    @property
+    def row_keys(self) -> List[str]:
+        """Normalized cells joined with "|", one per row."""
+        return ["|".join(cells) for cells in self.cell_keys]
+
+    def join_keys(self, column: int) -> List[str]:
+        """Per-row join key: the cell in `column`, or the whole row if that is blank."""
+        keys = []
+        for cells in self.cell_keys:
+            cell = cells[column] if column < len(cells) else ""
+            keys.append(cell if cell else "\0" + "|".join(cells))
+        return keys
+
+
 def merge_tables(
-    template_text: str, existing_text: str
+    template_text: str, existing_text: str, key: Optional[str] = None
 ) -> Tuple[Optional[str], Optional[str]]:
-    """Merge two markdown tables. Returns (merged_text, conflict_or_None)."""
-    t_tab = parse_table(template_text)
-    e_tab = parse_table(existing_text)
+    """Merge two markdown tables. Returns (merged_text, conflict_or_None).
+
+    `key` names the join column; see `_merge_parsed_tables`.
+    """
+    t_tab = ParsedTable.parse(template_text)
+    e_tab = ParsedTable.parse(existing_text)
     if not t_tab or not e_tab:
         return (None, "table_parse_failed")
-    t_header, t_rows = t_tab
-    e_header, e_rows = e_tab
-    if [normalize_content(c) for c in t_header] != [normalize_content(c) for c in e_header]:
+    return _merge_parsed_tables(t_tab, e_tab, key)
+
+
+def _table_columns(
+    t_tab: ParsedTable, e_tab: ParsedTable
+) -> Optional[List[Tuple[str, Optional[int], Optional[int]]]]:
+    """Output columns as (header, template index, existing index), or None.
+
+    Identical headers map by position. Otherwise columns are matched by
+    name, which needs unique names and one header to contain the other;
+    extra existing columns go after the template's.
+    """
+    t_cols, e_cols = t_tab.header_keys, e_tab.header_keys
+    if t_cols == e_cols:
+        return [(h, i, i) for i, h in enumerate(t_tab.header)]
+    t_pos = {c: i for i, c in enumerate(t_cols)}
+    e_pos = {c: i for i, c in enumerate(e_cols)}
+    if len(t_pos) != len(t_cols) or len(e_pos) != len(e_cols):
+        return None
+    if not (t_pos.keys() <= e_pos.keys() or e_pos.keys() <= t_pos.keys()):
+        return None
+    columns = [(h, i, e_pos.get(c)) for i, (h, c) in enumerate(zip(t_tab.header, t_cols))]
+    columns += [(h, None, i) for i, (h, c) in enumerate(zip(e_tab.header, e_cols)) if c not in t_pos]
+    return columns
+
+
+_TABLE_CONFLICTS = {
+    "table_headers_differ": "tables with incompatible headers",
+    "table_key_missing": "tables share no key column",
+}
+
+
+@_profiled("list_table")
+def _merge_parsed_tables(
+    t_tab: ParsedTable, e_tab: ParsedTable, key: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
+    """Hash-join the rows of two tables on a key column, linear in rows.
+
+    The key column is `key`, else the first of TABLE_KEY_COLUMNS present in
+    both headers, else the template's first column. A row the user has
+    edited replaces the template row with the same key; cells for columns
+    only the template has are filled from that row. Row order follows
+    `_anchored_join`.
+
+    If a key repeats on either side (one tool, several commands), rows are
+    matched by their shared cells instead, so none of them is dropped.
+    """
+    columns = _table_columns(t_tab, e_tab)
+    if columns is None:
         return (None, "table_headers_differ")
-    seen = set()
-    merged_rows: List[List[str]] = []
-    for row in t_rows + e_rows:
-        key = "|".join(normalize_content(c) for c in row)
-        if key in seen:
-            continue
-        seen.add(key)
-        merged_rows.append(row)
+    shared = [(ti, ei) for _, ti, ei in columns if ti is not None and ei is not None]
+    names = [normalize_content(key)] if key else list(TABLE_KEY_COLUMNS)
+    by_name = {t_tab.header_keys[ti]: (ti, ei) for ti, ei in reversed(shared)}
+    key_col = next((by_name[n] for n in names if n in by_name), None)
+    if key_col is None:
+        if columns[0][2] is None:
+            return (None, "table_key_missing")
+        key_col = (0, columns[0][2])
+
+    def cell(row: List[str], i: Optional[int]) -> str:
+        return row[i] if i is not None and i < len(row) else ""
+
+    t_keys, e_keys = t_tab.join_keys(key_col[0]), e_tab.join_keys(key_col[1])
+    if len(set(t_keys)) != len(t_keys) or len(set(e_keys)) != len(e_keys):
+        t_keys = ["|".join(cell(cells, ti) for ti, _ in shared) for cells in t_tab.cell_keys]
+        e_keys = ["|".join(cell(cells, ei) for _, ei in shared) for cells in e_tab.cell_keys]
 
     out_lines = []
-    out_lines.append("| " + " | ".join(t_header) + " |")
-    out_lines.append("| " + " | ".join(["---"] * len(t_header)) + " |")
-    for row in merged_rows:
-        # Pad/truncate to header width
-        cells = list(row) + [""] * (len(t_header) - len(row))
-        cells = cells[: len(t_header)]
+    out_lines.append("| " + " | ".join(h for h, _, _ in columns) + " |")
+    out_lines.append("| " + " | ".join(["---"] * len(columns)) + " |")
+    for ei, ti in _anchored_join(t_keys, e_keys):
+        t_row = t_tab.rows[ti] if ti is not None else []
+        e_row = e_tab.rows[ei] if ei is not None else None
+        cells = [
+            cell(e_row, e_i) if e_row is not None and e_i is not None else cell(t_row, t_i)
+            for _, t_i, e_i in columns
+        ]
         out_lines.append("| " + " | ".join(cells) + " |")
     return ("\n".join(out_lines), None)
 
 
 # ---------------------------------------------------------------------------
-# Section merge
+# Normalized sections
 # ---------------------------------------------------------------------------
 
-SIM_KEEP_EXISTING = 0.85
-SIM_HARD_CONFLICT = 0.40
+def _has_body(sec: Section) -> bool:
+    """Whether any line follows the heading (a single blank line counts)."""
+    if sec.span is not None:
+        return sec.span[2] > 0  # MdIndex.span() of no lines is (buf, 0, 0)
+    return bool(sec.content)
+
 
+def _section_block(sec: Section) -> str:
+    """Heading line plus body, exactly as the section reads in its document."""
+    heading = _heading_line(sec)
+    return heading + "\n" + sec.content if _has_body(sec) else heading
 
+
+@dataclass
+class NormalizedSection:
+    """A Section plus its normalized forms, each computed at most once.
+
+    merge_sections, the file-level matchers and the list/table mergers all
+    read these instead of re-normalizing the same text.
+    """
+
+    section: Section
+
+    @cached_property
+    @_profiled("normalize")
+    def norm_title(self) -> str:
+        return normalize_title(self.section.title)
+
+    @cached_property
+    @_profiled("normalize")
+    def norm_content(self) -> str:
+        return normalize_content(self.section.content)
+
+    @cached_property
+    @_profiled("normalize")
+    def content_hash(self) -> str:
+        return hashlib.blake2b(self.norm_content.encode("utf-8"), digest_size=16).hexdigest()
+
+    @cached_property
+    @_profiled("normalize")
+    def list_block(self) -> Optional[ListBlock]:
+        """The body as a list tree if it is a list block, else None."""
+        if not _scan_list(self.section.content)[0]:
+            return None
+        return ListBlock.parse(self.section.content)
+
+    @property
+    def list_items(self) -> Optional[List[Tuple[str, str]]]:
+        """(item, normalized key) pairs if the body is a list block, else None."""
+        block = self.list_block
+        return None if block is None else block.flat()
+
+    @property
+    def is_list(self) -> bool:
+        return self.list_block is not None
+
+    @cached_property
+    @_profiled("normalize")
+    def table(self) -> Optional[ParsedTable]:
+        return ParsedTable.parse(self.section.content)
+
+    @property
+    def is_table(self) -> bool:
+        return self.table is not None
+
+    @cached_property
+    @_profiled("normalize")
+    def is_placeholder(self) -> bool:
+        return is_placeholder_template(self.section.content)
+
+    @cached_property
+    @_profiled("normalize")
+    def title_trigrams(self) -> frozenset:
+        return _title_trigrams(self.norm_title)
+
+    @cached_property
+    @_profiled("normalize")
+    def fingerprint(self) -> List[int]:
+        return _word_sketch(self.norm_content)
+
+    @cached_property
+    @_profiled("normalize")
+    def tree(self) -> Optional[Tuple[Optional[str], List["NormalizedSection"]]]:
+        """(intro, children) if the body splits into child subtrees, else None.
+
+        The body is exactly "\\n".join([intro] + child blocks); `intro` is
+        None when the first child heading directly follows the heading.
+        """
+        sec = self.section
+        if not sec.subsections:
+            return None
+        tail = "\n".join(_section_block(sub) for sub in sec.subsections)
+        body = sec.content
+        if body == tail:
+            intro = None
+        elif body.endswith("\n" + tail):
+            intro = body[: len(body) - len(tail) - 1]
+        else:
+            return None
+        return (intro, [NormalizedSection(sub) for sub in sec.subsections])
+
+
+def normalized(sec: Union[Section, NormalizedSection]) -> NormalizedSection:
+    return sec if isinstance(sec, NormalizedSection) else NormalizedSection(sec)
+
+
+# ---------------------------------------------------------------------------
+# Section pairing (exact and fuzzy title matching)
+# ---------------------------------------------------------------------------
+#
+# Sections pair up on equal normalized titles first. The leftovers on both
+# sides are then matched as renames ("Commit Policy" -> "Commit Rules"):
+# a character-trigram inverted index over the leftover existing titles
+# proposes candidates, each is scored on title trigram overlap (Dice) plus a
+# content fingerprint (word-set Jaccard estimate), and a greedy pass by
+# descending confidence keeps the pairing one-to-one.
+
+FUZZY_MATCH_MIN = 0.55  # confidence needed to treat two titles as a rename
+FUZZY_TITLE_WEIGHT = 0.5  # rest of the confidence comes from the content
+FUZZY_MAX_POSTING = 64  # trigrams shared by more titles carry no signal
+FUZZY_CANDIDATES = 8  # per template title, most shared trigrams first
+FUZZY_SKETCH_SIZE = 64
+
+
+def _title_trigrams(norm_title: str) -> frozenset:
+    padded = f"  {norm_title} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def _word_sketch(norm_content: str) -> List[int]:
+    """Bottom-k hashes of the distinct words of a normalized body."""
+    hashes = {
+        int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big")
+        for w in norm_content.split()
+    }
+    return heapq.nsmallest(FUZZY_SKETCH_SIZE, hashes)
+
+
+def _dice(a: frozenset, b: frozenset) -> float:
+    return 2.0 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+@_profiled("similarity")
+def match_renamed(
+    existing: List[NormalizedSection], template: List[NormalizedSection]
+) -> Dict[int, Tuple[int, float]]:
+    """One-to-one rename matches: template index -> (existing index, confidence).
+
+    Only the FUZZY_CANDIDATES titles sharing the most trigrams are scored, so
+    the cost is close to linear in the number of titles rather than
+    len(existing) * len(template).
+    """
+    if not existing or not template:
+        return {}
+    postings: Dict[str, List[int]] = {}
+    for ei, ne in enumerate(existing):
+        for gram in ne.title_trigrams:
+            postings.setdefault(gram, []).append(ei)
+
+    candidates: List[Tuple[float, int, int]] = []
+    for ti, nt in enumerate(template):
+        shared: Counter = Counter()
+        for gram in nt.title_trigrams:
+            hits = postings.get(gram, ())
+            if len(hits) <= FUZZY_MAX_POSTING:
+                shared.update(hits)
+        for ei, _ in shared.most_common(FUZZY_CANDIDATES):
+            ne = existing[ei]
+            title = _dice(nt.title_trigrams, ne.title_trigrams)
+            if FUZZY_TITLE_WEIGHT * title + (1 - FUZZY_TITLE_WEIGHT) < FUZZY_MATCH_MIN:
+                continue  # cannot reach the threshold even with equal content
+            if not ne.fingerprint or not nt.fingerprint:
+                content = 0.0
+            else:
+                content = _estimate_jaccard(ne.fingerprint, nt.fingerprint)
+            confidence = FUZZY_TITLE_WEIGHT * title + (1 - FUZZY_TITLE_WEIGHT) * content
+            if confidence >= FUZZY_MATCH_MIN:
+                candidates.append((confidence, ti, ei))
+
+    matches: Dict[int, Tuple[int, float]] = {}
+    taken: set = set()
+    for confidence, ti, ei in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        if ti not in matches and ei not in taken:
+            matches[ti] = (ei, confidence)
+            taken.add(ei)
+    return matches
+
+
+def pair_sections(
+    existing: List[NormalizedSection], template: List[NormalizedSection]
+) -> Tuple[Dict[int, int], Dict[int, float]]:
+    """Template index -> existing index, plus the confidence of fuzzy pairs.
+
+    Exact pairs come from the normalized-title lookup (several template
+    sections may share one existing title, as before); the unpaired rest go
+    through `match_renamed`.
+    """
+    e_by_norm = {ns.norm_title: i for i, ns in enumerate(existing)}
+    pairs = {ti: e_by_norm[nt.norm_title] for ti, nt in enumerate(template) if nt.norm_title in e_by_norm}
+    used = set(pairs.values())
+    e_left = [i for i in range(len(existing)) if i not in used]
+    t_left = [i for i in range(len(template)) if i not in pairs]
+    confidence: Dict[int, float] = {}
+    renamed = match_renamed([existing[i] for i in e_left], [template[i] for i in t_left])
+    for tj, (ej, conf) in renamed.items():
+        pairs[t_left[tj]] = e_left[ej]
+        confidence[t_left[tj]] = conf
+    return (pairs, confidence)
+
+
+# ---------------------------------------------------------------------------
+# Section merge
+# ---------------------------------------------------------------------------
+
+@_profiled("merge")
 def merge_sections(
-    existing: Section, template: Section
+    existing: Union[Section, NormalizedSection],
+    template: Union[Section, NormalizedSection],
 ) -> Tuple[Section, Optional[str]]:
     """Merge two sections that share a normalized title.
 
-    Returns (merged_section, conflict_description_or_None).
+    Accepts plain Sections or NormalizedSections (whose cached forms are then
+    reused). Returns (merged_section, conflict_description_or_None). The
+    similarity score that drove the decision is attached as
+    `merged_section.score`.
+
+    Sections whose normalized content hashes match are kept as-is without
+    scoring (tier "hash"); on a typical upgrade that is most of them. When
+    both sides have H3 (and, below them, H4) children, the merge recurses
+    into them instead of scoring the whole body (see `_merge_tree`).
     """
-    sim = similarity(existing.content, template.content)
-    norm_e = normalize_content(existing.content)
-    norm_t = normalize_content(template.content)
+    prof = _PROFILE[0]
+    start = time.perf_counter_ns() if prof is not None else 0
+    ne, nt = normalized(existing), normalized(template)
+    merged, conflicts = _merge_node(ne, nt, ())
+    if prof is not None:
+        prof.sections.append({
+            "title": nt.section.title,
+            "bytes": len(ne.section.content) + len(nt.section.content),
+            "tier": merged.score.tier if merged.score is not None else None,
+            "status": merged.merge_status,
+            "ns": time.perf_counter_ns() - start,
+        })
+    return (merged, "; ".join(conflicts) or None)
+
+
+def _label(path: Tuple[Section, ...]) -> str:
+    """'Section "## A"', or 'Section "## A" > "### B"' for a subtree."""
+    return "Section " + " > ".join(f'"{"#" * sec.level} {sec.title}"' for sec in path)
+
+
+def _merge_node(
+    ne: NormalizedSection, nt: NormalizedSection, parents: Tuple[Section, ...]
+) -> Tuple[Section, List[str]]:
+    """merge_sections() at any depth; returns every conflict in the subtree."""
+    if ne.content_hash == nt.content_hash:
+        score = SimilarityScore(BAND_KEEP, 1.0, "hash")
+    elif ne.tree is not None and nt.tree is not None:
+        return _merge_tree(ne, nt, parents)
+    else:
+        score = score_normalized(ne.norm_content, nt.norm_content)
+    merged, conflict = _merge_bodies(ne, nt, score, _label(parents + (ne.section,)))
+    merged.score = score
+    return (merged, [conflict] if conflict else [])
+
+
+def _merge_tree(
+    ne: NormalizedSection, nt: NormalizedSection, parents: Tuple[Section, ...]
+) -> Tuple[Section, List[str]]:
+    """Merge two sections part by part: intro text, then child subtrees.
+
+    Children pair up by normalized title, then as renames. Unchanged subtrees match on their
+    hash and are kept without scoring, so similarity only runs on the
+    smallest subtrees that differ. Children come in template order; ones only
+    the user has stay right after the sibling they followed.
+
+    If no paired part merged cleanly, the section conflicts as a whole and
+    keeps the user's version. Otherwise a part that conflicts keeps both
+    versions, the template's appended under a note as in Case G: one
+    rewritten subsection in an otherwise matching section is a
+    customization, like a whole section scoring above SIM_HARD_CONFLICT.
+    """
+    existing, template = ne.section, nt.section
+    path = parents + (existing,)
+    e_intro, e_children = ne.tree
+    t_intro, t_children = nt.tree
+    conflicts: List[str] = []
+    scores: List[SimilarityScore] = []
+    clean = 0  # paired parts merged without conflict
+    conflicted: List[Tuple[List[object], str]] = []  # (piece, template text to append)
+
+    # Body pieces as [text, gap]: `gap` pieces get a trailing blank line when
+    # something follows them (merged text, or a block that ended its parent).
+    intro: Optional[List[object]] = None
+    if e_intro is None or t_intro is None:
+        text = e_intro if e_intro is not None else t_intro
+        intro = None if text is None else [text, False]
+    else:
+        merged, found = _merge_node(
+            NormalizedSection(_with_content(existing, e_intro)),
+            NormalizedSection(_with_content(template, t_intro)),
+            parents,
+        )
+        conflicts += found
+        clean += not found
+        scores.append(merged.score)
+        intro = [merged.content, merged.merge_status == "merged"]
+        if found:
+            conflicted.append((intro, t_intro))
+
+    pieces: List[List[object]] = []
+    placed: Dict[int, int] = {}  # existing child index -> position in `pieces`
+    child_pairs, _ = pair_sections(e_children, t_children)
+    for ti, tc in enumerate(t_children):
+        t_last = ti == len(t_children) - 1
+        ei = child_pairs.get(ti)
+        if ei is None:
+            pieces.append([_section_block(tc.section), t_last])
+            continue
+        ec = e_children[ei]
+        merged, found = _merge_node(ec, tc, path)
+        conflicts += found
+        clean += not found
+        if merged.score is not None:
+            scores.append(merged.score)
+        placed[ei] = len(pieces)
+        if merged.merge_status == "kept_existing":
+            pieces.append([_section_block(ec.section), ei == len(e_children) - 1])
+        elif merged.merge_status == "from_template":
+            pieces.append([_section_block(tc.section), t_last])
+        else:
+            pieces.append([_section_block(merged), True])
+        if found:
+            conflicted.append((pieces[-1], tc.section.content))
+
+    for ei, ec in enumerate(e_children):
+        if ei in placed:
+            continue
+        before = [j for j in placed if j < ei]
+        at = placed[max(before)] + 1 if before else 0
+        for j, pos in placed.items():
+            if pos >= at:
+                placed[j] = pos + 1
+        pieces.insert(at, [_section_block(ec.section), ei == len(e_children) - 1])
+        placed[ei] = at
+
+    if clean:
+        for piece, text in conflicted:
+            piece[0] = _append_template_note(piece[0], text)
+            piece[1] = True
+        conflicts = []
+
+    if intro is not None:
+        pieces.insert(0, intro)
+    texts = []
+    for i, (text, gap) in enumerate(pieces):
+        if gap and i < len(pieces) - 1 and not text.endswith("\n"):
+            text += "\n"
+        texts.append(text)
+    body = "\n".join(texts)
+
+    if body == existing.content:
+        merged = _with_content(existing, existing.content, "kept_existing")
+        merged.subsections = existing.subsections
+    elif body == template.content:
+        merged = _with_content(template, template.content, "from_template")
+        merged.subsections = template.subsections
+    else:
+        merged = _with_content(existing, body, "merged")
+    merged.score = min(scores, key=lambda sc: sc.value) if scores else None
+    return (merged, conflicts)
+
+
+def _append_template_note(existing: str, template: str) -> str:
+    """Existing text, then the template's under a "merged from" note (Case G)."""
+    if not existing.strip():
+        return template
+    return existing.rstrip() + "\n\n<!-- merged from framework template -->\n\n" + template.lstrip()
+
+
+def _with_content(sec: Section, content: str, merge_status: str = "") -> Section:
+    """A childless copy of `sec` (same level and heading) with a new body."""
+    return Section(
+        level=sec.level,
+        title=sec.title,
+        content=content,
+        raw_heading=sec.raw_heading,
+        merge_status=merge_status,
+    )
+
+
+def _merge_bodies(
+    ne: NormalizedSection,
+    nt: NormalizedSection,
+    score: SimilarityScore,
+    label: Optional[str] = None,
+) -> Tuple[Section, Optional[str]]:
+    existing, template = ne.section, nt.section
+    norm_e, norm_t = ne.norm_content, nt.norm_content
+    label = label or _label((existing,))
 
     # Case A: nearly identical -> keep existing (preserves user formatting)
-    if sim >= SIM_KEEP_EXISTING:
+    if score.band == BAND_KEEP:
         merged = Section(
-            level=2,
+            level=existing.level,
             title=existing.title,
             content=existing.content,
             subsections=existing.subsections,
@@ -388,7 +1464,7 @@ def merge_sections(
     # Case B: existing fully contained in template -> use template (framework update)
     if norm_e and norm_e in norm_t:
         merged = Section(
-            level=2,
+            level=template.level,
             title=template.title,
             content=template.content,
             subsections=template.subsections,
@@ -400,7 +1476,7 @@ def merge_sections(
     # Case C: template fully contained in existing -> keep existing (user expanded)
     if norm_t and norm_t in norm_e:
         merged = Section(
-            level=2,
+            level=existing.level,
             title=existing.title,
             content=existing.content,
             subsections=existing.subsections,
@@ -410,10 +1486,12 @@ def merge_sections(
         return (merged, None)
 
     # Case D: list blocks -> merge
-    if is_list_block(existing.content) and is_list_block(template.content):
-        merged_text = merge_lists(template.content, existing.content)
+    if ne.is_list and nt.is_list:
+        merged_text = _merge_list_blocks(nt.list_block, ne.list_block)
+        if merged_text == existing.content:
+            return (_with_content(existing, merged_text, "kept_existing"), None)
         merged = Section(
-            level=2,
+            level=template.level,
             title=template.title,
             content=merged_text,
             raw_heading=template.raw_heading,
@@ -421,12 +1499,12 @@ def merge_sections(
         )
         return (merged, None)
 
-    # Case E: table blocks -> merge if headers match
-    if is_table_block(existing.content) and is_table_block(template.content):
-        merged_text, conflict = merge_tables(template.content, existing.content)
+    # Case E: table blocks -> keyed merge if headers are compatible
+    if ne.is_table and nt.is_table:
+        merged_text, conflict = _merge_parsed_tables(nt.table, ne.table)
         if merged_text is not None:
             merged = Section(
-                level=2,
+                level=template.level,
                 title=template.title,
                 content=merged_text,
                 raw_heading=template.raw_heading,
@@ -435,23 +1513,21 @@ def merge_sections(
             return (merged, None)
         return (
             Section(
-                level=2,
+                level=existing.level,
                 title=existing.title,
                 content=existing.content,
                 raw_heading=existing.raw_heading,
                 merge_status="kept_existing",
             ),
-            f'Section "## {existing.title}": tables with incompatible headers',
+            f"{label}: " + _TABLE_CONFLICTS.get(conflict, conflict),
         )
 
     # Case E.5: template is a placeholder skeleton (e.g. "{{PROJECT_PURPOSE}}")
     # and existing has real user content -> keep existing, no conflict.
     # This is the common case when migrating an already-filled CLAUDE.md.
-    if is_placeholder_template(template.content) and not is_placeholder_template(
-        existing.content
-    ):
+    if nt.is_placeholder and not ne.is_placeholder:
         merged = Section(
-            level=2,
+            level=existing.level,
             title=existing.title,
             content=existing.content,
             subsections=existing.subsections,
@@ -461,27 +1537,23 @@ def merge_sections(
         return (merged, None)
 
     # Case F: low similarity -> hard conflict
-    if sim < SIM_HARD_CONFLICT:
+    if score.band == BAND_CONFLICT:
         return (
             Section(
-                level=2,
+                level=existing.level,
                 title=existing.title,
                 content=existing.content,
                 raw_heading=existing.raw_heading,
                 merge_status="kept_existing",
             ),
-            f'Section "## {existing.title}": conflicting content (similarity {sim:.2f})',
+            f"{label}: conflicting content (similarity {score.describe()})",
         )
 
     # Case G: medium similarity, no list/table -> append template content as note
     # (additive — preserves both, doesn't lose info)
-    combined = (
-        existing.content.rstrip()
-        + "\n\n<!-- merged from framework template -->\n\n"
-        + template.content.lstrip()
-    )
+    combined = _append_template_note(existing.content, template.content)
     merged = Section(
-        level=2,
+        level=existing.level,
         title=existing.title,
         content=combined,
         raw_heading=existing.raw_heading,
@@ -494,21 +1566,430 @@ def merge_sections(
 # File-level merge
 # ---------------------------------------------------------------------------
 
+def _heading_line(sec: Section) -> str:
+    return sec.raw_heading or ("#" * sec.level + " " + sec.title)
+
+
+@_profiled("render")
 def _render_section(sec: Section) -> str:
-    heading = sec.raw_heading or ("#" * sec.level + " " + sec.title)
+    heading = _heading_line(sec)
     body = sec.content.rstrip("\n")
     if body:
         return heading + "\n" + body
     return heading
 
 
-def merge_files(existing_text: str, template_text: str) -> Tuple[str, List[str]]:
-    """Merge two CLAUDE.md texts. Returns (merged_text, conflicts)."""
-    e_pre, e_h1, e_h2 = parse_md(existing_text)
-    t_pre, t_h1, t_h2 = parse_md(template_text)
+def _iter_document(preamble: str, sections: Iterable[Section]) -> Iterator[str]:
+    """The rendered document in pieces, one section at a time."""
+    sep = ""
+    if preamble.strip():
+        yield preamble.rstrip()
+        sep = "\n\n"
+    for sec in sections:
+        part = _render_section(sec)
+        if part:
+            yield sep + part
+            sep = "\n\n"
+    yield "\n"
 
-    conflicts: List[str] = []
 
+def _render_document(preamble: str, sections: List[Section]) -> str:
+    return "".join(_iter_document(preamble, sections))
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ParsedDocument:
+    """One input file: raw text, its "\\n" buffer and normalized H2 sections.
+
+    Section spans point into `buf`.
+    """
+
+    text: str
+    buf: str
+    preamble: str
+    h1: List[Section]
+    sections: List[NormalizedSection]
+
+    @classmethod
+    @_profiled("parse")
+    def parse(cls, text: str) -> "ParsedDocument":
+        index = tokenize_md(text)
+        preamble, h1, h2 = parse_index(index)
+        return cls(
+            text=text,
+            buf=index.buf,
+            preamble=preamble,
+            h1=h1,
+            sections=[NormalizedSection(s) for s in h2],
+        )
+
+    @cached_property
+    def sha256(self) -> str:
+        return _sha256(self.text)
+
+
+# ---------------------------------------------------------------------------
+# On-disk cache (compiled templates, merge results)
+# ---------------------------------------------------------------------------
+#
+# The framework template is identical across merges, so its parsed and
+# normalized form is compiled once into JSON and reused. Entries are keyed by
+# the template's sha256 and MERGER_VERSION, so editing the template or
+# upgrading the merger simply misses and recompiles. Merge results (see
+# MergeOutcome) are keyed the same way by both input hashes.
+
+TEMPLATE_CACHE_FORMAT = "merge-claude-md/template"
+RESULT_CACHE_FORMAT = "merge-claude-md/result"
+CACHE_MAX_ENTRIES = 32
+
+
+class MergeCache:
+    """JSON entries under `<root>/<kind>/<key>.json`, written atomically.
+
+    Unreadable or corrupt entries count as misses. Each kind keeps at most
+    CACHE_MAX_ENTRIES files (oldest are pruned on write).
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, key + ".json")
+
+    @_profiled("cache")
+    def get(self, kind: str, key: str) -> Optional[Dict[str, object]]:
+        try:
+            with open(self._path(kind, key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        counter = self.hits if isinstance(data, dict) else self.misses
+        counter[kind] = counter.get(kind, 0) + 1
+        return data if isinstance(data, dict) else None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def summary(self) -> str:
+        """One line per run, e.g. "results: 1 hit, 0 miss; templates: 0 hit, 1 miss"."""
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return "; ".join(
+            f"{kind}: {self.hits.get(kind, 0)} hit, {self.misses.get(kind, 0)} miss"
+            for kind in kinds
+        )
+
+    @_profiled("cache")
+    def put(self, kind: str, key: str, data: Dict[str, object]) -> None:
+        """Best effort: a cache that can't be written is just a slower run."""
+        directory = os.path.join(self.root, kind)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self._path(kind, key))
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return
+        try:
+            self._prune(directory)
+        except OSError:
+            pass
+
+    def _prune(self, directory: str) -> None:
+        entries = [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".json") and not name.startswith(".tmp-")
+        ]
+        if len(entries) <= CACHE_MAX_ENTRIES:
+            return
+        entries.sort(key=lambda p: os.stat(p).st_mtime)
+        for path in entries[: len(entries) - CACHE_MAX_ENTRIES]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def compile_template(doc: ParsedDocument) -> Dict[str, object]:
+    """Serializable form of a parsed template with all normalized forms."""
+
+    def span(sec: Section) -> List[int]:
+        return [sec.span[1], sec.span[2]]
+
+    def subsections(sec: Section) -> List[Dict[str, object]]:
+        return [
+            {
+                "title": sub.title,
+                "raw_heading": sub.raw_heading,
+                "level": sub.level,
+                "span": span(sub),
+                "subsections": subsections(sub),
+            }
+            for sub in sec.subsections
+        ]
+
+    sections = []
+    for ns in doc.sections:
+        sec = ns.section
+        table = ns.table
+        sections.append({
+            "title": sec.title,
+            "raw_heading": sec.raw_heading,
+            "span": span(sec),
+            "subsections": subsections(sec),
+            "norm_title": ns.norm_title,
+            "norm_content": ns.norm_content,
+            "content_hash": ns.content_hash,
+            "list": None if ns.list_block is None else ns.list_block.to_json(),
+            "table": None if table is None else {
+                "header": table.header,
+                "rows": table.rows,
+                "header_keys": table.header_keys,
+                "cell_keys": table.cell_keys,
+            },
+            "is_placeholder": ns.is_placeholder,
+        })
+    return {
+        "format": TEMPLATE_CACHE_FORMAT,
+        "merger_version": MERGER_VERSION,
+        "sha256": doc.sha256,
+        "preamble_end": len(doc.preamble),
+        "h1": [[s.title, s.raw_heading] for s in doc.h1],
+        "sections": sections,
+    }
+
+
+@_profiled("parse")
+def load_compiled_template(text: str, data: Dict[str, object]) -> ParsedDocument:
+    """Rebuild the ParsedDocument of `text` from `compile_template` output."""
+    buf = _lf_buffer(text)
+
+    def section(entry: Dict[str, object], level: int) -> Section:
+        start, end = entry["span"]
+        return Section(
+            level=level,
+            title=entry["title"],
+            content=None,
+            subsections=[section(sub, sub["level"]) for sub in entry["subsections"]],
+            raw_heading=entry["raw_heading"],
+            span=(buf, start, end),
+        )
+
+    sections = []
+    for entry in data["sections"]:
+        ns = NormalizedSection(section(entry, 2))
+        table = entry["table"]
+        # Pre-fill the cached_property slots so nothing is recomputed.
+        ns.__dict__.update(
+            norm_title=entry["norm_title"],
+            norm_content=entry["norm_content"],
+            content_hash=entry["content_hash"],
+            list_block=None if entry["list"] is None else ListBlock.from_json(entry["list"]),
+            table=None if table is None else ParsedTable(**table),
+            is_placeholder=entry["is_placeholder"],
+        )
+        sections.append(ns)
+    doc = ParsedDocument(
+        text=text,
+        buf=buf,
+        preamble=buf[: data["preamble_end"]],
+        h1=[Section(level=1, title=t, content="", raw_heading=raw) for t, raw in data["h1"]],
+        sections=sections,
+    )
+    doc.__dict__["sha256"] = data["sha256"]
+    return doc
+
+
+@_profiled("parse")
+def parse_template(text: str, cache: Optional[MergeCache] = None) -> ParsedDocument:
+    """ParsedDocument.parse() for templates, through the compiled cache."""
+    if cache is None:
+        return ParsedDocument.parse(text)
+    digest = _sha256(text)
+    key = f"{digest}-v{MERGER_VERSION}"
+    data = cache.get("templates", key)
+    if (
+        data is not None
+        and data.get("format") == TEMPLATE_CACHE_FORMAT
+        and data.get("merger_version") == MERGER_VERSION
+        and data.get("sha256") == digest
+    ):
+        try:
+            return load_compiled_template(text, data)
+        except (KeyError, TypeError, ValueError):
+            pass  # corrupt entry: recompile below
+    doc = ParsedDocument.parse(text)
+    cache.put("templates", key, compile_template(doc))
+    return doc
+
+
+@dataclass
+class MergeDecision:
+    """How one template and/or existing section ends up in the merged file."""
+
+    # "added" | "kept_custom" | "merged" | "kept_existing" | "from_template";
+    # three-way merges also drop sections: "removed" | "skipped"
+    status: str
+    section: Section  # what `merge` writes for this entry (unless dropped)
+    existing_index: Optional[int] = None
+    template_index: Optional[int] = None
+    score: Optional[SimilarityScore] = None
+    conflict: Optional[str] = None
+    # Set when the pair was matched as a rename (see match_renamed).
+    match_confidence: Optional[float] = None
+
+
+@dataclass
+class MergePlan:
+    """Result of one merge pass; rendering and proposals are built from it."""
+
+    existing: ParsedDocument
+    template: ParsedDocument
+    preamble_source: str  # "existing" | "template"
+    decisions: List[MergeDecision]
+    base: Optional[ParsedDocument] = None  # three-way merges only
+    # Sections deliberately left out of the output (three-way merges only):
+    # "removed" — the framework dropped it and the user never edited it;
+    # "skipped" — the user deleted it and the framework did not change it.
+    dropped: List[MergeDecision] = field(default_factory=list)
+
+    @property
+    def preamble(self) -> str:
+        doc = self.existing if self.preamble_source == "existing" else self.template
+        return doc.preamble
+
+    @property
+    def conflicts(self) -> List[str]:
+        return [d.conflict for d in self.decisions if d.conflict]
+
+    def render(self) -> str:
+        return _render_document(self.preamble, [d.section for d in self.decisions])
+
+    def iter_render(self) -> Iterator[str]:
+        """`render()` in pieces, without holding the whole file in memory."""
+        return _iter_document(self.preamble, (d.section for d in self.decisions))
+
+
+# ---------------------------------------------------------------------------
+# Parallel section merges
+# ---------------------------------------------------------------------------
+#
+# With jobs > 1, plan_merge/plan_merge3 hand the section pairs that need
+# merge_sections() to a process pool. Pairs are packed into runs of about
+# equal estimated cost (their body sizes) so one huge section does not
+# serialize a chunk of small ones; results come back in input order, so the
+# plan is identical to a serial one. Small inputs, single-CPU hosts and
+# profiled runs stay serial: below PARALLEL_MIN_COST the pool costs more
+# than it saves.
+
+PARALLEL_MIN_COST = 256 * 1024  # chars of differing section bodies
+PARALLEL_CHUNKS_PER_JOB = 4
+
+
+def _detached(sec: Section) -> Section:
+    """A copy of `sec` that owns its text, so pickling it does not ship the
+    whole document buffer its span points into."""
+    return Section(
+        level=sec.level,
+        title=sec.title,
+        content=sec.content,
+        subsections=[_detached(sub) for sub in sec.subsections],
+        raw_heading=sec.raw_heading,
+        merge_status=sec.merge_status,
+    )
+
+
+def _merge_pair_chunk(chunk: List[Tuple[Section, Section]]) -> List[Tuple[Section, Optional[str]]]:
+    return [merge_sections(existing, template) for existing, template in chunk]
+
+
+def _cost_chunks(costs: List[int], parts: int) -> List[List[int]]:
+    """Runs of consecutive indexes into `costs`, each costing about 1/parts of the total."""
+    target = max(1, sum(costs) // parts)
+    chunks: List[List[int]] = []
+    run: List[int] = []
+    acc = 0
+    for i, cost in enumerate(costs):
+        run.append(i)
+        acc += cost
+        if acc >= target:
+            chunks.append(run)
+            run, acc = [], 0
+    if run:
+        chunks.append(run)
+    return chunks
+
+
+def merge_section_pairs(
+    pairs: List[Tuple[NormalizedSection, NormalizedSection]], jobs: int = 1
+) -> List[Tuple[Section, Optional[str]]]:
+    """merge_sections() over (existing, template) pairs; results in input order.
+
+    Pairs with byte-identical bodies are always merged here (hash tier, no
+    scoring); the rest go to `jobs` worker processes (at most one per CPU)
+    when they add up to at least PARALLEL_MIN_COST.
+    """
+    results: List[Optional[Tuple[Section, Optional[str]]]] = [None] * len(pairs)
+    remote: List[int] = []
+    jobs = min(jobs, os.cpu_count() or 1)
+    if jobs > 1 and _PROFILE[0] is None:
+        remote = [
+            i for i, (ne, nt) in enumerate(pairs) if ne.section.content != nt.section.content
+        ]
+        costs = [len(pairs[i][0].section.content) + len(pairs[i][1].section.content) for i in remote]
+        if len(remote) < 2 or sum(costs) < PARALLEL_MIN_COST:
+            remote = []
+    if remote:
+        chunks = [
+            [remote[j] for j in run] for run in _cost_chunks(costs, jobs * PARALLEL_CHUNKS_PER_JOB)
+        ]
+        payload = [
+            [(_detached(pairs[i][0].section), _detached(pairs[i][1].section)) for i in run]
+            for run in chunks
+        ]
+        with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+            for run, merged in zip(chunks, pool.map(_merge_pair_chunk, payload)):
+                for i, result in zip(run, merged):
+                    results[i] = result
+    for i, (ne, nt) in enumerate(pairs):
+        if results[i] is None:
+            results[i] = merge_sections(ne, nt)
+    return results
+
+
+def _resolve_merges(
+    pending: List[Tuple[MergeDecision, NormalizedSection, NormalizedSection]], jobs: int
+) -> None:
+    """Fill in the decisions plan_merge/plan_merge3 left to merge_sections()."""
+    merged_pairs = merge_section_pairs([(ne, nt) for _, ne, nt in pending], jobs)
+    for (decision, _, _), (merged, conflict) in zip(pending, merged_pairs):
+        decision.status = merged.merge_status
+        decision.section = merged
+        decision.score = merged.score
+        decision.conflict = conflict
+
+
+@_profiled("merge")
+def plan_merge(existing: ParsedDocument, template: ParsedDocument, jobs: int = 1) -> MergePlan:
+    """Decide every output section of merging `template` into `existing`.
+
+    `jobs` > 1 merges paired sections on a process pool (see
+    merge_section_pairs); the plan is the same either way.
+    """
     # Multiple H1 in existing -> structural notice (non-blocking).
     # Many real CLAUDE.md files have a banner-style H1 plus a project H1,
     # or accumulated H1s from older framework iterations. The merger flattens
@@ -517,71 +1998,419 @@ def merge_files(existing_text: str, template_text: str) -> Tuple[str, List[str]]
     # No-op here: parse_md already keeps everything reachable; user can
     # post-edit to dedupe headings if they want.
 
-    # Build lookup from normalized title -> existing section index
-    e_by_norm = {normalize_title(s.title): i for i, s in enumerate(e_h2)}
+    # Pair template sections with existing ones: equal normalized titles,
+    # then renames.
+    e_norm, t_norm = existing.sections, template.sections
+    pairs, renamed = pair_sections(e_norm, t_norm)
     matched_existing_idx: set = set()
 
     # Walk template sections, in template order
-    out_sections: List[Section] = []
-    for t_sec in t_h2:
-        key = normalize_title(t_sec.title)
-        if key in e_by_norm:
-            ei = e_by_norm[key]
+    decisions: List[MergeDecision] = []
+    pending: List[Tuple[MergeDecision, NormalizedSection, NormalizedSection]] = []
+    for ti, nt in enumerate(t_norm):
+        t_sec = nt.section
+        if ti in pairs:
+            ei = pairs[ti]
             matched_existing_idx.add(ei)
-            merged, conflict = merge_sections(e_h2[ei], t_sec)
-            out_sections.append(merged)
-            if conflict:
-                conflicts.append(conflict)
+            decision = MergeDecision(
+                status="merged",
+                section=t_sec,
+                existing_index=ei,
+                template_index=ti,
+                match_confidence=renamed.get(ti),
+            )
+            decisions.append(decision)
+            pending.append((decision, e_norm[ei], nt))
         else:
             t_sec.merge_status = "added"
-            out_sections.append(t_sec)
+            decisions.append(MergeDecision(status="added", section=t_sec, template_index=ti))
 
     # Append existing sections not present in template (custom user sections)
     # Preserve their relative order from the existing file.
-    for i, e_sec in enumerate(e_h2):
+    for i, ne in enumerate(e_norm):
         if i in matched_existing_idx:
             continue
-        e_sec.merge_status = "kept_custom"
-        out_sections.append(e_sec)
+        ne.section.merge_status = "kept_custom"
+        decisions.append(MergeDecision(status="kept_custom", section=ne.section, existing_index=i))
+    _resolve_merges(pending, jobs)
 
     # Choose preamble: prefer existing preamble (user's H1 + any intro text);
     # fall back to template preamble if existing is empty.
-    preamble = e_pre if e_pre.strip() else t_pre
+    preamble_source = "existing" if existing.preamble.strip() else "template"
+    return MergePlan(
+        existing=existing,
+        template=template,
+        preamble_source=preamble_source,
+        decisions=decisions,
+    )
 
-    parts: List[str] = []
-    if preamble.strip():
-        parts.append(preamble.rstrip())
-    for sec in out_sections:
-        parts.append(_render_section(sec))
 
-    merged_text = "\n\n".join(p for p in parts if p) + "\n"
-    return (merged_text, conflicts)
+@_profiled("merge")
+def plan_merge3(
+    existing: ParsedDocument, base: ParsedDocument, template: ParsedDocument, jobs: int = 1
+) -> MergePlan:
+    """Three-way merge: `base` is the template `existing` was installed from.
+
+    Base and template are diffed per section (by content hash) first, so
+    only sections the framework changed are looked at:
+      - unchanged since base -> the existing section, as-is, no scoring
+      - changed, and the user's copy still equals base -> the template's
+      - changed on both sides, or new -> merge_sections()
+      - missing from existing but unchanged since base -> stays deleted
+      - gone from the template -> dropped if the user never edited it,
+        otherwise kept as a custom section
+    Renamed sections (see match_renamed) count as changed; an unedited one
+    takes the template version under its new title. `jobs` as for plan_merge.
+    """
+    e_norm, t_norm = existing.sections, template.sections
+    pairs, renamed = pair_sections(e_norm, t_norm)
+    b_by_norm = {ns.norm_title: ns for ns in base.sections}
+    matched_existing_idx: set = set()
+
+    decisions: List[MergeDecision] = []
+    dropped: List[MergeDecision] = []
+    pending: List[Tuple[MergeDecision, NormalizedSection, NormalizedSection]] = []
+    for ti, nt in enumerate(t_norm):
+        nb = b_by_norm.get(nt.norm_title)
+        changed = nb is None or nb.content_hash != nt.content_hash
+        ei = pairs.get(ti)
+        if ei is None:
+            if changed:
+                nt.section.merge_status = "added"
+                decisions.append(MergeDecision(status="added", section=nt.section, template_index=ti))
+            else:
+                dropped.append(MergeDecision(status="skipped", section=nt.section, template_index=ti))
+            continue
+
+        matched_existing_idx.add(ei)
+        ne = e_norm[ei]
+        if ti in renamed:
+            # The framework renamed it: the user's side is compared against
+            # the base copy under the old title.
+            nb, changed = b_by_norm.get(ne.norm_title), True
+        if not changed:
+            ne.section.merge_status = "kept_existing"
+            decision = MergeDecision(status="kept_existing", section=ne.section)
+        elif nb is not None and ne.content_hash == nb.content_hash:
+            nt.section.merge_status = "from_template"
+            decision = MergeDecision(status="from_template", section=nt.section)
+        else:
+            decision = MergeDecision(status="merged", section=nt.section)
+            pending.append((decision, ne, nt))
+        decision.existing_index, decision.template_index = ei, ti
+        decision.match_confidence = renamed.get(ti)
+        decisions.append(decision)
+
+    for i, ne in enumerate(e_norm):
+        if i in matched_existing_idx:
+            continue
+        nb = b_by_norm.get(ne.norm_title)
+        if nb is not None and nb.content_hash == ne.content_hash:
+            dropped.append(MergeDecision(status="removed", section=ne.section, existing_index=i))
+            continue
+        ne.section.merge_status = "kept_custom"
+        decisions.append(MergeDecision(status="kept_custom", section=ne.section, existing_index=i))
+    _resolve_merges(pending, jobs)
+
+    preamble_source = "existing" if existing.preamble.strip() else "template"
+    return MergePlan(
+        existing=existing,
+        template=template,
+        preamble_source=preamble_source,
+        decisions=decisions,
+        base=base,
+        dropped=dropped,
+    )
+
+
+def merge_files(existing_text: str, template_text: str, jobs: int = 1) -> Tuple[str, List[str]]:
+    """Merge two CLAUDE.md texts. Returns (merged_text, conflicts)."""
+    plan = plan_merge(ParsedDocument.parse(existing_text), ParsedDocument.parse(template_text), jobs)
+    return (plan.render(), plan.conflicts)
+
+
+@dataclass
+class MergeOutcome:
+    """What merge/check/auto/batch report: merged text, conflicts, status counts.
+
+    `plan` is None when the outcome was served from the result cache; callers
+    that need decisions (proposals) re-plan in that case. The merged text is
+    rendered on first use, so `chunks()` can stream it instead.
+    """
+
+    conflicts: List[str]
+    sections: Dict[str, int]
+    plan: Optional[MergePlan] = None
+    text: Optional[str] = None  # rendered merge, filled in lazily from `plan`
+    profile: Optional[Dict[str, object]] = None  # MergeProfile.report(), if asked for
+
+    @property
+    def cached(self) -> bool:
+        return self.plan is None
+
+    @property
+    def merged(self) -> Optional[str]:
+        """The merged file, or None when there are conflicts."""
+        if self.conflicts:
+            return None
+        if self.text is None:
+            self.text = self.plan.render()
+        return self.text
+
+    def chunks(self) -> Iterable[str]:
+        """The merged file in pieces (see MergePlan.iter_render)."""
+        if self.text is None and self.plan is not None and not self.conflicts:
+            return self.plan.iter_render()
+        return [self.merged]
+
+    @classmethod
+    def from_plan(cls, plan: MergePlan) -> "MergeOutcome":
+        return cls(conflicts=plan.conflicts, sections=_status_counts(plan), plan=plan)
+
+
+def _status_counts(plan: MergePlan) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for d in plan.decisions + plan.dropped:
+        counts[d.status] = counts.get(d.status, 0) + 1
+    return counts
+
+
+def plan_for(
+    existing_text: str,
+    template_text: str,
+    cache: Optional[MergeCache] = None,
+    base_text: Optional[str] = None,
+    jobs: int = 1,
+) -> MergePlan:
+    """plan_merge(), or plan_merge3() when the base template is known."""
+    existing = ParsedDocument.parse(existing_text)
+    template = parse_template(template_text, cache)
+    if base_text is None:
+        return plan_merge(existing, template, jobs)
+    return plan_merge3(existing, parse_template(base_text, cache), template, jobs)
+
+
+def _result_key(existing_sha256: str, template_sha256: str, base_sha256: Optional[str]) -> str:
+    if base_sha256 is None:
+        return f"{existing_sha256}-{template_sha256}-v{MERGER_VERSION}"
+    return f"{existing_sha256}-{base_sha256}-{template_sha256}-v{MERGER_VERSION}"
+
+
+def cached_outcome(
+    cache: MergeCache,
+    existing_sha256: str,
+    template_sha256: str,
+    base_sha256: Optional[str] = None,
+) -> Optional[MergeOutcome]:
+    """The stored outcome for this exact set of inputs, or None."""
+    data = cache.get("results", _result_key(existing_sha256, template_sha256, base_sha256))
+    if (
+        data is None
+        or data.get("format") != RESULT_CACHE_FORMAT
+        or data.get("merger_version") != MERGER_VERSION
+        or data.get("existing_sha256") != existing_sha256
+        or data.get("template_sha256") != template_sha256
+        or data.get("base_sha256") != base_sha256
+    ):
+        return None
+    merged, conflicts, sections = data.get("merged"), data.get("conflicts"), data.get("sections")
+    if not (
+        isinstance(conflicts, list)
+        and isinstance(sections, dict)
+        and (isinstance(merged, str) if not conflicts else merged is None)
+    ):
+        return None
+    return MergeOutcome(conflicts=conflicts, sections=sections, text=merged)
+
+
+def store_outcome(cache: MergeCache, outcome: MergeOutcome) -> None:
+    plan = outcome.plan
+    base_sha256 = plan.base.sha256 if plan.base is not None else None
+    cache.put(
+        "results",
+        _result_key(plan.existing.sha256, plan.template.sha256, base_sha256),
+        {
+            "format": RESULT_CACHE_FORMAT,
+            "merger_version": MERGER_VERSION,
+            "existing_sha256": plan.existing.sha256,
+            "template_sha256": plan.template.sha256,
+            "base_sha256": base_sha256,
+            "merged": outcome.merged,
+            "conflicts": outcome.conflicts,
+            "sections": outcome.sections,
+        },
+    )
+
+
+def merge_outcome(
+    existing_text: str,
+    template_text: str,
+    cache: Optional[MergeCache] = None,
+    base_text: Optional[str] = None,
+    profile: bool = False,
+    jobs: int = 1,
+) -> MergeOutcome:
+    """Merge two texts (three with `base_text`), through the result and
+    template caches when given.
+
+    A re-run on unchanged inputs returns the stored outcome without parsing
+    any file. With `profile`, the merge is rendered eagerly and
+    `outcome.profile` holds its MergeProfile report (profiled merges run
+    serially, whatever `jobs` says).
+    """
+    if profile:
+        with profiling() as prof:
+            outcome = merge_outcome(existing_text, template_text, cache, base_text)
+            outcome.merged  # render inside the profile
+        outcome.profile = prof.report()
+        return outcome
+    if cache is not None:
+        outcome = cached_outcome(
+            cache,
+            _sha256(existing_text),
+            _sha256(template_text),
+            None if base_text is None else _sha256(base_text),
+        )
+        if outcome is not None:
+            return outcome
+    plan = plan_for(existing_text, template_text, cache, base_text, jobs)
+    outcome = MergeOutcome.from_plan(plan)
+    if cache is not None:
+        store_outcome(cache, outcome)
+    return outcome
 
 
 # ---------------------------------------------------------------------------
-# Proposal report
+# Overlay merge (several templates, one pass)
 # ---------------------------------------------------------------------------
+#
+# Hybrid installs and the global addendum layer several templates onto one
+# CLAUDE.md. Merging them one at a time re-parses and re-scores the
+# intermediate file once per layer. `overlay` folds the layers into one
+# virtual template instead and merges the existing file against it once.
+#
+# Layers are listed lowest precedence first. A section (by normalized title)
+# is owned by the last layer that defines it; it keeps the position it had
+# in the first layer that introduced it. Sections new in a later layer
+# follow the nearest preceding section that layer shares with the earlier
+# ones (see `_anchored_join`). The preamble comes from the last layer that
+# has one.
 
-def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile: str) -> str:
-    e_pre, e_h1, e_h2 = parse_md(existing_text)
-    t_pre, t_h1, t_h2 = parse_md(template_text)
+@dataclass
+class Overlay:
+    """An overlay merge: the plan against the virtual template, plus provenance.
+
+    `owners[ti]` is the index of the layer that supplied template section
+    `ti` of `plan.template`; `shadowed[ti]` lists lower layers that also
+    defined it and were overridden.
+    """
+
+    plan: MergePlan
+    layers: List[ParsedDocument]
+    owners: List[int]
+    shadowed: List[List[int]]
+
+    def provenance(self) -> List[Dict[str, object]]:
+        """Per output section: title, status and the layer it came from.
+
+        "layer" is None for sections that only the existing file has.
+        """
+        out = []
+        for d in self.plan.decisions + self.plan.dropped:
+            ti = d.template_index
+            out.append({
+                "title": d.section.title,
+                "status": d.status,
+                "layer": None if ti is None else self.owners[ti],
+                "shadowed": [] if ti is None else self.shadowed[ti],
+            })
+        return out
+
+
+def _overlay_keys(doc: ParsedDocument) -> List[str]:
+    """Normalized titles, numbered so repeated titles stay distinct."""
+    seen: Counter = Counter()
+    keys = []
+    for ns in doc.sections:
+        keys.append(f"{ns.norm_title}\0{seen[ns.norm_title]}")
+        seen[ns.norm_title] += 1
+    return keys
+
+
+def overlay_template(
+    layers: List[ParsedDocument],
+) -> Tuple[ParsedDocument, List[int], List[List[int]]]:
+    """Fold `layers` (lowest precedence first) into one virtual template.
+
+    Returns (template, owners, shadowed) as described on Overlay. Section
+    spans still point into each layer's own buffer.
+    """
+    # Entries are (key, section, owner layer, shadowed layers).
+    entries: List[Tuple[str, NormalizedSection, int, List[int]]] = []
+    for li, layer in enumerate(layers):
+        keys = _overlay_keys(layer)
+        folded = []
+        for ei, ti in _anchored_join([e[0] for e in entries], keys):
+            if ti is None:
+                folded.append((keys[ei], layer.sections[ei], li, []))
+            elif ei is None:
+                folded.append(entries[ti])
+            else:
+                _, _, owner, shadowed = entries[ti]
+                folded.append((keys[ei], layer.sections[ei], li, shadowed + [owner]))
+        entries = folded
+
+    top = next((l for l in reversed(layers) if l.preamble.strip()), layers[-1])
+    template = ParsedDocument(
+        text="",
+        buf="",
+        preamble=top.preamble,
+        h1=top.h1,
+        sections=[e[1] for e in entries],
+    )
+    template.__dict__["sha256"] = _sha256("\n".join(l.sha256 for l in layers))
+    return (template, [e[2] for e in entries], [e[3] for e in entries])
+
+
+def plan_overlay(existing: ParsedDocument, layers: List[ParsedDocument]) -> Overlay:
+    """Merge every layer into `existing` in a single plan_merge pass."""
+    template, owners, shadowed = overlay_template(layers)
+    return Overlay(
+        plan=plan_merge(existing, template),
+        layers=layers,
+        owners=owners,
+        shadowed=shadowed,
+    )
 
-    e_by_norm = {normalize_title(s.title): s for s in e_h2}
-    t_by_norm = {normalize_title(s.title): s for s in t_h2}
 
-    added = [t for t in t_h2 if normalize_title(t.title) not in e_by_norm]
-    kept = [e for e in e_h2 if normalize_title(e.title) not in t_by_norm]
+# ---------------------------------------------------------------------------
+# Proposal report
+# ---------------------------------------------------------------------------
 
-    conflicts: List[Tuple[Section, Section, str]] = []
-    common = [
-        (e_by_norm[k], t_by_norm[k])
-        for k in t_by_norm
-        if k in e_by_norm
+def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile: str) -> str:
+    plan = plan_merge(ParsedDocument.parse(existing_text), ParsedDocument.parse(template_text))
+    return render_proposal(plan, exfile, tpfile)
+
+
+@_profiled("render")
+def render_proposal(plan: MergePlan, exfile: str, tpfile: str) -> str:
+    """Markdown proposal report for a merge plan (no re-scoring)."""
+    e_h2 = [ns.section for ns in plan.existing.sections]
+    t_h2 = [ns.section for ns in plan.template.sections]
+    added = [t_h2[d.template_index] for d in plan.decisions if d.status == "added"]
+    kept = [e_h2[d.existing_index] for d in plan.decisions if d.status == "kept_custom"]
+    conflicts: List[Tuple[Section, Section, str]] = [
+        (e_h2[d.existing_index], t_h2[d.template_index], d.conflict)
+        for d in plan.decisions
+        if d.conflict
+    ]
+    renamed = [
+        (e_h2[d.existing_index], t_h2[d.template_index], d.match_confidence)
+        for d in plan.decisions
+        if d.match_confidence is not None
     ]
-    for e_sec, t_sec in common:
-        _, conflict = merge_sections(e_sec, t_sec)
-        if conflict:
-            conflicts.append((e_sec, t_sec, conflict))
+    removed = [e_h2[d.existing_index] for d in plan.dropped if d.status == "removed"]
+    skipped = [t_h2[d.template_index] for d in plan.dropped if d.status == "skipped"]
 
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
     lines: List[str] = []
@@ -590,11 +2419,17 @@ def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile:
     lines.append(f"**Generated:** {now}")
     lines.append(f"**Existing file:** {exfile} (sections: {len(e_h2)})")
     lines.append(f"**Template file:** {tpfile} (sections: {len(t_h2)})")
+    if plan.base is not None:
+        lines.append(f"**Base template:** sections: {len(plan.base.sections)} (three-way merge)")
     lines.append("")
     lines.append("## Summary")
     lines.append("")
     lines.append(f"- {len(added)} sections will be added from framework template")
     lines.append(f"- {len(kept)} sections from your custom CLAUDE.md will be preserved")
+    if renamed:
+        lines.append(f"- {len(renamed)} renamed sections matched by fuzzy title")
+    if removed:
+        lines.append(f"- {len(removed)} unedited sections dropped by the framework will be removed")
     if conflicts:
         lines.append(f"- {len(conflicts)} hard conflict(s) require resolution")
     else:
@@ -609,18 +2444,25 @@ def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile:
             lines.append("")
             lines.append(f"_Detection:_ {desc}")
             lines.append("")
-            lines.append("**Your version (excerpt):**")
-            lines.append("")
-            lines.append("```")
-            lines.append(_excerpt(e_sec.content, 6))
-            lines.append("```")
-            lines.append("")
-            lines.append("**Template version (excerpt):**")
-            lines.append("")
-            lines.append("```")
-            lines.append(_excerpt(t_sec.content, 6))
-            lines.append("```")
-            lines.append("")
+            diff = section_diff(e_sec.content, t_sec.content)
+            if diff is not None:
+                fence = _fence(diff)
+                lines.append("**Your version → template version:**")
+                lines.append("")
+                lines.append(fence + "diff")
+                lines.append(diff.rstrip("\n"))
+                lines.append(fence)
+                lines.append("")
+            else:
+                for label, sec in (("Your version", e_sec), ("Template version", t_sec)):
+                    excerpt = _excerpt(sec.content, 6)
+                    fence = _fence(excerpt)
+                    lines.append(f"**{label} (excerpt):**")
+                    lines.append("")
+                    lines.append(fence)
+                    lines.append(excerpt)
+                    lines.append(fence)
+                    lines.append("")
             lines.append("**Proposed resolution:**")
             lines.append(
                 f'Rename your "## {e_sec.title}" → "## {e_sec.title} (legacy)" and '
@@ -629,6 +2471,13 @@ def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile:
             )
             lines.append("")
 
+    if renamed:
+        lines.append("## Renamed sections")
+        lines.append("")
+        for e_sec, t_sec, confidence in renamed:
+            lines.append(f"- ## {e_sec.title} → ## {t_sec.title} (match confidence {confidence:.2f})")
+        lines.append("")
+
     if added:
         lines.append("## Sections to be added")
         lines.append("")
@@ -643,6 +2492,15 @@ def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile:
             lines.append(f"- ## {sec.title} (from your file)")
         lines.append("")
 
+    if removed or skipped:
+        lines.append("## Sections to be left out")
+        lines.append("")
+        for sec in removed:
+            lines.append(f"- ## {sec.title} (removed from the template, unedited in your file)")
+        for sec in skipped:
+            lines.append(f"- ## {sec.title} (deleted from your file, unchanged in the template)")
+        lines.append("")
+
     lines.append("## To apply this proposal")
     lines.append("")
     lines.append("```bash")
@@ -652,6 +2510,12 @@ def build_proposal(existing_text: str, template_text: str, exfile: str, tpfile:
     return "\n".join(lines)
 
 
+def _fence(text: str) -> str:
+    """A backtick fence longer than any backtick run inside `text`."""
+    longest = max((len(run) for run in re.findall(r"`+", text)), default=0)
+    return "`" * max(3, longest + 1)
+
+
 def _excerpt(text: str, max_lines: int) -> str:
     lines = [l for l in text.splitlines() if l.strip()]
     out = lines[:max_lines]
@@ -660,18 +2524,767 @@ def _excerpt(text: str, max_lines: int) -> str:
     return "\n".join(out) if out else "(empty)"
 
 
+# ---------------------------------------------------------------------------
+# Machine-readable proposal (propose --json / apply-proposal)
+# ---------------------------------------------------------------------------
+#
+# The JSON proposal records every merge decision together with the sha256 of
+# both inputs. Section bodies that come verbatim from an input are stored as
+# char offsets into that input's "\n"-normalized buffer, so apply-proposal
+# only has to verify the hashes and slice — no parsing, no scoring.
+#
+# Conflicts carry a `resolution` the reviewer may edit before applying:
+#   "rename_existing_to_legacy"  template section + "<heading> (legacy)" (default)
+#   "keep_existing"              existing section only
+#   "use_template"               template section only
+
+PROPOSAL_FORMAT = "merge-claude-md/proposal"
+PROPOSAL_FORMAT_VERSION = 1
+RESOLUTIONS = ("rename_existing_to_legacy", "keep_existing", "use_template")
+
+
+class ProposalError(Exception):
+    """A JSON proposal is malformed or no longer matches its inputs."""
+
+
+def _block(sec: Section, doc: Optional[ParsedDocument], source: str) -> Dict[str, object]:
+    """Serialize a section as a heading plus a span into `doc`, if it is one.
+
+    With no `doc` the text is embedded. Template sections are: installers
+    build the proposal from a template in a temp dir that is gone by the time
+    the user applies it.
+    """
+    heading = _heading_line(sec)
+    if doc is not None and sec.span is not None and sec.span[0] is doc.buf:
+        _, start, end = sec.span
+        return {"heading": heading, "source": source, "start": start, "end": end}
+    return {"heading": heading, "text": sec.content}
+
+
+def proposal_to_json(plan: MergePlan, exfile: str, tpfile: str) -> Dict[str, object]:
+    e_h2 = [ns.section for ns in plan.existing.sections]
+    t_h2 = [ns.section for ns in plan.template.sections]
+    entries = []
+    for d in plan.decisions:
+        entry: Dict[str, object] = {
+            "title": d.section.title,
+            "status": d.status,
+            "existing_index": d.existing_index,
+            "template_index": d.template_index,
+            "similarity": (
+                {"band": d.score.band, "value": round(d.score.value, 4), "tier": d.score.tier}
+                if d.score
+                else None
+            ),
+            "conflict": d.conflict,
+            "resolution": RESOLUTIONS[0] if d.conflict else None,
+        }
+        if d.conflict:
+            # Unified diff, your version -> template; None past the cost cap.
+            entry["diff"] = section_diff(
+                e_h2[d.existing_index].content, t_h2[d.template_index].content
+            )
+        if d.existing_index is not None and d.template_index is not None:
+            entry["match"] = (
+                {"kind": "exact", "confidence": 1.0}
+                if d.match_confidence is None
+                else {"kind": "fuzzy", "confidence": round(d.match_confidence, 4)}
+            )
+        if d.existing_index is not None:
+            entry["existing"] = _block(e_h2[d.existing_index], plan.existing, "existing")
+        if d.template_index is not None:
+            entry["template"] = _block(t_h2[d.template_index], None, "template")
+        if d.status == "merged":
+            entry["merged"] = {"heading": _heading_line(d.section), "text": d.section.content}
+        entries.append(entry)
+    preamble_doc = plan.existing if plan.preamble_source == "existing" else plan.template
+    preamble: Dict[str, object] = {
+        "source": plan.preamble_source,
+        "start": 0,
+        "end": len(preamble_doc.preamble),
+    }
+    if plan.preamble_source == "template":
+        preamble["text"] = preamble_doc.preamble
+    return {
+        "format": PROPOSAL_FORMAT,
+        "format_version": PROPOSAL_FORMAT_VERSION,
+        "merger_version": MERGER_VERSION,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "existing": {"path": exfile, "sha256": plan.existing.sha256, "sections": len(e_h2)},
+        "template": {"path": tpfile, "sha256": plan.template.sha256, "sections": len(t_h2)},
+        "base": None if plan.base is None else {
+            "sha256": plan.base.sha256,
+            "sections": len(plan.base.sections),
+        },
+        "preamble": preamble,
+        "sections": entries,
+        # Informational only: apply_proposal renders `sections`.
+        "dropped": [
+            {
+                "title": d.section.title,
+                "status": d.status,
+                "existing_index": d.existing_index,
+                "template_index": d.template_index,
+            }
+            for d in plan.dropped
+        ],
+    }
+
+
+def apply_proposal(proposal: Dict[str, object], existing_text: str,
+                   template_text: Optional[str]) -> str:
+    """Render the merged file described by a JSON proposal.
+
+    Raises ProposalError if the proposal is malformed or either input changed
+    since it was written (sha256 mismatch).
+    """
+    if proposal.get("format") != PROPOSAL_FORMAT:
+        raise ProposalError("not a merge_claude_md proposal")
+    if proposal.get("format_version") != PROPOSAL_FORMAT_VERSION:
+        raise ProposalError(f"unsupported proposal format version {proposal.get('format_version')}")
+    if proposal.get("merger_version") != MERGER_VERSION:
+        raise ProposalError(
+            f"proposal was written by merger version {proposal.get('merger_version')} — rerun propose"
+        )
+
+    buffers: Dict[str, str] = {}
+    for source, text in (("existing", existing_text), ("template", template_text)):
+        expected = proposal[source]["sha256"]
+        if text is None:
+            continue
+        if _sha256(text) != expected:
+            raise ProposalError(f"{source} file changed since the proposal was written — rerun propose")
+        buffers[source] = _lf_buffer(text)
+
+    def body(block: Dict[str, object]) -> str:
+        if "text" in block:
+            return block["text"]
+        source = block["source"]
+        if source not in buffers:
+            raise ProposalError(f"proposal needs the {source} file, which is not available")
+        return buffers[source][block["start"]:block["end"]]
+
+    def section(block: Dict[str, object], suffix: str = "") -> Section:
+        heading = block["heading"]
+        if suffix:
+            heading = heading.rstrip() + suffix
+        return Section(level=2, title="", content=body(block), raw_heading=heading)
+
+    sections: List[Section] = []
+    for entry in proposal["sections"]:
+        status = entry["status"]
+        if entry.get("conflict"):
+            resolution = entry.get("resolution") or RESOLUTIONS[0]
+            if resolution not in RESOLUTIONS:
+                raise ProposalError(f'unknown resolution "{resolution}" for "{entry["title"]}"')
+            if resolution == "keep_existing":
+                sections.append(section(entry["existing"]))
+            elif resolution == "use_template":
+                sections.append(section(entry["template"]))
+            else:
+                sections.append(section(entry["template"]))
+                sections.append(section(entry["existing"], " (legacy)"))
+        elif status == "merged":
+            sections.append(section(entry["merged"]))
+        elif status in ("added", "from_template"):
+            sections.append(section(entry["template"]))
+        elif status in ("kept_existing", "kept_custom"):
+            sections.append(section(entry["existing"]))
+        else:
+            raise ProposalError(f'unknown status "{status}" for "{entry["title"]}"')
+
+    pre = proposal["preamble"]
+    preamble = body(pre) if pre["end"] else ""
+    return _render_document(preamble, sections)
+
+
+# ---------------------------------------------------------------------------
+# Atomic output
+# ---------------------------------------------------------------------------
+
+def _default_file_mode() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@_profiled("write")
+def write_atomic(path: str, chunks: Iterable[str]) -> bool:
+    """Stream `chunks` into `path` atomically. Returns False if `path`
+    already held exactly that text and was left untouched.
+
+    Chunks are compared against the current file as they arrive, so an
+    unchanged merge never rewrites it (mtime and inode stay, file watchers
+    stay quiet). From the first difference on, the matching prefix is copied
+    into a temp file next to `path`, the rest is streamed after it, and the
+    temp file is fsynced and renamed over `path`. Memory stays bounded by the
+    largest chunk. A symlinked `path` has its target replaced.
+    """
+    path = os.path.realpath(path)
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    try:
+        current = open(path, "rb")
+    except FileNotFoundError:
+        current = None
+    out = None
+    tmp = None
+    matched = 0
+
+    def start() -> None:
+        nonlocal out, tmp
+        fd, tmp = tempfile.mkstemp(dir=parent, prefix=".tmp-" + os.path.basename(path) + ".")
+        out = os.fdopen(fd, "wb")
+        if current is None:
+            os.chmod(tmp, _default_file_mode())
+            return
+        os.chmod(tmp, os.fstat(current.fileno()).st_mode & 0o7777)
+        current.seek(0)
+        left = matched
+        while left:
+            block = current.read(min(left, 1 << 16))
+            out.write(block)
+            left -= len(block)
+
+    try:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            if out is None and current is not None and current.read(len(data)) == data:
+                matched += len(data)
+                continue
+            if out is None:
+                start()
+            out.write(data)
+        if out is None:
+            if current is not None and not current.read(1):
+                return False
+            start()
+        out.flush()
+        os.fsync(out.fileno())
+        out.close()
+        os.replace(tmp, path)
+        tmp = None
+    finally:
+        if current is not None:
+            current.close()
+        if tmp is not None:
+            if out is not None:
+                out.close()
+            os.unlink(tmp)
+    try:
+        dirfd = os.open(parent, os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+    except OSError:
+        pass  # not every platform/filesystem can fsync a directory
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Patch output
+# ---------------------------------------------------------------------------
+#
+# `merge --patch` emits a unified diff of the existing file against the merge
+# result instead of the whole result; `apply-patch` applies one in place.
+# Files are compared H2 block by H2 block first, so unchanged sections cost a
+# string comparison. Changed regions get a Myers line diff that gives up
+# after PATCH_MAX_COST edits and replaces the region whole instead, which
+# keeps the cost bounded on huge rewritten sections.
+
+PATCH_CONTEXT = 3
+PATCH_MAX_COST = 1000
+# Conflict diffs in proposals: past either limit a side-by-side excerpt is
+# more readable than a diff anyway.
+PROPOSAL_DIFF_MAX_COST = 200
+PROPOSAL_DIFF_MAX_LINES = 2000
+
+# (tag, i1, i2, j1, j2) as in difflib.SequenceMatcher.get_opcodes()
+Opcode = Tuple[str, int, int, int, int]
+
+
+class PatchError(Exception):
+    """A patch is malformed or does not apply to the given text."""
+
+
+def _split_keepends(text: str) -> List[str]:
+    """Lines of `text` split on "\\n" only, each keeping its "\\n"."""
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _h2_blocks(text: str, lines: List[str]) -> List[str]:
+    """`lines` grouped into preamble + one block per H2 section."""
+    if not lines:
+        return []
+    probe = text.replace("\r\n", "\n") if "\r" in text else text
+    if _OTHER_NEWLINES_RE.search(probe):
+        return ["".join(lines)]  # tokenize_md's line numbers would not match
+    cuts = [i for i, level, _, _ in tokenize_md(text).headings if level == 2 and i > 0]
+    bounds = [0] + cuts + [len(lines)]
+    return ["".join(lines[a:b]) for a, b in zip(bounds, bounds[1:])]
+
+
+def _myers(a: List[str], b: List[str], max_cost: int) -> Optional[List[Opcode]]:
+    """Opcodes turning `a` into `b`, or None if that takes more than `max_cost` edits.
+
+    Greedy O((N+M)D) Myers diff; the saved frontiers make it O(D^2) memory.
+    """
+    n, m = len(a), len(b)
+    v = {1: 0}
+    trace: List[Dict[int, int]] = []
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _myers_opcodes(trace, n, m)
+    return None
+
+
+def _myers_opcodes(trace: List[Dict[int, int]], n: int, m: int) -> List[Opcode]:
+    steps: List[str] = []  # "=", "-", "+" from the end backwards
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            steps.append("=")
+            x, y = x - 1, y - 1
+        if d > 0:
+            steps.append("+" if x == prev_x else "-")
+        x, y = prev_x, prev_y
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for step in reversed(steps):
+        di, dj = (1, 1) if step == "=" else (1, 0) if step == "-" else (0, 1)
+        tag = "equal" if step == "=" else "replace"
+        if opcodes and (opcodes[-1][0] == "equal") == (tag == "equal"):
+            _, i1, _, j1, _ = opcodes[-1]
+            opcodes[-1] = (tag, i1, i + di, j1, j + dj)
+        else:
+            opcodes.append((tag, i, i + di, j, j + dj))
+        i, j = i + di, j + dj
+    return [_opcode(*op) for op in opcodes]
+
+
+def _opcode(tag: str, i1: int, i2: int, j1: int, j2: int) -> Opcode:
+    if tag == "replace" and i1 == i2:
+        tag = "insert"
+    elif tag == "replace" and j1 == j2:
+        tag = "delete"
+    return (tag, i1, i2, j1, j2)
+
+
+def diff_lines(
+    a_text: str, b_text: str, max_cost: Optional[int] = None
+) -> Tuple[List[str], List[str], List[Opcode]]:
+    """(a lines, b lines, opcodes) with bounded cost; see the section comment."""
+    max_cost = PATCH_MAX_COST if max_cost is None else max_cost
+    a, b = _split_keepends(a_text), _split_keepends(b_text)
+    a_blocks, b_blocks = _h2_blocks(a_text, a), _h2_blocks(b_text, b)
+    block_ops = _myers(a_blocks, b_blocks, max_cost)
+    if block_ops is None:
+        block_ops = [_opcode("replace", 0, len(a_blocks), 0, len(b_blocks))]
+
+    def offsets(blocks: List[str]) -> List[int]:
+        out = [0]
+        for block in blocks:
+            out.append(out[-1] + block.count("\n") + (not block.endswith("\n")))
+        return out
+
+    a_at, b_at = offsets(a_blocks), offsets(b_blocks)
+    opcodes: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in block_ops:
+        li1, li2, lj1, lj2 = a_at[i1], a_at[i2], b_at[j1], b_at[j2]
+        if tag == "equal":
+            opcodes.append((tag, li1, li2, lj1, lj2))
+            continue
+        if tag == "replace":
+            inner = _myers(a[li1:li2], b[lj1:lj2], max_cost)
+            if inner is not None:
+                opcodes.extend(
+                    (t, i + li1, ii + li1, j + lj1, jj + lj1) for t, i, ii, j, jj in inner
+                )
+                continue
+        opcodes.append(_opcode("replace", li1, li2, lj1, lj2))
+    return (a, b, opcodes)
+
+
+def _hunks(opcodes: List[Opcode], context: int) -> Iterator[List[Opcode]]:
+    """Opcodes grouped into hunks with `context` lines around each change."""
+    codes: List[Opcode] = []
+    for op in opcodes:
+        if op[1] == op[2] and op[3] == op[4]:
+            continue
+        if op[0] == "equal" and codes and codes[-1][0] == "equal":
+            # diff_lines puts block- and line-level runs side by side.
+            codes[-1] = ("equal", codes[-1][1], op[2], codes[-1][3], op[4])
+            continue
+        codes.append(op)
+    if not any(op[0] != "equal" for op in codes):
+        return
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            if any(op[0] != "equal" for op in group):
+                yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if any(op[0] != "equal" for op in group):
+        yield group
+
+
+def _hunk_range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def make_patch(existing_text: str, merged_text: str, path: str = "CLAUDE.md") -> str:
+    """Unified diff from `existing_text` to `merged_text` ("" if identical).
+
+    Paths get git's a/ b/ prefixes, so `git apply` takes it as well as
+    `apply-patch`.
+    """
+    if existing_text == merged_text:
+        return ""
+    a, b, opcodes = diff_lines(existing_text, merged_text)
+    a_label, b_label = (path, path) if os.path.isabs(path) else (f"a/{path}", f"b/{path}")
+    return _unified(a, b, opcodes, a_label, b_label)
+
+
+def _unified(a: List[str], b: List[str], opcodes: List[Opcode], a_label: str, b_label: str) -> str:
+    out = [f"--- {a_label}\n", f"+++ {b_label}\n"]
+
+    def emit(prefix: str, line: str) -> None:
+        out.append(prefix + line)
+        if not line.endswith("\n"):
+            out.append("\n\\ No newline at end of file\n")
+
+    for group in _hunks(opcodes, PATCH_CONTEXT):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        out.append(f"@@ -{_hunk_range(i1, i2 - i1)} +{_hunk_range(j1, j2 - j1)} @@\n")
+        for tag, si1, si2, sj1, sj2 in group:
+            if tag == "equal":
+                for line in a[si1:si2]:
+                    emit(" ", line)
+                continue
+            for line in a[si1:si2]:
+                emit("-", line)
+            for line in b[sj1:sj2]:
+                emit("+", line)
+    return "".join(out)
+
+
+def section_diff(
+    existing_text: str, template_text: str, max_cost: Optional[int] = None
+) -> Optional[str]:
+    """Unified diff of one conflicting section, your version -> template.
+
+    None when the sections are longer than PROPOSAL_DIFF_MAX_LINES or differ
+    by more than `max_cost` (default PROPOSAL_DIFF_MAX_COST) line edits;
+    proposals show excerpts then.
+    """
+    max_cost = PROPOSAL_DIFF_MAX_COST if max_cost is None else max_cost
+    a, b = _split_keepends(existing_text), _split_keepends(template_text)
+    if len(a) + len(b) > PROPOSAL_DIFF_MAX_LINES:
+        return None
+    opcodes = _myers(a, b, max_cost)
+    if opcodes is None:
+        return None
+    return _unified(a, b, opcodes, "yours", "template")
+
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def apply_patch(text: str, patch: str) -> str:
+    """Apply a `make_patch` diff to `text`. Context must match exactly."""
+    src = _split_keepends(text)
+    out: List[str] = []
+    cursor = 0
+    lines = _split_keepends(patch)
+    pos = 0
+    while pos < len(lines) and not lines[pos].startswith("@@"):
+        pos += 1
+    while pos < len(lines):
+        m = _HUNK_RE.match(lines[pos])
+        if m is None:
+            raise PatchError(f"malformed patch line {pos + 1}: {lines[pos].rstrip()!r}")
+        old_len = 1 if m.group(2) is None else int(m.group(2))
+        new_len = 1 if m.group(4) is None else int(m.group(4))
+        start = int(m.group(1)) - (1 if old_len else 0)
+        old: List[str] = []
+        new: List[str] = []
+        last: Tuple[List[str], ...] = ()
+        pos += 1
+        while pos < len(lines) and not lines[pos].startswith("@@"):
+            line = lines[pos]
+            pos += 1
+            if line.startswith("\\"):
+                for seq in last:
+                    seq[-1] = seq[-1].rstrip("\n")
+                continue
+            body = line[1:] if line != "\n" else line  # blank context, whitespace stripped
+            if line[:1] in (" ", "\n"):
+                last = (old, new)
+            elif line[:1] == "-":
+                last = (old,)
+            elif line[:1] == "+":
+                last = (new,)
+            else:
+                raise PatchError(f"malformed patch line {pos}: {line.rstrip()!r}")
+            for seq in last:
+                seq.append(body)
+        if (len(old), len(new)) != (old_len, new_len):
+            raise PatchError(f"hunk at line {start + 1}: line counts do not match its header")
+        if start < cursor or src[start : start + old_len] != old:
+            raise PatchError(f"hunk at line {start + 1} does not apply (file changed since?)")
+        out.extend(src[cursor:start])
+        out.extend(new)
+        cursor = start + old_len
+    out.extend(src[cursor:])
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Batch merge (many existing files, few templates)
+# ---------------------------------------------------------------------------
+#
+# A manifest is JSON lines: {"existing": path, "template": path, "output": path,
+# "base": path} ("output" optional; without it nothing is written, and it is
+# left untouched when already up to date — see write_atomic. "base" optional;
+# if given and readable the pair is merged three-way, as `merge3`).
+# Each distinct template is read once by the parent and parsed at most once per
+# worker process.
+
+# Per-process template texts, their hashes and parsed templates, keyed by
+# template path.
+_BATCH_TEMPLATES: Dict[str, Optional[str]] = {}
+_BATCH_SHA256: Dict[str, str] = {}
+_BATCH_PARSED: Dict[str, ParsedDocument] = {}
+_BATCH_CACHE: List[Optional[MergeCache]] = [None]
+
+
+def _batch_init(templates: Dict[str, Optional[str]], cache_dir: Optional[str] = None) -> None:
+    _BATCH_TEMPLATES.clear()
+    _BATCH_TEMPLATES.update(templates)
+    _BATCH_SHA256.clear()
+    _BATCH_PARSED.clear()
+    _BATCH_CACHE[0] = MergeCache(cache_dir) if cache_dir else None
+
+
+def _batch_template_text(path: str) -> str:
+    text = _BATCH_TEMPLATES.get(path)
+    if text is None:
+        raise FileNotFoundError(f"template not readable: {path}")
+    return text
+
+
+def _batch_template_sha256(path: str) -> str:
+    digest = _BATCH_SHA256.get(path)
+    if digest is None:
+        digest = _BATCH_SHA256[path] = _sha256(_batch_template_text(path))
+    return digest
+
+
+def _batch_template(path: str) -> ParsedDocument:
+    doc = _BATCH_PARSED.get(path)
+    if doc is None:
+        doc = _BATCH_PARSED[path] = parse_template(_batch_template_text(path), _BATCH_CACHE[0])
+    return doc
+
+
+def _batch_merge_one(index: int, entry: Dict[str, object]) -> Dict[str, object]:
+    result: Dict[str, object] = {
+        "index": index,
+        "existing": entry.get("existing"),
+        "template": entry.get("template"),
+        "output": entry.get("output"),
+    }
+    cache = _BATCH_CACHE[0]
+    base = entry.get("base")
+    if base is not None:
+        result["base"] = base
+        if _BATCH_TEMPLATES.get(base) is None:
+            base = None  # unreadable base: two-way merge, as `auto --base`
+    try:
+        template_sha256 = _batch_template_sha256(entry["template"])
+        with open(entry["existing"], "r", encoding="utf-8") as f:
+            existing_text = f.read()
+        # merge_outcome() inlined so templates are parsed only on a miss.
+        outcome = None
+        if cache is not None:
+            base_sha256 = _batch_template_sha256(base) if base else None
+            outcome = cached_outcome(cache, _sha256(existing_text), template_sha256, base_sha256)
+        if outcome is None:
+            existing = ParsedDocument.parse(existing_text)
+            template = _batch_template(entry["template"])
+            if base:
+                plan = plan_merge3(existing, _batch_template(base), template)
+            else:
+                plan = plan_merge(existing, template)
+            outcome = MergeOutcome.from_plan(plan)
+            if cache is not None:
+                store_outcome(cache, outcome)
+        result["status"] = "conflict" if outcome.conflicts else "merged"
+        result["conflicts"] = outcome.conflicts
+        result["sections"] = outcome.sections
+        if cache is not None:
+            result["cache"] = "hit" if outcome.cached else "miss"
+        if not outcome.conflicts and entry.get("output"):
+            result["written"] = write_atomic(entry["output"], outcome.chunks())
+    except Exception as e:  # noqa: BLE001 — one bad pair must not stop the batch
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def _batch_run_chunk(chunk: List[Tuple[int, Dict[str, object]]]) -> List[Dict[str, object]]:
+    return [_batch_merge_one(i, entry) for i, entry in chunk]
+
+
+def read_manifest(path: str) -> List[Dict[str, object]]:
+    """Parse a JSONL manifest; blank lines and `#` comments are skipped."""
+    entries: List[Dict[str, object]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: invalid JSON: {e}") from None
+            if not isinstance(entry, dict) or "existing" not in entry or "template" not in entry:
+                raise ValueError(f'{path}:{lineno}: entry needs "existing" and "template"')
+            entries.append(entry)
+    return entries
+
+
+def merge_many(
+    entries: List[Dict[str, object]],
+    jobs: int = 1,
+    chunksize: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Iterator[Dict[str, object]]:
+    """Merge every manifest entry; yield one result dict per entry, in order.
+
+    With jobs > 1 the entries are split into chunks and spread over a process
+    pool. Results are yielded in manifest order regardless of which worker
+    finishes first, so the output stream is deterministic. `cache_dir` enables
+    the compiled template cache (see MergeCache).
+    """
+    templates: Dict[str, Optional[str]] = {}
+    for entry in entries:
+        for path in (entry["template"], entry.get("base")):
+            if path is not None and path not in templates:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        templates[path] = f.read()
+                except OSError:
+                    templates[path] = None
+
+    indexed = list(enumerate(entries))
+    if jobs <= 1 or len(indexed) <= 1:
+        _batch_init(templates, cache_dir)
+        for i, entry in indexed:
+            yield _batch_merge_one(i, entry)
+        return
+
+    if not chunksize:
+        chunksize = max(1, -(-len(indexed) // (jobs * 4)))
+    chunks = [indexed[i : i + chunksize] for i in range(0, len(indexed), chunksize)]
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_batch_init, initargs=(templates, cache_dir)
+    ) as pool:
+        for results in pool.map(_batch_run_chunk, chunks):
+            yield from results
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
 
 USAGE = (
     "Usage:\n"
-    "  merge_claude_md.py merge   <existing.md> <template.md>\n"
+    "  merge_claude_md.py merge   <existing.md> <template.md> [--output <merged.md>] [--patch]\n"
     "  merge_claude_md.py check   <existing.md> <template.md>\n"
-    "  merge_claude_md.py propose <existing.md> <template.md>\n"
+    "  merge_claude_md.py merge3  <existing.md> <base.md> <template.md> [--output <merged.md>]\n"
+    "                             [--patch]\n"
+    "  merge_claude_md.py propose <existing.md> <template.md> [--json <proposal.json>]\n"
+    "                             [--format markdown|json]\n"
+    "  merge_claude_md.py apply-proposal <existing.md> <proposal.json>\n"
+    "  merge_claude_md.py apply-patch    <existing.md> <merge.patch>\n"
+    "  merge_claude_md.py auto    <existing.md> <template.md> [--output <merged.md>]\n"
+    "                             [--conflicts <conflicts.json>] [--proposal <proposal.md>]\n"
+    "                             [--proposal-json <proposal.json>]\n"
+    "  merge_claude_md.py overlay <existing.md> <layer1.md> <layer2.md>... [--output <merged.md>]\n"
+    "                             [--provenance <provenance.json>]\n"
+    "  merge_claude_md.py batch   <manifest.jsonl> [--jobs N] [--chunksize N]\n"
+    "                             [--results <results.jsonl>]\n"
+    "Options for merge/check/propose/auto: [--base <base.md>]\n"
+    "Options for merge/merge3/check/propose/auto/overlay/batch: [--cache <dir>]\n"
+    "Options for merge/merge3/check/propose: [--profile [--profile-top N]]\n"
+    "Options for merge/merge3/check/propose/auto: [--jobs N]\n"
 )
 
 
+class _UsageError(Exception):
+    pass
+
+
+def _parse_options(
+    args: List[str], value_opts: Tuple[str, ...] = (), flag_opts: Tuple[str, ...] = ()
+) -> Tuple[List[str], Dict[str, object]]:
+    """Split `args` into positionals and `--option [value]` pairs."""
+    positionals: List[str] = []
+    opts: Dict[str, object] = {}
+    it = iter(args)
+    for arg in it:
+        if arg in value_opts:
+            value = next(it, None)
+            if value is None:
+                raise _UsageError(f"option {arg} needs a value")
+            opts[arg] = value
+        elif arg in flag_opts:
+            opts[arg] = True
+        elif arg.startswith("--"):
+            raise _UsageError(f"unknown option '{arg}'")
+        else:
+            positionals.append(arg)
+    return (positionals, opts)
+
+
+@_profiled("read")
 def _read_file(path: str) -> str:
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -684,32 +3297,260 @@ def _read_file(path: str) -> str:
         sys.exit(1)
 
 
-def main(argv: Optional[List[str]] = None) -> int:
-    argv = argv if argv is not None else sys.argv[1:]
-    if len(argv) < 3:
-        print(USAGE, file=sys.stderr)
+def _write_text(path: str, text: str) -> None:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _write_json(path: str, data: object) -> None:
+    _write_text(path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+
+
+def _proposal_json_path(path: str) -> str:
+    """apply-proposal accepts the markdown report; its JSON sits next to it."""
+    if path.endswith(".md"):
+        return path[: -len(".md")] + ".json"
+    return path
+
+
+def _cmd_apply_proposal(exfile: str, proposal_path: str) -> int:
+    proposal_path = _proposal_json_path(proposal_path)
+    try:
+        with open(proposal_path, "r", encoding="utf-8") as f:
+            proposal = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: file not found: {proposal_path}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error reading proposal {proposal_path}: {e}", file=sys.stderr)
         return 1
 
-    cmd, exfile, tpfile = argv[0], argv[1], argv[2]
-    if cmd not in ("merge", "check", "propose"):
-        print(f"Error: unknown command '{cmd}'", file=sys.stderr)
-        print(USAGE, file=sys.stderr)
+    existing_text = _read_file(exfile)
+    template_text = None
+    tpfile = proposal.get("template", {}).get("path") if isinstance(proposal, dict) else None
+    if tpfile and os.path.exists(tpfile):
+        template_text = _read_file(tpfile)
+    try:
+        merged = apply_proposal(proposal, existing_text, template_text)
+    except (ProposalError, KeyError, TypeError) as e:
+        print(f"Error: cannot apply proposal: {e}", file=sys.stderr)
+        return 1
+    sys.stdout.write(merged)
+    return 0
+
+
+def _write_output(chunks: Iterable[str], opts: Dict[str, object]) -> None:
+    """To `--output` (atomically, skipped if unchanged) or stdout."""
+    if "--output" in opts:
+        write_atomic(opts["--output"], chunks)
+    else:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+
+
+def _cmd_apply_patch(exfile: str, patch_path: str) -> int:
+    existing_text = _read_file(exfile)
+    patch = _read_file(patch_path)
+    try:
+        merged = apply_patch(existing_text, patch)
+    except PatchError as e:
+        print(f"Error: cannot apply patch: {e}", file=sys.stderr)
         return 1
+    write_atomic(exfile, [merged])
+    return 0
+
+
+def _cmd_auto(
+    outcome: MergeOutcome,
+    replan: Callable[[], MergePlan],
+    exfile: str,
+    tpfile: str,
+    opts: Dict[str, object],
+    cache: Optional[MergeCache],
+) -> int:
+    """check + merge + propose from a single outcome; exit codes as for `merge`.
+
+    `replan` is only called when a cached outcome has conflicts and a
+    proposal was asked for.
+    """
+    conflicts = outcome.conflicts
+    if "--conflicts" in opts:
+        report: Dict[str, object] = {
+            "status": "conflict" if conflicts else "merged",
+            "conflicts": conflicts,
+            "sections": outcome.sections,
+        }
+        if cache is not None:
+            report["cache"] = cache.stats()
+        _write_json(opts["--conflicts"], report)
+    if conflicts:
+        for c in conflicts:
+            print(c, file=sys.stderr)
+        if "--proposal" in opts or "--proposal-json" in opts:
+            plan = outcome.plan or replan()
+            if "--proposal" in opts:
+                _write_text(opts["--proposal"], render_proposal(plan, exfile, tpfile))
+            if "--proposal-json" in opts:
+                _write_json(opts["--proposal-json"], proposal_to_json(plan, exfile, tpfile))
+        return 2
+    _write_output(outcome.chunks(), opts)
+    return 0
+
+
+def _int_option(opts: Dict[str, object], name: str, default: Optional[int]) -> Optional[int]:
+    if name not in opts:
+        return default
+    try:
+        value = int(opts[name])
+    except ValueError:
+        raise _UsageError(f"option {name} needs an integer") from None
+    if value < 1:
+        raise _UsageError(f"option {name} must be >= 1")
+    return value
+
+
+def _cache_dir(opts: Dict[str, object]) -> Optional[str]:
+    return opts.get("--cache") or os.environ.get("MERGE_CLAUDE_MD_CACHE_DIR") or None
 
+
+def _cmd_overlay(exfile: str, layer_files: List[str], opts: Dict[str, object]) -> int:
+    """Exit codes as for `merge`."""
+    existing_text = _read_file(exfile)
+    layer_texts = [_read_file(path) for path in layer_files]
+    cache_dir = _cache_dir(opts)
+    cache = MergeCache(cache_dir) if cache_dir else None
+    overlay = plan_overlay(
+        ParsedDocument.parse(existing_text),
+        [parse_template(text, cache) for text in layer_texts],
+    )
+    if cache is not None:
+        print(f"merge cache: {cache.summary()}", file=sys.stderr)
+    plan = overlay.plan
+    conflicts = plan.conflicts
+    if "--provenance" in opts:
+        _write_json(opts["--provenance"], {
+            "status": "conflict" if conflicts else "merged",
+            "existing": exfile,
+            "layers": layer_files,
+            "conflicts": conflicts,
+            "sections": overlay.provenance(),
+        })
+    if conflicts:
+        for c in conflicts:
+            print(c, file=sys.stderr)
+        return 2
+    _write_output(plan.iter_render(), opts)
+    return 0
+
+
+def _cmd_batch(manifest: str, opts: Dict[str, object]) -> int:
+    """Exit 0 if every pair merged, 2 if any had conflicts, 1 on any error."""
+    try:
+        entries = read_manifest(manifest)
+    except FileNotFoundError:
+        print(f"Error: file not found: {manifest}", file=sys.stderr)
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    jobs = _int_option(opts, "--jobs", 1)
+    chunksize = _int_option(opts, "--chunksize", None)
+    cache_dir = _cache_dir(opts)
+    out = open(opts["--results"], "w", encoding="utf-8") if "--results" in opts else sys.stdout
+    statuses = set()
+    cache_counts = Counter()
+    try:
+        for result in merge_many(entries, jobs=jobs, chunksize=chunksize, cache_dir=cache_dir):
+            statuses.add(result["status"])
+            cache_counts[result.get("cache")] += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if cache_dir:
+        print(
+            f"merge cache: results: {cache_counts['hit']} hit, {cache_counts['miss']} miss",
+            file=sys.stderr,
+        )
+    if "error" in statuses:
+        return 1
+    return 2 if "conflict" in statuses else 0
+
+
+# Command -> number of positional arguments.
+_COMMANDS = {
+    "merge": 2,
+    "merge3": 3,
+    "check": 2,
+    "propose": 2,
+    "apply-proposal": 2,
+    "apply-patch": 2,
+    "auto": 2,
+    "overlay": 2,
+    "batch": 1,
+}
+# Commands taking at least, not exactly, that many.
+_VARIADIC_COMMANDS = ("overlay",)
+
+_VALUE_OPTIONS = {
+    "merge": ("--output", "--base", "--cache", "--profile-top", "--jobs"),
+    "merge3": ("--output", "--cache", "--profile-top", "--jobs"),
+    "check": ("--base", "--cache", "--profile-top", "--jobs"),
+    "propose": ("--json", "--format", "--base", "--cache", "--profile-top", "--jobs"),
+    "auto": (
+        "--output", "--conflicts", "--proposal", "--proposal-json", "--base", "--cache", "--jobs",
+    ),
+    "overlay": ("--output", "--provenance", "--cache"),
+    "batch": ("--jobs", "--chunksize", "--results", "--cache"),
+}
+
+
+def _cmd_merge(cmd: str, args: List[str], opts: Dict[str, object]) -> int:
+    """merge, merge3, check, propose and auto."""
+    if cmd == "merge3":
+        exfile, basefile, tpfile = args
+    else:
+        exfile, tpfile = args
+        basefile = opts.get("--base")
+        if basefile and not os.path.exists(basefile):
+            basefile = None
     existing_text = _read_file(exfile)
     template_text = _read_file(tpfile)
+    base_text = _read_file(basefile) if basefile else None
 
     try:
+        jobs = _int_option(opts, "--jobs", 1)
+        fmt = opts.get("--format", "markdown")
+        if fmt not in ("markdown", "json"):
+            raise _UsageError(f"unknown --format '{fmt}' (markdown or json)")
+        cache_dir = _cache_dir(opts)
+        cache = MergeCache(cache_dir) if cache_dir else None
+
+        def replan() -> MergePlan:
+            return plan_for(existing_text, template_text, cache, base_text, jobs)
+
+        if cmd == "propose":
+            plan = replan()
+        else:
+            outcome = merge_outcome(existing_text, template_text, cache, base_text, jobs=jobs)
+        if cache is not None:
+            print(f"merge cache: {cache.summary()}", file=sys.stderr)
+
         if cmd == "check":
-            _, conflicts = merge_files(existing_text, template_text)
+            conflicts = outcome.conflicts
             if conflicts:
                 for c in conflicts:
                     print(c, file=sys.stderr)
                 return 2
             return 0
 
-        if cmd == "merge":
-            merged, conflicts = merge_files(existing_text, template_text)
+        if cmd in ("merge", "merge3"):
+            conflicts = outcome.conflicts
             if conflicts:
                 for c in conflicts:
                     print(c, file=sys.stderr)
@@ -718,14 +3559,26 @@ def main(argv: Optional[List[str]] = None) -> int:
                     file=sys.stderr,
                 )
                 return 2
-            sys.stdout.write(merged)
+            if "--patch" in opts:
+                _write_output([make_patch(existing_text, outcome.merged, exfile)], opts)
+            else:
+                _write_output(outcome.chunks(), opts)
             return 0
 
         if cmd == "propose":
-            report = build_proposal(existing_text, template_text, exfile, tpfile)
-            sys.stdout.write(report)
+            if "--json" in opts or fmt == "json":
+                data = proposal_to_json(plan, exfile, tpfile)
+            if "--json" in opts:
+                _write_json(opts["--json"], data)
+            if fmt == "json":
+                sys.stdout.write(json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+            else:
+                sys.stdout.write(render_proposal(plan, exfile, tpfile))
             return 0
 
+        if cmd == "auto":
+            return _cmd_auto(outcome, replan, exfile, tpfile, opts, cache)
+
     except Exception as e:  # noqa: BLE001
         print(f"Error: {e}", file=sys.stderr)
         return 1
@@ -733,5 +3586,66 @@ def main(argv: Optional[List[str]] = None) -> int:
     return 1
 
 
+_FLAG_OPTIONS = {
+    "merge": ("--patch", "--profile"),
+    "merge3": ("--patch", "--profile"),
+    "check": ("--profile",),
+    "propose": ("--profile",),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+    if not argv:
+        print(USAGE, file=sys.stderr)
+        return 1
+
+    cmd = argv[0]
+    if cmd not in _COMMANDS:
+        print(f"Error: unknown command '{cmd}'", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
+        return 1
+
+    try:
+        args, opts = _parse_options(
+            argv[1:], value_opts=_VALUE_OPTIONS.get(cmd, ()), flag_opts=_FLAG_OPTIONS.get(cmd, ())
+        )
+        if cmd in _VARIADIC_COMMANDS:
+            if len(args) < _COMMANDS[cmd]:
+                raise _UsageError(f"'{cmd}' takes at least {_COMMANDS[cmd]} file arguments")
+        elif len(args) != _COMMANDS[cmd]:
+            raise _UsageError(f"'{cmd}' takes {_COMMANDS[cmd]} file argument(s)")
+        if cmd == "batch":
+            return _cmd_batch(args[0], opts)
+    except _UsageError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
+        return 1
+    if cmd == "apply-proposal":
+        return _cmd_apply_proposal(*args)
+    if cmd == "apply-patch":
+        return _cmd_apply_patch(*args)
+    if cmd == "overlay":
+        try:
+            return _cmd_overlay(args[0], args[1:], opts)
+        except Exception as e:  # noqa: BLE001
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+    top = None
+    try:
+        if "--profile" in opts:
+            top = _int_option(opts, "--profile-top", PROFILE_TOP_N)
+    except _UsageError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if top is None:
+        return _cmd_merge(cmd, args, opts)
+    with profiling() as prof:
+        rc = _cmd_merge(cmd, args, opts)
+    print(json.dumps({"command": cmd, **prof.report(top)}, ensure_ascii=False), file=sys.stderr)
+    return rc
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""Benchmarks for merge_claude_md.py — stdlib only.
+
+Not collected by the test runner; run directly:
+
+    python3 tests/bench_merge_claude_md.py [--sections N] [--repeat N]
+        [--tree-subsections N] [--tree-trials N] [--renames N]
+        [--list-items N] [--table-rows N]
+        [--batch-pairs N] [--batch-sections N] [--workers 1,2,4]
+
+    python3 tests/bench_merge_claude_md.py --suite [--repeat N] [--max-chars N]
+        [--baseline F] [--save-baseline F] [--threshold 0.25]
+        [--linearity-tolerance 0.25]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = REPO_ROOT / "scripts" / "lib" / "merge_claude_md.py"
+
+sys.path.insert(0, str(SCRIPT.parent))
+import merge_claude_md as mm  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Synthetic input
+# ---------------------------------------------------------------------------
+
+_WORDS = (
+    "agent commit policy session context rules snapshot backlog review "
+    "template section merge framework content chapter lesson source "
+    "архитектура проект контент правило задача 🚀 ✅ **bold** `code` _em_ "
+    "(note) [link](url) — x/y; a:b, c.d!"
+).split()
+
+
+def make_doc(sections: int, seed: int, edit_rate: float = 0.0) -> str:
+    """CLAUDE.md-like document: prose, lists and tables under H2/H3."""
+    rng = random.Random(seed)
+    words = lambda n: " ".join(rng.choice(_WORDS) for _ in range(n))  # noqa: E731
+    edit = random.Random(seed + 1)
+    out: List[str] = ["# Project", "", words(30), ""]
+    for i in range(sections):
+        out += [f"## Section {i} {rng.choice(_WORDS)}", ""]
+        kind = i % 3
+        if kind == 0:
+            for _ in range(4):
+                out += [words(40), ""]
+        elif kind == 1:
+            out += [f"- {words(8)}" for _ in range(12)] + [""]
+        else:
+            out += ["| Key | Value |", "| --- | --- |"]
+            out += [f"| k{j} | {words(5)} |" for j in range(10)] + [""]
+        out += [f"### Details {i}", "", words(25), ""]
+    if edit_rate:
+        out = [
+            line + " " + edit.choice(_WORDS) if line and edit.random() < edit_rate else line
+            for line in out
+        ]
+    return "\n".join(out)
+
+
+def make_big_section(subsections: int, seed: int, rewrite: int = -1, edit_rate: float = 0.0) -> str:
+    """One H2 with many H3 subtrees (each with an H4); `rewrite` replaces one H3 body."""
+    rng = random.Random(seed)
+    words = lambda n: " ".join(rng.choice(_WORDS) for _ in range(n))  # noqa: E731
+    edit = random.Random(seed + 1)
+    out: List[str] = ["# Project", "", "## Big", "", words(30), ""]
+    for i in range(subsections):
+        body = [words(40), "", f"#### Notes {i}", "", words(20), ""]  # same rng draws either way
+        if i == rewrite:
+            body = ["rewritten by the user " + " ".join(f"w{j}" for j in range(30)), ""]
+        elif edit_rate:
+            body = [
+                line + " edited" if line and not line.startswith("#") and edit.random() < edit_rate else line
+                for line in body
+            ]
+        out += [f"### Topic {i}", ""] + body
+    return "\n".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Reference implementations
+# ---------------------------------------------------------------------------
+
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_WS_RE = re.compile(r"\s+", re.UNICODE)
+_MD_FORMAT_RE = re.compile(r"[*_`~]+")
+
+
+def regex_normalize_content(text: str) -> str:
+    """The regex-chain normalizer normalize_content() replaced."""
+    t = _MD_FORMAT_RE.sub("", text)
+    t = _PUNCT_RE.sub(" ", t)
+    return _WS_RE.sub(" ", t).strip().lower()
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float, nbytes: int) -> None:
+    mb_s = nbytes / seconds / 1e6 if seconds else float("inf")
+    print(f"{name:<36} {seconds * 1000:9.2f} ms  {mb_s:8.2f} MB/s")
+
+
+def bench_normalize(text: str, repeat: int) -> None:
+    assert regex_normalize_content(text) == mm.normalize_content(text)
+    t_regex = best_of(repeat, lambda: regex_normalize_content(text))
+    t_table = best_of(repeat, lambda: mm.normalize_content(text))
+    report("normalize_content (regex chain)", t_regex, len(text))
+    report("normalize_content (translate)", t_table, len(text))
+    print(f"{'speedup':<36} {t_regex / t_table:9.2f}x")
+
+
+def bench_merge(existing: str, template: str, repeat: int) -> None:
+    nbytes = len(existing) + len(template)
+    report("parse_md (both inputs)", best_of(repeat, lambda: (mm.parse_md(existing), mm.parse_md(template))), nbytes)
+    report("merge_files", best_of(repeat, lambda: mm.merge_files(existing, template)), nbytes)
+
+
+def bench_template_cache(template: str, repeat: int) -> None:
+    """Full parse + normalize vs loading the compiled template."""
+
+    def parse_and_normalize() -> None:
+        for ns in mm.ParsedDocument.parse(template).sections:
+            ns.norm_title, ns.norm_content, ns.content_hash, ns.list_items, ns.table
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mm.parse_template(template, mm.MergeCache(tmp))  # compile
+        report("template parse + normalize", best_of(repeat, parse_and_normalize), len(template))
+        report("template load (compiled cache)",
+               best_of(repeat, lambda: mm.parse_template(template, mm.MergeCache(tmp))), len(template))
+
+
+def bench_result_cache(existing: str, template: str, repeat: int) -> None:
+    """Unchanged sections: hash fast path; re-run: stored result."""
+    nbytes = len(existing) + len(template)
+    report("merge_files (identical inputs)", best_of(repeat, lambda: mm.merge_files(template, template)),
+           2 * len(template))
+    with tempfile.TemporaryDirectory() as tmp:
+        mm.merge_outcome(existing, template, mm.MergeCache(tmp))  # store
+        report("merge_outcome (result cache hit)",
+               best_of(repeat, lambda: mm.merge_outcome(existing, template, mm.MergeCache(tmp))), nbytes)
+
+
+def bench_output(existing: str, template: str, repeat: int) -> None:
+    """write_atomic: streamed vs pre-joined output, and the unchanged-file skip."""
+    plan = mm.plan_merge(mm.ParsedDocument.parse(existing), mm.ParsedDocument.parse(template))
+    merged = plan.render()
+    with tempfile.TemporaryDirectory() as tmp:
+        out = str(Path(tmp) / "CLAUDE.md")
+        for name, chunks in (("joined", lambda: [plan.render()]), ("streamed", plan.iter_render)):
+            Path(out).unlink(missing_ok=True)
+            tracemalloc.start()
+            mm.write_atomic(out, chunks())
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{'write_atomic peak (' + name + ')':<36} {peak / 1e6:9.2f} MB")
+        report("write_atomic (changed)",
+               best_of(repeat, lambda: (Path(out).write_text("x"), mm.write_atomic(out, plan.iter_render()))),
+               len(merged))
+        report("write_atomic (unchanged, skipped)",
+               best_of(repeat, lambda: mm.write_atomic(out, plan.iter_render())), len(merged))
+
+
+def bench_patch(existing: str, template: str, repeat: int) -> None:
+    """merge --patch: diff size and cost, and the cutoff on a rewritten huge section."""
+    merged = mm.merge_files(existing, template)[0]
+    patch = mm.make_patch(existing, merged)
+    report("make_patch", best_of(repeat, lambda: mm.make_patch(existing, merged)), len(merged))
+    print(f"{'patch size / full output':<36} {len(patch) / 1e3:9.1f} KB  "
+          f"{len(merged) / 1e3:8.1f} KB")
+    big = "## Big\n\n" + "".join(f"line {i} {_WORDS[i % len(_WORDS)]}\n" for i in range(20000))
+    rewritten = big.replace("line", "row")
+    report("make_patch (20k-line rewrite, cutoff)",
+           best_of(repeat, lambda: mm.make_patch(big, rewritten)), len(big))
+
+
+def bench_overlay(sections: int, repeat: int) -> None:
+    """Three template layers: one overlay pass vs merging them one by one."""
+    existing = make_doc(sections, seed=1, edit_rate=0.05)
+    layers = [make_doc(sections, seed=1)] + [
+        make_doc(sections // 4, seed=1, edit_rate=rate) for rate in (0.05, 0.1)
+    ]
+
+    def sequential() -> str:
+        text = existing
+        for layer in layers:
+            text = mm.merge_files(text, layer)[0]
+        return text
+
+    def overlay() -> str:
+        return mm.plan_overlay(
+            mm.ParsedDocument.parse(existing), [mm.ParsedDocument.parse(t) for t in layers]
+        ).plan.render()
+
+    nbytes = len(existing) + sum(map(len, layers))
+    report(f"merge_files x{len(layers)} (sequential)", best_of(repeat, sequential), nbytes)
+    report(f"plan_overlay ({len(layers)} layers)", best_of(repeat, overlay), nbytes)
+
+
+def bench_tree(subsections: int, trials: int) -> None:
+    """Whole-body vs subtree merge of one big H2 with a few edited H3s."""
+    flat = lambda ns: mm.Section(level=2, title=ns.section.title, content=ns.section.content)  # noqa: E731
+    t_flat = t_tree = 0.0
+    outcomes = {"flat": Counter(), "tree": Counter()}
+    for trial in range(trials):
+        template = mm.ParsedDocument.parse(make_big_section(subsections, seed=trial))
+        existing = mm.ParsedDocument.parse(make_big_section(
+            subsections, seed=trial, rewrite=trial % subsections, edit_rate=0.02))
+        e, t = existing.sections[0], template.sections[0]
+        for name, args in (("flat", (flat(e), flat(t))), ("tree", (e, t))):
+            start = time.perf_counter()
+            merged, conflict = mm.merge_sections(*args)
+            elapsed = time.perf_counter() - start
+            if name == "flat":
+                t_flat += elapsed
+            else:
+                t_tree += elapsed
+            outcomes[name]["conflict" if conflict else merged.merge_status] += 1
+    nbytes = trials * 2 * len(make_big_section(subsections, seed=0))
+    report(f"merge_sections whole body ({subsections} H3)", t_flat, nbytes)
+    report(f"merge_sections subtrees ({subsections} H3)", t_tree, nbytes)
+    for name, counts in outcomes.items():
+        print(f"{'  outcomes ' + name:<36} {dict(counts)}")
+
+
+def bench_renames(sections: int) -> None:
+    """Trigram-indexed rename matching vs scoring every pair."""
+    rng = random.Random(7)
+    words = lambda n: " ".join(rng.choice(_WORDS) for _ in range(n))  # noqa: E731
+    titles = [f"{words(2)} topic {i} {words(1)}" for i in range(sections)]
+    bodies = [words(30) for _ in range(sections)]
+    sec = lambda t, b: mm.NormalizedSection(mm.Section(level=2, title=t, content=b))  # noqa: E731
+    existing = [sec(t, b) for t, b in zip(titles, bodies)]
+    template = [sec(t.replace("topic", "subject"), b) for t, b in zip(titles, bodies)]
+    for ns in existing + template:
+        ns.title_trigrams, ns.fingerprint
+
+    def all_pairs() -> int:
+        found = 0
+        for nt in template:
+            best = max(
+                mm.FUZZY_TITLE_WEIGHT * mm._dice(nt.title_trigrams, ne.title_trigrams)
+                + (1 - mm.FUZZY_TITLE_WEIGHT) * mm._estimate_jaccard(nt.fingerprint, ne.fingerprint)
+                for ne in existing
+            )
+            found += best >= mm.FUZZY_MATCH_MIN
+        return found
+
+    start = time.perf_counter()
+    matches = mm.match_renamed(existing, template)
+    t_index = time.perf_counter() - start
+    start = time.perf_counter()
+    all_pairs()
+    t_pairs = time.perf_counter() - start
+    correct = sum(1 for ti, (ei, _) in matches.items() if ti == ei)
+    print(f"{'match_renamed (' + str(sections) + ' renames)':<36} {t_index * 1000:9.2f} ms  "
+          f"{correct}/{sections} correct")
+    print(f"{'all-pairs scoring':<36} {t_pairs * 1000:9.2f} ms")
+
+
+def make_checklist(items: int, seed: int, user_rate: float = 0.0) -> str:
+    """A two-level checklist; `user_rate` drops items and adds user ones."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(items):
+        indent = "  " if i % 4 else ""
+        if rng.random() < user_rate:
+            lines.append(f"{indent}- my note {i} {rng.choice(_WORDS)}")
+        if rng.random() >= user_rate:
+            lines.append(f"{indent}- [ ] step {i} {_WORDS[i % len(_WORDS)]}")
+    return "\n".join(lines) + "\n"
+
+
+def bench_lists(items: int, repeat: int) -> None:
+    """Structure-preserving list merge; doubling the input should ~double the time."""
+    timings = []
+    for n in (items, items * 2):
+        template = make_checklist(n, seed=3)
+        existing = make_checklist(n, seed=3, user_rate=0.05)
+        seconds = best_of(repeat, lambda: mm.merge_lists(template, existing))
+        report(f"merge_lists ({n} items)", seconds, len(existing))
+        timings.append(seconds)
+    print(f"{'2x items -> time ratio':<36} {timings[1] / timings[0]:9.2f}x")
+
+
+def make_table(rows: int, seed: int, user_rate: float = 0.0) -> str:
+    """A keyed table; `user_rate` edits rows, adds user rows and drops a column."""
+    rng = random.Random(seed)
+    header = ["Key", "Owner", "Notes"] if user_rate else ["Key", "Owner", "Status", "Notes"]
+    lines = ["| " + " | ".join(header) + " |", "| " + " | ".join(["---"] * len(header)) + " |"]
+    for i in range(rows):
+        cells = {"Key": f"item-{i}", "Owner": _WORDS[i % len(_WORDS)], "Status": "ok",
+                 "Notes": f"{_WORDS[(i * 7) % len(_WORDS)]} {i}"}
+        if rng.random() < user_rate:
+            cells["Notes"] = f"edited {rng.choice(_WORDS)}"
+        lines.append("| " + " | ".join(cells[h] for h in header) + " |")
+        if rng.random() < user_rate:
+            lines.append(f"| mine-{i} | me | {rng.choice(_WORDS)} |")
+    return "\n".join(lines) + "\n"
+
+
+def bench_tables(rows: int, repeat: int) -> None:
+    """Keyed hash-join table merge; doubling the rows should ~double the time."""
+    timings = []
+    for n in (rows, rows * 2):
+        template = make_table(n, seed=4)
+        existing = make_table(n, seed=4, user_rate=0.05)
+        seconds = best_of(repeat, lambda: mm.merge_tables(template, existing))
+        report(f"merge_tables ({n} rows)", seconds, len(existing))
+        timings.append(seconds)
+    print(f"{'2x rows -> time ratio':<36} {timings[1] / timings[0]:9.2f}x")
+
+
+def bench_batch(pairs: int, sections: int, workers: List[int]) -> None:
+    """merge_many throughput (pairs/sec) for each worker count."""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        template = root / "CLAUDE.template.md"
+        template.write_text(make_doc(sections, seed=1), "utf-8")
+        entries = []
+        for i in range(pairs):
+            existing = root / f"CLAUDE.{i}.md"
+            existing.write_text(make_doc(sections, seed=1, edit_rate=0.02 + (i % 5) / 100), "utf-8")
+            entries.append({
+                "existing": str(existing),
+                "template": str(template),
+                "output": str(root / f"CLAUDE.{i}.merged.md"),
+            })
+        for jobs in workers:
+            start = time.perf_counter()
+            done = sum(1 for _ in mm.merge_many(entries, jobs=jobs))
+            elapsed = time.perf_counter() - start
+            print(f"{'merge_many jobs=' + str(jobs):<36} {elapsed * 1000:9.2f} ms  "
+                  f"{done / elapsed:8.2f} pairs/s")
+
+
+# ---------------------------------------------------------------------------
+# Suite: synthetic corpus, baselines, linearity
+# ---------------------------------------------------------------------------
+#
+# `--suite` runs parse/merge/propose over a matrix of seeded synthetic pairs
+# (1 KB .. 10 MB, 10 .. 5000 sections, list/table/fence heavy, light and
+# heavy edits) and records throughput and tracemalloc peak memory.
+# `--save-baseline F` stores the numbers; `--baseline F` compares against
+# them and exits 1 if any metric got worse by more than `--threshold`, or if
+# merge time grows faster than linearly with input size.
+
+@dataclass
+class CorpusSpec:
+    """Shape of one synthetic CLAUDE.md pair; sizes are approximate."""
+
+    name: str
+    sections: int
+    section_chars: int
+    list_density: float = 0.3  # share of body blocks that are lists
+    table_density: float = 0.2
+    fence_density: float = 0.1  # code fences, with "## " lines inside
+    edit_rate: float = 0.05  # share of user lines edited; sections dropped/added at a quarter of it
+
+    @property
+    def chars(self) -> int:
+        return self.sections * self.section_chars
+
+
+def make_pair(spec: CorpusSpec, seed: int = 1) -> Tuple[str, str]:
+    """(existing, template) for `spec`; the same seed gives the same pair."""
+    rng = random.Random(seed)
+    words = lambda n: " ".join(rng.choice(_WORDS) for _ in range(n))  # noqa: E731
+
+    def block() -> List[str]:
+        r = rng.random()
+        if r < spec.list_density:
+            return [f"- {words(6)}" for _ in range(4)]
+        r -= spec.list_density
+        if r < spec.table_density:
+            return ["| Key | Value |", "| --- | --- |"] + [f"| k{j} | {words(4)} |" for j in range(4)]
+        r -= spec.table_density
+        if r < spec.fence_density:
+            return ["```bash", f"## not a heading {words(2)}", words(6), "```"]
+        return [words(25)]
+
+    sections: List[List[str]] = []
+    for i in range(spec.sections):
+        lines = [f"## Section {i} {rng.choice(_WORDS)}", ""]
+        size = 0
+        while size < spec.section_chars:
+            body = block() + [""]
+            lines += body
+            size += sum(len(line) + 1 for line in body)
+        sections.append(lines)
+    template = "\n".join(["# Project", ""] + [line for lines in sections for line in lines])
+
+    edit = random.Random(seed + 1)
+    out = ["# Project", ""]
+    for i, lines in enumerate(sections):
+        if edit.random() < spec.edit_rate / 4:
+            continue  # the user deleted it
+        for line in lines:
+            if line and line[0] not in "#|`" and edit.random() < spec.edit_rate:
+                line += " " + edit.choice(_WORDS)
+            out.append(line)
+        if edit.random() < spec.edit_rate / 4:
+            out += [f"## My notes {i}", "", words(20), ""]
+    return ("\n".join(out), template)
+
+
+SUITE = [
+    CorpusSpec("1kb", sections=10, section_chars=100),
+    CorpusSpec("100kb", sections=100, section_chars=1000),
+    CorpusSpec("1mb", sections=1000, section_chars=1000),
+    CorpusSpec("1mb-lists", sections=1000, section_chars=1000, list_density=0.8, table_density=0.1),
+    CorpusSpec("1mb-tables", sections=1000, section_chars=1000, list_density=0.1, table_density=0.8),
+    CorpusSpec("1mb-fences", sections=1000, section_chars=1000, fence_density=0.6),
+    CorpusSpec("1mb-rewritten", sections=1000, section_chars=1000, edit_rate=0.4),
+    CorpusSpec("10mb", sections=5000, section_chars=2000),
+]
+LINEARITY = [CorpusSpec(f"linear-{n}", sections=n, section_chars=1000) for n in (250, 500, 1000, 2000)]
+SUITE_METRICS = ("parse_s", "merge_s", "propose_s", "peak_mb")
+SUITE_NOISE_FLOOR = {"parse_s": 0.02, "merge_s": 0.02, "propose_s": 0.02, "peak_mb": 1.0}
+
+
+def measure(spec: CorpusSpec, repeat: int, memory: bool = True) -> Dict[str, float]:
+    existing, template = make_pair(spec)
+    result: Dict[str, float] = {"chars": len(existing) + len(template), "sections": spec.sections}
+    result["parse_s"] = best_of(
+        repeat, lambda: (mm.ParsedDocument.parse(existing), mm.ParsedDocument.parse(template))
+    )
+    result["merge_s"] = best_of(repeat, lambda: mm.plan_for(existing, template).render())
+    result["propose_s"] = best_of(
+        repeat, lambda: mm.render_proposal(mm.plan_for(existing, template), "existing", "template")
+    )
+    if memory:
+        tracemalloc.start()
+        mm.plan_for(existing, template).render()
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def growth_exponent(points: List[Tuple[float, float]]) -> float:
+    """Least-squares slope of log(time) over log(size): 1.0 is linear."""
+    xs = [math.log(x) for x, _ in points]
+    ys = [math.log(y) for _, y in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def run_suite(args: argparse.Namespace) -> int:
+    """Exit 0, or 1 on a regression against the baseline or non-linear growth."""
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<16} {'pair':>9} {'parse':>10} {'merge':>10} {'propose':>10} {'peak':>9}")
+    for spec in SUITE:
+        if spec.chars > args.max_chars:
+            continue
+        r = results[spec.name] = measure(spec, 1 if spec.chars >= 5_000_000 else args.repeat)
+        mb = r["chars"] / 1e6
+        print(f"{spec.name:<16} {mb:7.2f}MB "
+              + " ".join(f"{mb / r[k]:6.1f}MB/s" for k in ("parse_s", "merge_s", "propose_s"))
+              + f" {r['peak_mb']:7.1f}MB")
+
+    failed = False
+    points = []
+    for spec in LINEARITY:
+        r = measure(spec, args.repeat, memory=False)
+        points.append((r["chars"], r["merge_s"]))
+    exponent = growth_exponent(points)
+    linear = exponent <= 1 + args.linearity_tolerance
+    failed |= not linear
+    print(f"\nmerge time ~ size^{exponent:.2f} over {points[0][0] / 1e6:.2f}..{points[-1][0] / 1e6:.2f} MB "
+          f"({'ok' if linear else 'NOT LINEAR'}, limit {1 + args.linearity_tolerance:.2f})")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+        for name, r in results.items():
+            for metric in SUITE_METRICS:
+                base = baseline.get(name, {}).get(metric)
+                if not base:
+                    continue
+                change = r[metric] / base - 1
+                if change > args.threshold and r[metric] - base > SUITE_NOISE_FLOOR[metric]:
+                    failed = True
+                    print(f"REGRESSION {name} {metric}: {base:.4g} -> {r[metric]:.4g} (+{change:.0%})")
+        if not failed:
+            print(f"no regressions over {args.threshold:.0%} against {args.baseline}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cases": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.save_baseline}")
+    return 1 if failed else 0
+
+
+def main(argv: List[str] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sections", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--renames", type=int, default=1000)
+    ap.add_argument("--tree-subsections", type=int, default=200)
+    ap.add_argument("--tree-trials", type=int, default=20)
+    ap.add_argument("--list-items", type=int, default=10000)
+    ap.add_argument("--table-rows", type=int, default=10000)
+    ap.add_argument("--batch-pairs", type=int, default=64,
+                    help="pairs for the merge_many throughput run (0 to skip)")
+    ap.add_argument("--batch-sections", type=int, default=40)
+    ap.add_argument("--workers", default="1,2,4",
+                    help="comma-separated worker counts for merge_many")
+    ap.add_argument("--suite", action="store_true",
+                    help="run the synthetic corpus suite instead of the micro benchmarks")
+    ap.add_argument("--baseline", help="suite: compare against this baseline JSON")
+    ap.add_argument("--save-baseline", help="suite: write the results as a baseline JSON")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="suite: allowed slowdown/memory growth per metric (default 0.25)")
+    ap.add_argument("--linearity-tolerance", type=float, default=0.25,
+                    help="suite: allowed growth exponent above 1.0 (default 0.25)")
+    ap.add_argument("--max-chars", type=int, default=12_000_000,
+                    help="suite: skip cases whose files are larger than this")
+    args = ap.parse_args(argv)
+    if args.suite:
+        return run_suite(args)
+
+    template = make_doc(args.sections, seed=1)
+    existing = make_doc(args.sections, seed=1, edit_rate=0.05)
+    print(f"inputs: {len(existing) / 1e6:.2f} MB existing, {len(template) / 1e6:.2f} MB template, "
+          f"{args.sections} sections\n")
+    bench_normalize(existing, args.repeat)
+    print()
+    bench_merge(existing, template, args.repeat)
+    bench_template_cache(template, args.repeat)
+    bench_result_cache(existing, template, args.repeat)
+    bench_output(existing, template, args.repeat)
+    bench_patch(existing, template, args.repeat)
+    bench_overlay(args.sections, args.repeat)
+    print()
+    bench_tree(args.tree_subsections, args.tree_trials)
+    bench_renames(args.renames)
+    bench_lists(args.list_items, args.repeat)
+    bench_tables(args.table_rows, args.repeat)
+    if args.batch_pairs:
+        print()
+        bench_batch(args.batch_pairs, args.batch_sections,
+                    [int(w) for w in args.workers.split(",")])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""Tests for the v4 framework-core utilities — stdlib unittest."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FRAMEWORK_CORE = REPO_ROOT / "archive" / "v4-working-tree" / "src" / "framework-core"
+
+# framework-core imports its modules as top-level packages (utils, tasks).
+sys.path.insert(0, str(FRAMEWORK_CORE))
+from utils import background, cache, git_snapshot, locks, processes, scheduler  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def pid_alive(pid: int) -> bool:
+    """Whether `pid` is running (zombies waiting for a reaper count as gone)."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def stub(name: str, status: str = "success", sleep: float = 0.0, log: list = None, **spec):
+    """A task named `name` declared with `spec`; appends start/end to `log`."""
+    def task():
+        if log is not None:
+            log.append(("start", name))
+        time.sleep(sleep)
+        if log is not None:
+            log.append(("end", name))
+        return {"name": name, "status": status, "result": name.upper()}
+
+    task.__name__ = name
+    return scheduler.declare_task(**spec)(task)
+
+
+def wait_gone(pid: int, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not pid_alive(pid):
+            return True
+        time.sleep(0.02)
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Test cases
+# ---------------------------------------------------------------------------
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "process groups checked via /proc")
+class TestProcesses(unittest.TestCase):
+    def setUp(self):
+        fd, self.pidfile = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.pidfile)
+
+    def spawn_grandchild(self) -> list:
+        # The shell backgrounds a sleep (same process group) and waits on it.
+        return ["sh", "-c", f"sleep 30 & echo $! > {self.pidfile}; wait"]
+
+    def grandchild_pid(self) -> int:
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            text = Path(self.pidfile).read_text().strip()
+            if text:
+                return int(text)
+            time.sleep(0.02)
+        self.fail("grandchild never started")
+
+    def test_result_matches_subprocess_run(self):
+        r = processes.run_command([sys.executable, "-c", "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"])
+        self.assertIsInstance(r, subprocess.CompletedProcess)
+        self.assertEqual((r.returncode, r.stdout, r.stderr), (3, "out\n", "err\n"))
+        with self.assertRaises(subprocess.CalledProcessError):
+            processes.run_command(["false"], check=True)
+
+    def test_timeout_kills_process_group(self):
+        began = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            processes.run_command(self.spawn_grandchild(), timeout=0.5)
+        self.assertLess(time.monotonic() - began, 5)
+        self.assertTrue(wait_gone(self.grandchild_pid()))
+
+    def test_output_is_bounded(self):
+        r = processes.run_command([sys.executable, "-c", "print('x' * 100000)"], max_output=1000)
+        self.assertEqual(r.stdout, "x" * 1000)
+
+    def test_scope_deadline_cancels_running_command(self):
+        def task():
+            try:
+                processes.run_command(self.spawn_grandchild())
+            except subprocess.TimeoutExpired:
+                return "timed out"
+            return "finished"
+
+        scope = processes.TaskScope("slow", timeout=0.5)
+        began = time.monotonic()
+        self.assertEqual(processes.run_in_scope(task, scope), "timed out")
+        self.assertLess(time.monotonic() - began, 5)
+        self.assertTrue(scope.cancelled)
+        self.assertTrue(wait_gone(self.grandchild_pid()))
+        # Nothing new starts in a cancelled scope.
+        with self.assertRaises(subprocess.TimeoutExpired):
+            processes.run_in_scope(lambda: processes.run_command(["true"]), scope)
+
+
+class TestScheduler(unittest.TestCase):
+    def test_dependency_order(self):
+        log = []
+        tasks = [
+            stub("c", log=log, after=["b"]),
+            stub("b", log=log, after=["a"], sleep=0.02),
+            stub("a", log=log, sleep=0.02),
+        ]
+        results, schedule = scheduler.run_task_graph(tasks)
+        self.assertEqual([r["name"] for r in results], ["c", "b", "a"])  # `tasks` order
+        self.assertEqual(log, [("start", "a"), ("end", "a"), ("start", "b"), ("end", "b"),
+                               ("start", "c"), ("end", "c")])
+        self.assertEqual(schedule["tasks"]["c"]["after"], ["b"])
+        self.assertEqual(schedule["critical_path"], ["a", "b", "c"])
+
+    def test_extra_and_missing_dependencies(self):
+        log = []
+        tasks = [stub("a", log=log, after=["not_in_this_run"]), stub("b", log=log)]
+        scheduler.run_task_graph(tasks, max_workers=1, after={"a": ["b"]})
+        self.assertEqual(log[:2], [("start", "b"), ("end", "b")])
+
+    def test_cycle_rejected(self):
+        tasks = [stub("a", after=["b"]), stub("b", after=["a"])]
+        with self.assertRaises(ValueError):
+            scheduler.run_task_graph(tasks)
+
+    def test_needs_input_skips_dependants(self):
+        tasks = [
+            stub("lock", status="needs_input"),
+            stub("check", after=["lock"]),
+            stub("mark", after=["check"]),
+            stub("free"),
+        ]
+        results, schedule = scheduler.run_task_graph(tasks)
+        self.assertEqual([r["name"] for r in results], ["lock", "free"])
+        self.assertEqual(schedule["skipped"], ["check", "mark"])
+
+    def test_errors_skip_dependants_only_when_critical(self):
+        tasks = [
+            stub("critical", status="error", critical=True),
+            stub("after_critical", after=["critical"]),
+            stub("plain", status="error"),
+            stub("after_plain", after=["plain"]),
+        ]
+        results, schedule = scheduler.run_task_graph(tasks)
+        self.assertEqual(schedule["skipped"], ["after_critical"])
+        self.assertIn("after_plain", [r["name"] for r in results])
+
+    def test_raising_task_becomes_error_result(self):
+        def boom():
+            raise RuntimeError("boom")
+
+        results, _ = scheduler.run_task_graph([boom])
+        self.assertEqual(results, [{"name": "boom", "status": "error", "error": "boom"}])
+
+    def test_writers_never_overlap(self):
+        log = []
+        tasks = [
+            stub("w1", log=log, sleep=0.05, writes=["state"]),
+            stub("r1", log=log, sleep=0.05, reads=["state"]),
+            stub("w2", log=log, sleep=0.05, writes=["state"]),
+            stub("r2", log=log, sleep=0.05, reads=["state"]),
+            stub("git1", log=log, sleep=0.05, needs_git=True),
+            stub("other", log=log, sleep=0.05, writes=["elsewhere"]),
+        ]
+        scheduler.run_task_graph(tasks)
+        running = set()
+        for event, name in log:
+            if event == "start":
+                running.add(name)
+                users = running & {"w1", "r1", "w2", "r2"}
+                if users & {"w1", "w2"}:
+                    self.assertEqual(len(users), 1, msg=f"{sorted(users)} overlap")
+            else:
+                running.discard(name)
+        # Readers of the same resource, and unrelated tasks, do overlap.
+        first_end = next(i for i, (event, _) in enumerate(log) if event == "end")
+        self.assertLess(log.index(("start", "other")), first_end)
+        self.assertLess(log.index(("start", "r2")), log.index(("end", "r1")))
+
+    def test_critical_path_and_slack(self):
+        # a -> b -> d and c -> d; a+b (30 ms) is the longer chain into d.
+        deps = {"a": [], "b": ["a"], "c": [], "d": ["b", "c"], "e": []}
+        timings = {"a": (0, 10), "b": (10, 30), "c": (0, 5), "d": (30, 40), "e": (0, 15)}
+        path, length, slack = scheduler._critical_path(list(deps), deps, timings)
+        self.assertEqual(path, ["a", "b", "d"])
+        self.assertEqual(length, 40)
+        self.assertEqual(slack, {"a": 0, "b": 0, "c": 25, "d": 0, "e": 25})
+
+    def test_schedule_report(self):
+        tasks = [stub("slow", sleep=0.1), stub("fast", sleep=0.01), stub("last", after=["slow", "fast"])]
+        _, schedule = scheduler.run_task_graph(tasks)
+        self.assertEqual(schedule["critical_path"], ["slow", "last"])
+        self.assertGreater(schedule["tasks"]["fast"]["slack_ms"], 50)
+        self.assertEqual(schedule["tasks"]["slow"]["slack_ms"], 0)
+        self.assertGreaterEqual(schedule["critical_path_ms"], 100)
+        self.assertEqual((schedule["skipped"], schedule["deferred"]), ([], []))
+
+
+class InTempDir(unittest.TestCase):
+    """Runs each test in a fresh directory (task state paths are relative)."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+
+class TestBudget(unittest.TestCase):
+    def test_budget_cutoff(self):
+        def killable():
+            processes.run_command(["sleep", "5"])
+            return {"name": "killable", "status": "success"}
+
+        killable = scheduler.declare_task(deferrable=True, restartable=True)(killable)
+        tasks = [
+            stub("quick"),
+            killable,
+            stub("kept", sleep=0.3, deferrable=True),
+            stub("later", after=["kept"], deferrable=True),
+            stub("dependent", after=["killable"]),
+        ]
+        began = time.monotonic()
+        results, schedule = scheduler.run_task_graph(tasks, budget_ms=100)
+        self.assertLess(time.monotonic() - began, 2)
+        self.assertEqual(schedule["budget_ms"], 100)
+        # The running restartable task was cancelled; the other one, which
+        # may have side effects, finished here; dependants moved with them.
+        self.assertEqual(schedule["deferred"], ["killable", "later", "dependent"])
+        status = {r["name"]: r["status"] for r in results}
+        self.assertEqual(status, {"quick": "success", "killable": "deferred", "kept": "success",
+                                  "later": "deferred", "dependent": "deferred"})
+
+    def test_no_budget_runs_everything(self):
+        tasks = [stub("slow", sleep=0.05, deferrable=True, restartable=True)]
+        results, schedule = scheduler.run_task_graph(tasks)
+        self.assertEqual((results[0]["status"], schedule["deferred"]), ("success", []))
+        self.assertNotIn("budget_ms", schedule)
+
+
+class TestBackground(InTempDir):
+    def write_state(self, **state):
+        background.BACKGROUND_RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        background.BACKGROUND_RESULTS_FILE.write_text(json.dumps(state), encoding="utf-8")
+
+    def read_state(self):
+        return json.loads(background.BACKGROUND_RESULTS_FILE.read_text(encoding="utf-8"))
+
+    def dead_pid(self):
+        proc = subprocess.Popen(["true"])
+        proc.wait()
+        return proc.pid
+
+    def test_collect_consumes_finished_results(self):
+        self.assertIsNone(background.collect_background_results())
+        self.write_state(status="done", command="cold-start", pid=1, tasks=[{"name": "x"}])
+        self.assertEqual(background.collect_background_results()["tasks"], [{"name": "x"}])
+        self.assertFalse(background.BACKGROUND_RESULTS_FILE.exists())
+        self.assertIsNone(background.collect_background_results())
+
+    def test_collect_leaves_running_worker_alone(self):
+        self.write_state(status="running", command="cold-start", pid=os.getpid(), started="t",
+                         tasks=[], queued=["check_update"])
+        report = background.collect_background_results()
+        self.assertEqual(report, {"status": "running", "command": "cold-start", "started": "t",
+                                  "queued": ["check_update"]})
+        self.assertTrue(background.BACKGROUND_RESULTS_FILE.exists())
+
+    def test_collect_reports_dead_worker_as_lost(self):
+        self.write_state(status="running", command="cold-start", pid=self.dead_pid(), tasks=[],
+                         queued=["export_dialogs"])
+        report = background.collect_background_results()
+        self.assertEqual((report["status"], report["queued"]), ("lost", ["export_dialogs"]))
+        self.assertFalse(background.BACKGROUND_RESULTS_FILE.exists())
+
+    def test_busy_worker_queues_instead_of_dropping(self):
+        self.write_state(status="running", command="cold-start", pid=os.getpid(), tasks=[],
+                         queued=["a"])
+        with mock.patch.object(background.subprocess, "Popen") as popen:
+            self.assertEqual(background.spawn_background("cold-start", ["a", "b"]), os.getpid())
+        popen.assert_not_called()
+        self.assertEqual(self.read_state()["queued"], ["a", "b"])
+
+    def test_spawn_keeps_uncollected_results(self):
+        self.write_state(status="done", command="cold-start", pid=self.dead_pid(), tasks=[{"name": "x"}])
+        with mock.patch.object(background.subprocess, "Popen") as popen:
+            popen.return_value.pid = 4242
+            self.assertEqual(background.spawn_background("cold-start", ["a"]), 4242)
+        state = self.read_state()
+        self.assertEqual((state["status"], state["pid"], state["tasks"]), ("running", 4242, [{"name": "x"}]))
+        self.assertEqual(popen.call_args[0][0][-3:], ["background", "cold-start", "a"])
+
+    def test_worker_runs_queued_tasks(self):
+        self.write_state(status="running", command="cold-start", pid=os.getpid(), tasks=[], queued=[])
+
+        def first():
+            # A later cold-start defers "second" while this worker is busy.
+            background.spawn_background("cold-start", ["second"])
+            return {"name": "first", "status": "success"}
+
+        registry = {"first": first, "second": stub("second")}
+        background.run_background("cold-start", ["first"], registry)
+        state = self.read_state()
+        self.assertEqual(state["status"], "done")
+        self.assertEqual([t["name"] for t in state["tasks"]], ["first", "second"])
+        self.assertEqual(state["queued"], [])
+
+    def test_file_lock_excludes_other_holders(self):
+        with locks.file_lock("dialog"):
+            with self.assertRaises(TimeoutError):
+                with locks.file_lock("dialog", timeout=0.1):
+                    pass
+        with locks.file_lock("dialog", timeout=0.1):
+            pass
+
+
+class TestTaskCache(InTempDir):
+    def setUp(self):
+        super().setUp()
+        self.runs = []
+        Path(".claude").mkdir()
+        Path("policy.md").write_text("v1", encoding="utf-8")
+        Path(".claude/.framework-config").write_text('{"cold_start": {"mode": "a"}}', encoding="utf-8")
+
+    def task(self, writes_input=False):
+        def policy(create=False):
+            self.runs.append("policy")
+            if writes_input:
+                Path("policy.md").write_text(f"run {len(self.runs)}", encoding="utf-8")
+            return {"name": "policy", "status": "success", "result": "POLICY:exists", "duration_ms": 3}
+
+        return scheduler.declare_task(
+            inputs=["file:policy.md", "env:FRAMEWORK_TEST_INPUT", "config:cold_start.mode"]
+        )(policy)
+
+    def run_graph(self, task, read=True):
+        task_cache = cache.TaskCache(read=read)
+        results, _ = scheduler.run_task_graph([task], cache=task_cache)
+        task_cache.save()
+        return results[0], task_cache.stats()
+
+    def test_hit_replays_result(self):
+        task = self.task()
+        first, stats = self.run_graph(task)
+        self.assertNotIn("cached", first)
+        self.assertEqual(stats, {"enabled": True, "hits": 0, "misses": 1})
+        second, stats = self.run_graph(task)
+        self.assertEqual(second, {"name": "policy", "status": "success", "result": "POLICY:exists",
+                                  "cached": True})
+        self.assertEqual(stats, {"enabled": True, "hits": 1, "misses": 0})
+        self.assertEqual(self.runs, ["policy"])
+
+    def test_changed_inputs_invalidate(self):
+        task = self.task()
+        self.run_graph(task)
+        Path("policy.md").write_text("v2, longer", encoding="utf-8")
+        self.assertEqual(self.run_graph(task)[1]["misses"], 1)
+        with mock.patch.dict(os.environ, {"FRAMEWORK_TEST_INPUT": "x"}):
+            self.assertEqual(self.run_graph(task)[1]["misses"], 1)
+        Path(".claude/.framework-config").write_text('{"cold_start": {"mode": "b"}}', encoding="utf-8")
+        self.assertEqual(self.run_graph(task)[1]["misses"], 1)
+        self.assertEqual(self.run_graph(task)[1]["hits"], 1)
+        self.assertEqual(len(self.runs), 4)
+
+    def test_no_cache_runs_but_records(self):
+        task = self.task()
+        self.run_graph(task)
+        _, stats = self.run_graph(task, read=False)
+        self.assertEqual(stats, {"enabled": False, "hits": 0, "misses": 1})
+        self.assertEqual(len(self.runs), 2)
+        self.assertEqual(self.run_graph(task)[1]["hits"], 1)
+
+    def test_run_that_changes_its_inputs_is_not_stored(self):
+        task = self.task(writes_input=True)
+        self.run_graph(task)
+        self.run_graph(task)
+        self.assertEqual(len(self.runs), 2)
+        self.assertFalse(Path(cache.CACHE_FILE).exists())
+
+    def test_partial_arguments_are_part_of_the_key(self):
+        from functools import partial
+
+        task = self.task()
+        self.run_graph(task)
+        self.assertEqual(self.run_graph(partial(task, create=True))[1]["misses"], 1)
+        self.assertEqual(self.run_graph(partial(task, create=True))[1]["hits"], 1)
+
+    def test_project_scanning_tasks_are_not_cached(self):
+        from tasks.config import ensure_project_baseline, init_config
+
+        task_cache = cache.TaskCache()
+        self.assertIsNone(task_cache.fingerprint(ensure_project_baseline))
+        self.assertIsNotNone(task_cache.fingerprint(init_config))
+
+
+class TestGitSnapshot(unittest.TestCase):
+    STATUS = (
+        "# branch.oid 1f2e3d4c\0"
+        "# branch.head main\0"
+        "# branch.upstream origin/main\0"
+        "# branch.ab +2 -1\0"
+        "1 .M N... 100644 100644 100644 aaa bbb src/a file.py\0"
+        "2 R. N... 100644 100644 100644 aaa bbb R100 docs/new name.md\0docs/old name.md\0"
+        "u UU N... 100644 100644 100644 100644 aaa bbb ccc conflict.txt\0"
+        "? notes/\0"
+        "! build.log\0"
+    )
+
+    def test_parse_status(self):
+        status = git_snapshot.parse_status(self.STATUS)
+        self.assertEqual(status[:6], (True, "main", "1f2e3d4c", "origin/main", 2, 1))
+        G = git_snapshot.GitEntry
+        self.assertEqual(status.entries, (
+            G("changed", "src/a file.py", ".", "M", None),
+            G("renamed", "docs/new name.md", "R", ".", "docs/old name.md"),
+            G("unmerged", "conflict.txt", "U", "U", None),
+            G("untracked", "notes/", "?", "?", None),
+            G("ignored", "build.log", "!", "!", None),
+        ))
+        self.assertTrue(git_snapshot.has_staged(status))
+        self.assertTrue(git_snapshot.has_unstaged(status))
+
+    def test_parse_status_unborn_detached_and_untracked_only(self):
+        status = git_snapshot.parse_status("# branch.oid (initial)\0# branch.head (detached)\0? a.txt\0")
+        self.assertEqual(status[:6], (True, "HEAD", None, None, 0, 0))
+        self.assertEqual(len(status.entries), 1)
+        self.assertFalse(git_snapshot.has_staged(status))
+        self.assertFalse(git_snapshot.has_unstaged(status))
+
+    def test_parse_numstat(self):
+        output = "3\t1\tsrc/a.py\0-\t-\timage.png\0" "5\t0\t\0old.md\0new.md\0" "0\t2\tgone.txt\0"
+        self.assertEqual(git_snapshot.parse_numstat(output), git_snapshot.DiffStat(4, 8, 3))
+        self.assertEqual(git_snapshot.parse_numstat(""), git_snapshot.EMPTY_DIFF)
+
+    @unittest.skipIf(shutil.which("git") is None, "git not installed")
+    def test_snapshot_runs_status_once(self):
+        with tempfile.TemporaryDirectory() as d:
+            git = ["git", "-C", d, "-c", "user.name=t", "-c", "user.email=t@t"]
+            subprocess.run(git + ["init", "-q"], check=True)
+            Path(d, "a.txt").write_text("one\ntwo\n", encoding="utf-8")
+            subprocess.run(git + ["add", "a.txt"], check=True)
+            subprocess.run(git + ["commit", "-qm", "init"], check=True)
+            Path(d, "a.txt").write_text("one\n2\nthree\n", encoding="utf-8")
+
+            calls = []
+            real = processes.run_command
+
+            def counting(args, **kwargs):
+                calls.append(args[:2])
+                return real(args, cwd=d, **kwargs)
+
+            snapshot = git_snapshot.GitSnapshot()
+            with mock.patch.object(git_snapshot, "run_command", counting):
+                threads = [threading.Thread(target=snapshot.status) for _ in range(8)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                self.assertEqual(snapshot.diff_stat(), git_snapshot.DiffStat(1, 2, 1))
+                snapshot.diff_stat()
+                self.assertEqual(calls, [["git", "status"], ["git", "diff"]])
+                snapshot.invalidate()
+                self.assertTrue(git_snapshot.has_unstaged(snapshot.status()))
+                self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
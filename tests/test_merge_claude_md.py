@@ -3,11 +3,14 @@
 
 from __future__ import annotations
 
+import json
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
 import unittest
+from unittest import mock
 from pathlib import Path
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
@@ -77,6 +80,39 @@ class TestParser(unittest.TestCase):
         _, h1, _ = mm.parse_md(text)
         self.assertEqual(len(h1), 2)
 
+    def test_tokenizer_indexes_all_levels(self):
+        text = "# T\n\n## A\n\n### A1\n\n```\n### fenced\n```\n\n#### A1a\n"
+        index = mm.tokenize_md(text)
+        self.assertEqual(
+            [(lvl, title) for (_, lvl, title, _) in index.headings],
+            [(1, "T"), (2, "A"), (3, "A1"), (4, "A1a")],
+        )
+
+    def test_content_sliced_from_buffer(self):
+        text = "# T\n\n## A\n\nbody A\n\n### Sub\n\nsub body\n\n## B\n\nbody B\n"
+        _, _, h2 = mm.parse_md(text)
+        self.assertEqual(h2[0].content, "\nbody A\n\n### Sub\n\nsub body\n")
+        self.assertEqual(h2[0].subsections[0].content, "\nsub body\n")
+        self.assertEqual(h2[1].content, "\nbody B")
+        self.assertIs(h2[0].span[0], h2[1].span[0])
+
+    def test_h4_nested_under_h3(self):
+        text = "## A\n\nintro\n#### loose\n### B\n\n#### B1\nx\n#### B2\n### C\n##### deep\n"
+        _, _, h2 = mm.parse_md(text)
+        b, c = h2[0].subsections
+        self.assertEqual([s.title for s in b.subsections], ["B1", "B2"])
+        self.assertEqual(b.subsections[1].content, "")
+        self.assertEqual(c.subsections, [])
+        intro, children = mm.NormalizedSection(h2[0]).tree
+        self.assertEqual(intro, "\nintro\n#### loose")
+        self.assertEqual([c.section.title for c in children], ["B", "C"])
+
+    def test_crlf_matches_splitlines(self):
+        text = "# T\r\n\r\n## A\r\n\r\nline 1\r\nline 2\r\n"
+        pre, _, h2 = mm.parse_md(text)
+        self.assertEqual(pre, "# T\n")
+        self.assertEqual(h2[0].content, "\nline 1\nline 2")
+
 
 class TestNormalization(unittest.TestCase):
     def test_normalize_title_strips_emoji_and_format(self):
@@ -84,6 +120,35 @@ class TestNormalization(unittest.TestCase):
         self.assertEqual(mm.normalize_title("Архитектура"), "архитектура")
         self.assertEqual(mm.normalize_title("Workflow!"), "workflow")
 
+    def test_translate_normalizer_matches_regex_chain(self):
+        import re
+
+        def regex_normalize(text, drop_emoji):
+            if drop_emoji:
+                text = re.sub("[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F1E6-\U0001F1FF]+", "", text)
+            text = re.sub(r"[*_`~]+", "", text)
+            text = re.sub(r"[^\w\s]", " ", text)
+            return re.sub(r"\s+", " ", text).strip().lower()
+
+        samples = [
+            "## 🚀 **Commit** _Policy_ (v2) — «правила»",
+            "Tabs\tand\u00a0nbsp, ❶ dingbat, snake_case, `code`, ~~strike~~",
+            "İstanbul Ⅻ ½ ﬁ e\u0301 \u2028 end.",
+        ]
+        for text in samples:
+            self.assertEqual(mm.normalize_title(text), regex_normalize(text, True))
+            self.assertEqual(mm.normalize_content(text), regex_normalize(text, False))
+
+    def test_normalized_section_caches(self):
+        ns = mm.NormalizedSection(mm.Section(level=2, title="**Tools**", content="- a\n- B!"))
+        self.assertEqual(ns.norm_title, "tools")
+        self.assertEqual(ns.norm_content, "a b")
+        self.assertEqual(ns.list_items, [("a", "a"), ("B!", "b")])
+        self.assertFalse(ns.is_table)
+        self.assertIs(ns.norm_content, ns.norm_content)
+        same = mm.NormalizedSection(mm.Section(level=2, title="x", content="* a\n* b"))
+        self.assertEqual(ns.content_hash, same.content_hash)
+
     def test_similarity_identical(self):
         self.assertGreaterEqual(mm.similarity("hello world", "hello world"), 0.99)
 
@@ -91,13 +156,89 @@ class TestNormalization(unittest.TestCase):
         self.assertLess(mm.similarity("apple", "completely different content"), 0.4)
 
 
+class TestTieredSimilarity(unittest.TestCase):
+    def test_length_tier_decides_conflict(self):
+        score = mm.score_similarity("short", "a much much longer body of text " * 5)
+        self.assertEqual(score.band, mm.BAND_CONFLICT)
+        self.assertEqual(score.tier, "length")
+
+    def test_quick_tier_decides_conflict(self):
+        score = mm.score_similarity("aaaa bbbb cccc", "xxxx yyyy zzzz")
+        self.assertEqual(score.band, mm.BAND_CONFLICT)
+        self.assertEqual(score.tier, "quick")
+
+    def test_exact_tier_when_bounds_inconclusive(self):
+        score = mm.score_similarity("hello world", "hello world")
+        self.assertEqual(score.band, mm.BAND_KEEP)
+        self.assertEqual(score.tier, "exact")
+        self.assertAlmostEqual(score.value, 1.0)
+
+    def test_bands_agree_with_exact_ratio(self):
+        pairs = [
+            ("Do X then Y then Z.", "Do X then Y then Z"),
+            ("apple", "completely different content"),
+            ("one two three four", "one two three five six"),
+            ("", ""),
+            ("text", ""),
+        ]
+        for a, b in pairs:
+            expected = mm._band(mm.similarity(a, b))
+            self.assertEqual(mm.score_similarity(a, b).band, expected, msg=(a, b))
+
+    def test_minhash_tier_for_huge_sections(self):
+        words = [f"w{i}" for i in range(20000)]
+        a = " ".join(words)
+        b = " ".join(words[:-10])
+        score = mm.score_similarity(a, b)
+        self.assertEqual(score.tier, "minhash")
+        self.assertEqual(score.band, mm.BAND_KEEP)
+
+    def test_conflict_message_reports_tier(self):
+        _, conflict = mm.merge_sections(
+            mm.Section(level=2, title="A", content="x"),
+            mm.Section(level=2, title="A", content="a much longer template body"),
+        )
+        self.assertIn("length", conflict)
+
+    def test_identical_sections_short_circuit_on_hash(self):
+        merged, conflict = mm.merge_sections(
+            mm.Section(level=2, title="A", content="**Do** X then Y.\n"),
+            mm.Section(level=2, title="A", content="Do X then Y.\n"),
+        )
+        self.assertIsNone(conflict)
+        self.assertEqual(merged.merge_status, "kept_existing")
+        self.assertEqual(merged.content, "**Do** X then Y.\n")
+        self.assertEqual((merged.score.tier, merged.score.value), ("hash", 1.0))
+
+
 class TestListMerging(unittest.TestCase):
     def test_merge_lists_dedup(self):
         t = "- a\n- b\n- c"
         e = "- b\n- d"
         out = mm.merge_lists(t, e)
         items = [l[2:] for l in out.splitlines()]
-        self.assertEqual(items, ["a", "b", "c", "d"])
+        # "d" stays after "b", the item it followed in the user's list
+        self.assertEqual(items, ["a", "b", "d", "c"])
+
+    def test_merge_lists_keeps_nesting_and_markers(self):
+        t = "- Setup\n  - install\n  - configure\n- Test\n- Ship"
+        e = "\n* Setup\n    * install\n    * my step\n* Test\n* Mine\n"
+        out = mm.merge_lists(t, e)
+        self.assertEqual(
+            out,
+            "\n* Setup\n    * install\n    * my step\n    * configure\n"
+            "* Test\n* Mine\n* Ship\n",
+        )
+
+    def test_merge_lists_renumbers_ordered(self):
+        t = "1. one\n2. two\n3. three"
+        e = "1. one\n2. mine\n3. three"
+        out = mm.merge_lists(t, e)
+        self.assertEqual(out, "1. one\n2. mine\n3. two\n4. three")
+
+    def test_merge_lists_identity(self):
+        text = "Intro:\n\n- a\n  more about a\n- b\n  1. x\n  1. y\n\n"
+        self.assertEqual(mm.merge_lists(text, text), text)
 
     def test_is_list_block(self):
         self.assertTrue(mm.is_list_block("- one\n- two\n- three"))
@@ -122,6 +263,60 @@ class TestTableMerging(unittest.TestCase):
         self.assertIsNone(merged)
         self.assertEqual(conflict, "table_headers_differ")
 
+    def test_user_edited_row_wins(self):
+        t = "| Tool | Use |\n| --- | --- |\n| git | vcs |\n| make | build |\n| npm | deps |"
+        e = "| Tool | Use |\n| --- | --- |\n| git | version control |\n| mine | custom |\n| npm | deps |"
+        merged, conflict = mm.merge_tables(t, e)
+        self.assertIsNone(conflict)
+        self.assertEqual(merged.splitlines()[2:], [
+            "| git | version control |",
+            "| mine | custom |",
+            "| make | build |",
+            "| npm | deps |",
+        ])
+
+    def test_header_superset_reconciled_by_name(self):
+        t = "| Name | Owner | Notes |\n| --- | --- | --- |\n| api | core | v2 |\n| web | ui | new |"
+        e = "| Owner | Name |\n| --- | --- |\n| platform | api |"
+        merged, conflict = mm.merge_tables(t, e)
+        self.assertIsNone(conflict)
+        self.assertEqual(merged.splitlines(), [
+            "| Name | Owner | Notes |",
+            "| --- | --- | --- |",
+            "| api | platform | v2 |",
+            "| web | ui | new |",
+        ])
+
+    def test_configured_key_column(self):
+        t = "| Step | Cmd |\n| --- | --- |\n| 1 | lint |\n| 2 | test |"
+        e = "| Step | Cmd |\n| --- | --- |\n| 9 | test |"
+        merged, _ = mm.merge_tables(t, e, key="cmd")
+        self.assertEqual(merged.splitlines()[2:], ["| 1 | lint |", "| 9 | test |"])
+        merged, _ = mm.merge_tables(t, e)
+        self.assertEqual(len(merged.splitlines()), 5)
+
+    def test_repeated_keys_keep_every_row(self):
+        t = "| Tool | Use |\n| --- | --- |\n| npm | install deps |\n| npm | run tests |\n| git | vcs |"
+        e = "| Tool | Use |\n| --- | --- |\n| make | build all |\n| make | clean up |\n| git | vcs |"
+        merged, conflict = mm.merge_tables(t, e)
+        self.assertIsNone(conflict)
+        self.assertEqual(merged.splitlines()[2:], [
+            "| make | build all |",
+            "| make | clean up |",
+            "| npm | install deps |",
+            "| npm | run tests |",
+            "| git | vcs |",
+        ])
+        # A repeat on one side only still falls back to whole-row matching.
+        e = "| Tool | Use |\n| --- | --- |\n| npm | run tests |\n| git | version control |"
+        merged, _ = mm.merge_tables(t, e)
+        self.assertEqual(merged.splitlines()[2:], [
+            "| npm | install deps |",
+            "| npm | run tests |",
+            "| git | version control |",
+            "| git | vcs |",
+        ])
+
 
 class TestMergeFiles(unittest.TestCase):
     def test_identical_files(self):
@@ -213,6 +408,615 @@ class TestMergeFiles(unittest.TestCase):
         self.assertIn("new section", merged)
 
 
+class TestRenamedSections(unittest.TestCase):
+    BODY = "Commit after every logical step. Never push to main. Use conventional commits."
+
+    def test_renamed_section_is_matched(self):
+        existing = f"# T\n\n## Commit Policy\n\n{self.BODY}\n\n## Custom\n\nmine\n"
+        template = f"# T\n\n## Commit Rules\n\n{self.BODY} Sign your commits.\n"
+        plan = mm.plan_merge(mm.ParsedDocument.parse(existing), mm.ParsedDocument.parse(template))
+        merged = plan.render()
+        # One section, not an `added` copy next to a `kept_custom` one.
+        self.assertEqual(merged.count(self.BODY), 1)
+        self.assertEqual(merged.count("## Commit"), 1)
+        (renamed,) = [d for d in plan.decisions if d.match_confidence is not None]
+        self.assertEqual((renamed.existing_index, renamed.template_index), (0, 0))
+        self.assertGreaterEqual(renamed.match_confidence, mm.FUZZY_MATCH_MIN)
+        self.assertIn("match confidence", mm.render_proposal(plan, "e.md", "t.md"))
+        entry = mm.proposal_to_json(plan, "e.md", "t.md")["sections"][0]
+        self.assertEqual(entry["match"]["kind"], "fuzzy")
+
+    def test_similar_titles_with_different_content_stay_apart(self):
+        existing = "## Testing\n\nRun pytest before commit\n"
+        template = "## Testing Strategy\n\nUnit tests for everything, integration for IO\n"
+        plan = mm.plan_merge(mm.ParsedDocument.parse(existing), mm.ParsedDocument.parse(template))
+        self.assertEqual(sorted(d.status for d in plan.decisions), ["added", "kept_custom"])
+
+    def test_matching_is_one_to_one(self):
+        sec = lambda title, body: mm.NormalizedSection(mm.Section(level=2, title=title, content=body))  # noqa: E731
+        existing = [sec("Commit Policy", self.BODY)]
+        template = [sec("Commit Rules", self.BODY + " extra"), sec("Commit Rule", self.BODY)]
+        matches = mm.match_renamed(existing, template)
+        self.assertEqual(list(matches), [1])
+        self.assertEqual(matches[1][0], 0)
+
+    def test_three_way_rename_takes_new_title(self):
+        base = f"## Commit Policy\n\n{self.BODY}\n"
+        template = f"## Commit Rules\n\n{self.BODY}\n"
+        plan = mm.plan_merge3(*(mm.ParsedDocument.parse(t) for t in (base, base, template)))
+        self.assertEqual(plan.render(), f"## Commit Rules\n\n{self.BODY}\n")
+
+
+class TestSubtreeMerge(unittest.TestCase):
+    @staticmethod
+    def h2(*subsections: str, intro: str = "intro text") -> mm.Section:
+        _, _, h2 = mm.parse_md("## A\n\n" + intro + "\n\n" + "\n\n".join(subsections) + "\n")
+        return h2[0]
+
+    def test_unchanged_subtrees_kept_verbatim(self):
+        existing = self.h2("### One\n\n*mine*  ", "### Mine\n\nlocal", "### Two\n\nsame")
+        template = self.h2("### One\n\nmine", "### Two\n\nsame", "### New\n\nupstream")
+        merged, conflict = mm.merge_sections(existing, template)
+        self.assertIsNone(conflict)
+        self.assertEqual(merged.merge_status, "merged")
+        self.assertEqual(
+            merged.content,
+            "\nintro text\n\n### One\n\n*mine*  \n\n### Mine\n\nlocal\n\n### Two\n\nsame\n\n"
+            "### New\n\nupstream",
+        )
+        self.assertEqual(merged.score.tier, "hash")
+        self.assertNotIn("merged from framework template", merged.content)
+
+    def test_identical_children_keep_existing(self):
+        existing = self.h2("### One\n\n#### Deep\n\n**x**", "### Two\n\ny")
+        template = self.h2("### One\n\n#### Deep\n\nx", "### Two\n\ny")
+        merged, conflict = mm.merge_sections(existing, template)
+        self.assertEqual((merged.merge_status, conflict), ("kept_existing", None))
+        self.assertEqual(merged.content, existing.content)
+
+    def test_one_rewritten_subsection_is_not_a_conflict(self):
+        body = "shared guidance that both sides still agree on"
+        existing = self.h2("### Stack\n\nwe use an entirely different toolchain here", "### Rules\n\n" + body)
+        template = self.h2("### Stack\n\nknowledge tree book chapters fragments", "### Rules\n\n" + body + " now")
+        merged, conflict = mm.merge_sections(existing, template)
+        self.assertIsNone(conflict)
+        self.assertIn("entirely different toolchain", merged.content)
+        self.assertIn("knowledge tree book chapters fragments", merged.content)
+        self.assertEqual(merged.content.count("### Stack"), 1)
+
+    def test_rewritten_subsection_beside_identical_one_keeps_both(self):
+        existing = "# T\n\n## Guide\n\n### Style\n\nsame\n\n### Deploy\n\nzz qq vv.\n"
+        template = "# T\n\n## Guide\n\n### Style\n\nsame\n\n### Deploy\n\nRun scripts/release.sh to ship.\n"
+        merged, conflicts = mm.merge_files(existing, template)
+        self.assertEqual(conflicts, [])
+        self.assertIn("zz qq vv.", merged)
+        self.assertIn("Run scripts/release.sh to ship.", merged)
+        self.assertIn("<!-- merged from framework template -->", merged)
+
+    def test_conflict_names_the_subtree(self):
+        existing = self.h2("### Stack\n\nwe use an entirely different toolchain here", intro="x")
+        template = self.h2("### Stack\n\nknowledge tree book chapters fragments", intro="yy zz")
+        _, conflict = mm.merge_sections(existing, template)
+        self.assertIn('Section "## A" > "### Stack": conflicting content', conflict)
+
+
+class TestMergeThreeWay(unittest.TestCase):
+    BASE = (
+        "# T\n\n## Architecture\n\nknowledge tree book/ chapters/\n\n"
+        "## Rules\n\n- old rule\n\n## Legacy\n\nobsolete\n\n## Notes\n\nn\n\n## Old\n\nold\n"
+    )
+    TEMPLATE = (
+        "# T\n\n## Architecture\n\nknowledge tree book/ chapters/\n\n"
+        "## Rules\n\n- new rule\n\n## Notes\n\nn\n\n## Fresh\n\nnew\n"
+    )
+    EXISTING = (
+        "# Mine\n\n## Architecture\n\ncode project src/ lib/ tests/\n\n"
+        "## Rules\n\n- old rule\n\n## Legacy\n\nobsolete\n\n## Old\n\nold, edited\n\n"
+        "## Custom\n\nmine\n"
+    )
+
+    def plan(self):
+        return mm.plan_merge3(
+            mm.ParsedDocument.parse(self.EXISTING),
+            mm.ParsedDocument.parse(self.BASE),
+            mm.ParsedDocument.parse(self.TEMPLATE),
+        )
+
+    def test_only_changed_sections_are_merged(self):
+        plan = self.plan()
+        by_title = {d.section.title: d for d in plan.decisions}
+        # Framework left it alone: user's rewrite carried over, no scoring,
+        # no false conflict (the two-way merge flags this one).
+        self.assertEqual(by_title["Architecture"].status, "kept_existing")
+        self.assertIsNone(by_title["Architecture"].score)
+        self.assertEqual(plan.conflicts, [])
+        self.assertTrue(mm.merge_files(self.EXISTING, self.TEMPLATE)[1])
+        # User never touched it, framework updated it.
+        self.assertEqual(by_title["Rules"].status, "from_template")
+        self.assertIn("- new rule", by_title["Rules"].section.content)
+        self.assertEqual(by_title["Fresh"].status, "added")
+        self.assertEqual(by_title["Old"].status, "kept_custom")
+        self.assertEqual(by_title["Custom"].status, "kept_custom")
+
+    def test_deletions_are_respected(self):
+        plan = self.plan()
+        dropped = {d.section.title: d.status for d in plan.dropped}
+        self.assertEqual(dropped, {"Legacy": "removed", "Notes": "skipped"})
+        merged = plan.render()
+        self.assertNotIn("## Legacy", merged)
+        self.assertNotIn("## Notes", merged)
+        self.assertEqual(mm.MergeOutcome.from_plan(plan).sections["removed"], 1)
+
+    def test_proposal_round_trip(self):
+        plan = self.plan()
+        proposal = json.loads(json.dumps(mm.proposal_to_json(plan, "e.md", "t.md")))
+        self.assertEqual(len(proposal["dropped"]), 2)
+        self.assertEqual(mm.apply_proposal(proposal, self.EXISTING, self.TEMPLATE), plan.render())
+
+    def test_cli_merge3_and_auto_base(self):
+        e, b, t = write_tmp(self.EXISTING), write_tmp(self.BASE), write_tmp(self.TEMPLATE)
+        try:
+            r = run_cli("merge3", e, b, t)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(r.stdout, self.plan().render())
+            r = run_cli("auto", e, t, "--base", b)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(r.stdout, self.plan().render())
+            # No base yet (installed before merge3): two-way merge.
+            self.assertEqual(run_cli("auto", e, t, "--base", b + ".missing").returncode, 2)
+        finally:
+            for p in (e, b, t):
+                os.unlink(p)
+
+
+class TestTemplateCache(unittest.TestCase):
+    TEMPLATE = (
+        "# T\n\n## Tools\n\n- git\n- make\n\n### Sub\n\nx\n\n"
+        "## Table\n\n| A | B |\n| --- | --- |\n| 1 | 2 |\n\n## Purpose\n\n{{PROJECT_PURPOSE}}\n"
+    )
+    EXISTING = "# Mine\n\n## Tools\n\n- vim\n- git\n\n## Table\n\n| A | B |\n| --- | --- |\n| 3 | 4 |\n"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = mm.MergeCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compiled_template_round_trip(self):
+        first = mm.parse_template(self.TEMPLATE, self.cache)
+        second = mm.parse_template(self.TEMPLATE, mm.MergeCache(self.tmp.name))
+        self.assertEqual(self.cache.misses, {"templates": 1})
+        for a, b in zip(first.sections, second.sections):
+            self.assertEqual(a.section, b.section)
+            self.assertEqual(a.section.subsections, b.section.subsections)
+            self.assertEqual(
+                (a.norm_title, a.norm_content, a.content_hash, a.list_items, a.table, a.is_placeholder),
+                (b.norm_title, b.norm_content, b.content_hash, b.list_items, b.table, b.is_placeholder),
+            )
+        self.assertEqual(first.preamble, second.preamble)
+        existing = mm.ParsedDocument.parse(self.EXISTING)
+        self.assertEqual(
+            mm.plan_merge(existing, second).render(),
+            mm.merge_files(self.EXISTING, self.TEMPLATE)[0],
+        )
+
+    def test_cache_hit_and_invalidation(self):
+        mm.parse_template(self.TEMPLATE, self.cache)
+        mm.parse_template(self.TEMPLATE, self.cache)
+        self.assertEqual(self.cache.hits, {"templates": 1})
+        mm.parse_template(self.TEMPLATE + "\n## New\n\ny\n", self.cache)
+        self.assertEqual(self.cache.misses, {"templates": 2})
+        old_version = mm.MERGER_VERSION
+        mm.MERGER_VERSION = old_version + "-test"
+        try:
+            mm.parse_template(self.TEMPLATE, self.cache)
+        finally:
+            mm.MERGER_VERSION = old_version
+        self.assertEqual(self.cache.misses, {"templates": 3})
+
+    def test_corrupt_entry_is_a_miss(self):
+        mm.parse_template(self.TEMPLATE, self.cache)
+        (entry,) = (Path(self.tmp.name) / "templates").iterdir()
+        entry.write_text("{not json", "utf-8")
+        doc = mm.parse_template(self.TEMPLATE, self.cache)
+        self.assertEqual(len(doc.sections), 3)
+        self.assertEqual(self.cache.misses, {"templates": 2})
+
+
+class TestResultCache(unittest.TestCase):
+    EXISTING = "# Mine\n\n## A\n\nbody\n\n## Custom\n\nmine\n"
+    TEMPLATE = "# T\n\n## A\n\nbody\n\n## B\n\nx\n"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rerun_is_served_from_cache(self):
+        cache = mm.MergeCache(self.tmp.name)
+        first = mm.merge_outcome(self.EXISTING, self.TEMPLATE, cache)
+        self.assertFalse(first.cached)
+        cache = mm.MergeCache(self.tmp.name)
+        second = mm.merge_outcome(self.EXISTING, self.TEMPLATE, cache)
+        self.assertTrue(second.cached)
+        self.assertEqual(cache.stats(), {"hits": {"results": 1}, "misses": {}})
+        self.assertEqual(second.merged, mm.merge_files(self.EXISTING, self.TEMPLATE)[0])
+        self.assertEqual(second.sections, first.sections)
+
+    def test_changed_input_or_version_misses(self):
+        cache = mm.MergeCache(self.tmp.name)
+        mm.merge_outcome(self.EXISTING, self.TEMPLATE, cache)
+        self.assertFalse(mm.merge_outcome(self.EXISTING + "\nmore\n", self.TEMPLATE, cache).cached)
+        old_version = mm.MERGER_VERSION
+        mm.MERGER_VERSION = old_version + "-test"
+        try:
+            self.assertFalse(mm.merge_outcome(self.EXISTING, self.TEMPLATE, cache).cached)
+        finally:
+            mm.MERGER_VERSION = old_version
+        self.assertEqual(cache.misses["results"], 3)
+
+    def test_failed_write_leaves_no_temp_file(self):
+        cache = mm.MergeCache(self.tmp.name)
+        with mock.patch.object(mm.os, "replace", side_effect=OSError("disk full")):
+            mm.merge_outcome(self.EXISTING, self.TEMPLATE, cache)
+        self.assertEqual(list((Path(self.tmp.name) / "results").iterdir()), [])
+
+    def test_cli_auto_reports_cache(self):
+        e = write_tmp("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n")
+        t = write_tmp("# T\n\n## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n")
+        conflicts, proposal = e + ".conflicts.json", e + ".proposal.md"
+        args = ("auto", e, t, "--conflicts", conflicts, "--proposal", proposal, "--cache", self.tmp.name)
+        try:
+            self.assertEqual(run_cli(*args).returncode, 2)
+            os.unlink(proposal)
+            r = run_cli(*args)
+            self.assertEqual(r.returncode, 2)
+            self.assertIn("merge cache: results: 1 hit, 0 miss", r.stderr)
+            report = json.loads(Path(conflicts).read_text("utf-8"))
+            self.assertEqual(report["cache"]["hits"], {"results": 1})
+            # A cached conflict still gets its proposal.
+            self.assertIn("Merge Proposal", Path(proposal).read_text("utf-8"))
+        finally:
+            for p in (e, t, conflicts, proposal):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        (self.dir / "tpl.md").write_text("# T\n\n## A\n\nbody\n\n## B\n\nx\n", "utf-8")
+        (self.dir / "tpl2.md").write_text("# T\n\n## Архитектура\n\nbook/ chapters/ fragments/\n", "utf-8")
+        self.entries = []
+        for i in range(6):
+            existing = self.dir / f"e{i}.md"
+            existing.write_text(f"# T\n\n## A\n\nbody\n\n## Custom {i}\n\nmine\n", "utf-8")
+            self.entries.append({
+                "existing": str(existing),
+                "template": str(self.dir / "tpl.md"),
+                "output": str(self.dir / f"out{i}.md"),
+            })
+        conflict = self.dir / "conflict.md"
+        conflict.write_text("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n", "utf-8")
+        self.entries.append({"existing": str(conflict), "template": str(self.dir / "tpl2.md")})
+        self.entries.append({"existing": str(self.dir / "missing.md"), "template": str(self.dir / "tpl.md")})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_merge_many_serial_and_parallel_agree(self):
+        serial = list(mm.merge_many(self.entries, jobs=1))
+        parallel = list(mm.merge_many(self.entries, jobs=3, chunksize=2))
+        # The second run finds every output up to date and writes nothing.
+        self.assertEqual([r.pop("written", None) for r in serial], [True] * 6 + [None] * 2)
+        self.assertEqual([r.pop("written", None) for r in parallel], [False] * 6 + [None] * 2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual([r["index"] for r in parallel], list(range(len(self.entries))))
+        self.assertEqual(
+            [r["status"] for r in parallel],
+            ["merged"] * 6 + ["conflict", "error"],
+        )
+        self.assertEqual(parallel[0]["sections"], {"kept_existing": 1, "added": 1, "kept_custom": 1})
+        self.assertIn("## Custom 3", (self.dir / "out3.md").read_text("utf-8"))
+
+    def test_cli_batch(self):
+        manifest = self.dir / "manifest.jsonl"
+        manifest.write_text("\n".join(json.dumps(e) for e in self.entries[:6]) + "\n", "utf-8")
+        r = run_cli("batch", str(manifest), "--jobs", "2")
+        self.assertEqual(r.returncode, 0, msg=r.stderr)
+        results = [json.loads(line) for line in r.stdout.splitlines()]
+        self.assertEqual([res["index"] for res in results], list(range(6)))
+
+        manifest.write_text("\n".join(json.dumps(e) for e in self.entries[:7]) + "\n", "utf-8")
+        self.assertEqual(run_cli("batch", str(manifest)).returncode, 2)
+
+    def test_batch_result_cache(self):
+        cache_dir = str(self.dir / "cache")
+        first = list(mm.merge_many(self.entries, cache_dir=cache_dir))
+        second = list(mm.merge_many(self.entries, jobs=2, cache_dir=cache_dir))
+        self.assertEqual([r.get("cache") for r in first], ["miss"] * 7 + [None])
+        self.assertEqual([r.get("cache") for r in second], ["hit"] * 7 + [None])
+        for a, b in zip(first, second):
+            a.pop("cache", None), b.pop("cache", None)
+            a.pop("written", None), b.pop("written", None)
+            self.assertEqual(a, b)
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sub", "out.md")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_creates_and_skips_identical(self):
+        self.assertTrue(mm.write_atomic(self.path, ["# T\n", "\n## A\n"]))
+        before = os.stat(self.path)
+        self.assertFalse(mm.write_atomic(self.path, ["# T\n\n", "## A\n"]))
+        after = os.stat(self.path)
+        self.assertEqual((before.st_ino, before.st_mtime_ns), (after.st_ino, after.st_mtime_ns))
+
+    def test_replaces_changed_keeping_mode(self):
+        mm.write_atomic(self.path, ["abc", "def"])
+        os.chmod(self.path, 0o640)
+        for chunks, expected in (
+            (["abc", "dXf", "ghi"], "abcdXfghi"),  # differs mid-stream
+            (["abc"], "abc"),  # existing file is longer
+            (["abc", "d"], "abcd"),  # existing file is shorter
+        ):
+            self.assertTrue(mm.write_atomic(self.path, chunks))
+            self.assertEqual(Path(self.path).read_text("utf-8"), expected)
+            self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["out.md"])
+
+    def test_cli_merge_output(self):
+        e = write_tmp("# T\n\n## A\n\nbody\n")
+        t = write_tmp("# T\n\n## A\n\nbody\n\n## B\n\nx\n")
+        try:
+            r = run_cli("merge", e, t, "--output", self.path)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(r.stdout, "")
+            self.assertEqual(Path(self.path).read_text("utf-8"), mm.merge_files(
+                Path(e).read_text("utf-8"), Path(t).read_text("utf-8"))[0])
+            mtime = os.stat(self.path).st_mtime_ns
+            self.assertEqual(run_cli("merge", e, t, "--output", self.path).returncode, 0)
+            self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+        finally:
+            os.unlink(e)
+            os.unlink(t)
+
+
+class TestPatch(unittest.TestCase):
+    EXISTING = "# T\n\n## A\n\nbody\n\n## Tools\n\n- git\n- mine\n\n## Custom\n\nmine\n"
+    TEMPLATE = "# T\n\n## A\n\nbody\n\n## Tools\n\n- git\n- make\n\n## New\n\nx\n"
+
+    def test_patch_round_trip(self):
+        merged = mm.merge_files(self.EXISTING, self.TEMPLATE)[0]
+        patch = mm.make_patch(self.EXISTING, merged)
+        self.assertTrue(patch.startswith("--- a/CLAUDE.md\n+++ b/CLAUDE.md\n@@ "))
+        self.assertNotIn("## A", patch)  # beyond the 3 lines of context
+        self.assertEqual(mm.apply_patch(self.EXISTING, patch), merged)
+        self.assertEqual(mm.make_patch(merged, merged), "")
+
+    def test_missing_final_newline(self):
+        patch = mm.make_patch("a\nb", "a\nc\n")
+        self.assertIn("-b\n\\ No newline at end of file\n+c\n", patch)
+        self.assertEqual(mm.apply_patch("a\nb", patch), "a\nc\n")
+
+    def test_cost_cutoff_replaces_whole_region(self):
+        a = "".join(f"line {i}\n" for i in range(50))
+        b = "".join(f"line {i}\n" if i % 2 else f"edited {i}\n" for i in range(50))
+        self.assertIsNone(mm._myers(a.splitlines(), b.splitlines(), 10))
+        _, _, opcodes = mm.diff_lines(a, b, max_cost=10)
+        self.assertEqual(opcodes, [("replace", 0, 50, 0, 50)])
+        _, _, opcodes = mm.diff_lines(a, b)
+        self.assertEqual(sum(op[0] == "equal" for op in opcodes), 25)
+
+    def test_multi_hunk_patch_applies_with_git(self):
+        # An edit inside a section sits next to whole equal sections; the
+        # equal runs must merge, or a context-only hunk breaks `git apply`.
+        def doc(*sections):
+            return "".join(f"## S{s}\n" + "".join(f"l{s}-{k}\n" for k in ks) for s, ks in sections)
+
+        a = doc((0, range(12)), (1, range(9)), (2, range(1)), (3, range(4)))
+        b = doc((0, [0, *range(2, 12)]), (1, range(9)), (2, range(1)), (3, [0, 1, 3]))
+        patch = mm.make_patch(a, b, "f.md")
+        hunks = patch.split("\n@@ ")[1:]
+        self.assertEqual(len(hunks), 2)
+        for hunk in hunks:
+            self.assertTrue(any(line[:1] in "+-" for line in hunk.splitlines()[1:]), msg=hunk)
+        self.assertEqual(mm.apply_patch(a, patch), b)
+        if shutil.which("git") is None:
+            self.skipTest("git not installed")
+        with tempfile.TemporaryDirectory() as d:
+            Path(d, "f.md").write_text(a, encoding="utf-8")
+            Path(d, "p.patch").write_text(patch, encoding="utf-8")
+            r = subprocess.run(["git", "apply", "--check", "p.patch"], cwd=d, capture_output=True, text=True)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+
+    def test_stale_patch_rejected(self):
+        patch = mm.make_patch("a\nb\nc\n", "a\nB\nc\n")
+        with self.assertRaises(mm.PatchError):
+            mm.apply_patch("a\nx\nc\n", patch)
+
+    def test_cli_merge_patch_and_apply(self):
+        e = write_tmp(self.EXISTING)
+        t = write_tmp(self.TEMPLATE)
+        patch = e + ".patch"
+        try:
+            r = run_cli("merge", e, t, "--patch", "--output", patch)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertIn(f"+++ {e}\n", Path(patch).read_text("utf-8"))
+            r = run_cli("apply-patch", e, patch)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(Path(e).read_text("utf-8"), mm.merge_files(self.EXISTING, self.TEMPLATE)[0])
+            self.assertEqual(run_cli("apply-patch", e, patch).returncode, 1)
+        finally:
+            for p in (e, t, patch):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+
+class TestConflictDiff(unittest.TestCase):
+    EXISTING = "# T\n\n## Rules\n\nAlways run the tests.\nUse ```bash``` fences.\n\n## Other\n\nx\n"
+    TEMPLATE = "# T\n\n## Rules\n\nNever push to main directly.\nReview each diff twice.\n\n## Other\n\nx\n"
+
+    def plan(self):
+        return mm.plan_merge(mm.ParsedDocument.parse(self.EXISTING), mm.ParsedDocument.parse(self.TEMPLATE))
+
+    def test_proposal_shows_diff(self):
+        report = mm.render_proposal(self.plan(), "e.md", "t.md")
+        self.assertIn("````diff\n--- yours\n+++ template\n", report)
+        self.assertIn("-Always run the tests.\n", report)
+        self.assertIn("+Review each diff twice.\n", report)
+        self.assertNotIn("(excerpt)", report)
+
+    def test_cost_cap_falls_back_to_excerpts(self):
+        self.assertIsNone(mm.section_diff("a\nb\nc\n", "x\ny\nz\n", max_cost=2))
+        self.assertIsNotNone(mm.section_diff("a\nb\nc\n", "a\ny\nc\n", max_cost=2))
+        with mock.patch.object(mm, "PROPOSAL_DIFF_MAX_LINES", 4):
+            report = mm.render_proposal(self.plan(), "e.md", "t.md")
+            entry = mm.proposal_to_json(self.plan(), "e.md", "t.md")["sections"][0]
+        self.assertIn("**Your version (excerpt):**", report)
+        self.assertNotIn("```diff", report)
+        self.assertIsNone(entry["diff"])
+
+
+class TestOverlay(unittest.TestCase):
+    EXISTING = "# Mine\n\n## A\n\nold a\n\n## Custom\n\nmine\n"
+    BASE = "# Base\n\n## A\n\nold a\n\n## B\n\nb1\n\n## C\n\nc1\n"
+    ADDENDUM = "## B\n\nb2 from the addendum\n\n## B2\n\nnew after b\n"
+
+    def overlay(self, *layers):
+        return mm.plan_overlay(
+            mm.ParsedDocument.parse(self.EXISTING), [mm.ParsedDocument.parse(t) for t in layers]
+        )
+
+    def test_later_layer_wins_in_place(self):
+        overlay = self.overlay(self.BASE, self.ADDENDUM)
+        merged = overlay.plan.render()
+        self.assertNotIn("b1", merged)
+        titles = [line for line in merged.splitlines() if line.startswith("## ")]
+        self.assertEqual(titles, ["## A", "## B", "## B2", "## C", "## Custom"])
+        self.assertEqual(
+            [(p["title"], p["layer"], p["shadowed"]) for p in overlay.provenance()],
+            [("A", 0, []), ("B", 1, [0]), ("B2", 1, []), ("C", 0, []), ("Custom", None, [])],
+        )
+
+    def test_single_layer_is_plain_merge(self):
+        self.assertEqual(
+            self.overlay(self.BASE).plan.render(), mm.merge_files(self.EXISTING, self.BASE)[0]
+        )
+
+    def test_cli_overlay(self):
+        e, base, add = write_tmp(self.EXISTING), write_tmp(self.BASE), write_tmp(self.ADDENDUM)
+        provenance = e + ".provenance.json"
+        try:
+            r = run_cli("overlay", e, base, add, "--provenance", provenance)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(r.stdout, self.overlay(self.BASE, self.ADDENDUM).plan.render())
+            report = json.loads(Path(provenance).read_text("utf-8"))
+            self.assertEqual(report["layers"], [base, add])
+            self.assertEqual(report["sections"][1]["shadowed"], [0])
+            self.assertEqual(run_cli("overlay", e, base).returncode, 0)
+            self.assertEqual(run_cli("overlay", e).returncode, 1)
+        finally:
+            for p in (e, base, add, provenance):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+
+class TestProfile(unittest.TestCase):
+    EXISTING = "# T\n\n## A\n\nbody\n\n## Tools\n\n- git\n- mine\n\n## Custom\n\nmine\n"
+    TEMPLATE = "# T\n\n## A\n\nbody\n\n## Tools\n\n- git\n- make\n\n## New\n\nx\n"
+
+    def test_merge_outcome_profile(self):
+        outcome = mm.merge_outcome(self.EXISTING, self.TEMPLATE, profile=True)
+        report = outcome.profile
+        self.assertEqual(set(report["phases_ns"]), set(mm.PROFILE_PHASES) | {"other"})
+        self.assertEqual(sum(report["phases_ns"].values()), report["total_ns"])
+        self.assertGreater(report["phases_ns"]["list_table"], 0)
+        self.assertEqual(report["sections"]["count"], 2)
+        self.assertEqual(report["sections"]["tiers"], {"hash": 1, "exact": 1})
+        self.assertEqual({s["title"] for s in report["sections"]["top"]}, {"A", "Tools"})
+        self.assertIsNone(mm.merge_outcome(self.EXISTING, self.TEMPLATE).profile)
+
+    def test_profiling_nests_exclusively(self):
+        with mm.profiling() as outer:
+            mm.merge_files(self.EXISTING, self.TEMPLATE)
+            with mm.profiling() as inner:
+                mm.merge_files(self.EXISTING, self.TEMPLATE)
+        self.assertEqual(len(outer.sections), 2)
+        self.assertEqual(len(inner.sections), 2)
+        self.assertIs(mm._PROFILE[0], None)
+
+    def test_cli_profile(self):
+        e, t = write_tmp(self.EXISTING), write_tmp(self.TEMPLATE)
+        try:
+            for cmd in ("merge", "check", "propose"):
+                r = run_cli(cmd, e, t, "--profile", "--profile-top", "1")
+                self.assertEqual(r.returncode, 0, msg=r.stderr)
+                report = json.loads(r.stderr.splitlines()[-1])
+                self.assertEqual(report["command"], cmd)
+                self.assertGreater(report["phases_ns"]["read"], 0)
+                self.assertEqual(len(report["sections"]["top"]), 1)
+        finally:
+            os.unlink(e)
+            os.unlink(t)
+
+
+class TestParallel(unittest.TestCase):
+    def make_pair(self):
+        sections_e, sections_t = [], []
+        for i in range(12):
+            body = "\n".join(f"- item {i} {j}" for j in range(20))
+            sections_t.append(f"## List {i}\n\n{body}\n- new {i}\n")
+            sections_e.append(f"## List {i}\n\n{body}\n- mine {i}\n")
+            sections_t.append(f"## Same {i}\n\nunchanged {i}\n")
+            sections_e.append(f"## Same {i}\n\nunchanged {i}\n")
+        sections_t.append("## Clash\n\nframework words entirely\n")
+        sections_e.append("## Clash\n\nsomething the user wrote instead\n")
+        return ("# T\n\n" + "\n".join(sections_e), "# T\n\n" + "\n".join(sections_t))
+
+    def test_pool_matches_serial(self):
+        existing, template = self.make_pair()
+        serial = mm.plan_for(existing, template)
+        with mock.patch.object(mm, "PARALLEL_MIN_COST", 0), \
+                mock.patch.object(mm.os, "cpu_count", return_value=4):
+            parallel = mm.plan_for(existing, template, jobs=3)
+            parallel3 = mm.plan_for(existing, template, base_text=template.replace("new", "old"), jobs=3)
+        self.assertEqual(parallel.render(), serial.render())
+        self.assertEqual(parallel.conflicts, serial.conflicts)
+        self.assertEqual(len(parallel.conflicts), 1)
+        self.assertEqual(
+            [(d.status, d.existing_index, d.template_index) for d in parallel.decisions],
+            [(d.status, d.existing_index, d.template_index) for d in serial.decisions],
+        )
+        serial3 = mm.plan_for(existing, template, base_text=template.replace("new", "old"))
+        self.assertEqual(parallel3.render(), serial3.render())
+
+    def test_cost_chunks(self):
+        chunks = mm._cost_chunks([5, 1, 1, 1, 1, 1, 10], 4)
+        self.assertEqual(sum(chunks, []), list(range(7)))
+        self.assertEqual(chunks, [[0], [1, 2, 3, 4, 5], [6]])
+
+    def test_cli_jobs(self):
+        e, t = write_tmp(TestProfile.EXISTING), write_tmp(TestProfile.TEMPLATE)
+        try:
+            serial = run_cli("merge", e, t)
+            parallel = run_cli("merge", e, t, "--jobs", "4")
+            self.assertEqual(parallel.returncode, 0, msg=parallel.stderr)
+            self.assertEqual(parallel.stdout, serial.stdout)
+            self.assertEqual(run_cli("merge", e, t, "--jobs", "0").returncode, 1)
+        finally:
+            os.unlink(e)
+            os.unlink(t)
+
+
 class TestCLI(unittest.TestCase):
     def test_cli_merge_clean(self):
         e = write_tmp("# T\n\n## A\n\nbody\n")
@@ -261,6 +1065,141 @@ class TestCLI(unittest.TestCase):
             os.unlink(e)
             os.unlink(t)
 
+    def test_cli_propose_json_and_apply(self):
+        e = write_tmp("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n\n## Custom\n\nmine\n")
+        t = write_tmp(
+            "# T\n\n## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n\n## New\n\nx\n"
+        )
+        j = e + ".proposal.json"
+        try:
+            r = run_cli("propose", e, t, "--json", j)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            with open(j, encoding="utf-8") as f:
+                proposal = json.load(f)
+            self.assertEqual(proposal["existing"]["sha256"], mm._sha256(Path(e).read_text("utf-8")))
+            conflict = proposal["sections"][0]
+            self.assertEqual(conflict["resolution"], "rename_existing_to_legacy")
+            self.assertEqual(conflict["similarity"]["band"], "conflict")
+            self.assertIn("+knowledge tree book/ chapters/ fragments/\n", conflict["diff"])
+
+            r = run_cli("apply-proposal", e, j)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(
+                r.stdout,
+                "# T\n\n"
+                "## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n\n"
+                "## Архитектура (legacy)\n\ncode project src/ lib/ tests/\n\n"
+                "## New\n\nx\n\n"
+                "## Custom\n\nmine\n",
+            )
+
+            conflict["resolution"] = "keep_existing"
+            with open(j, "w", encoding="utf-8") as f:
+                json.dump(proposal, f)
+            r = run_cli("apply-proposal", e, j[: -len(".json")] + ".md")
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertNotIn("(legacy)", r.stdout)
+            self.assertIn("code project", r.stdout)
+        finally:
+            for p in (e, t, j):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    def test_cli_apply_proposal_after_template_is_gone(self):
+        # Installers build the proposal from a template in a temp dir that
+        # is deleted on exit; applying it later must not need that file.
+        e = write_tmp("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n\n## Custom\n\nmine\n")
+        t = write_tmp(
+            "# T\n\n## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n\n## New\n\nx\n"
+        )
+        j = e + ".proposal.json"
+        try:
+            r = run_cli("auto", e, t, "--proposal-json", j)
+            self.assertEqual(r.returncode, 2, msg=r.stderr)
+            os.unlink(t)
+            r = run_cli("apply-proposal", e, j)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertIn("## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n", r.stdout)
+            self.assertIn("## Архитектура (legacy)\n\ncode project", r.stdout)
+            self.assertIn("## New\n\nx\n", r.stdout)
+        finally:
+            for p in (e, t, j):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    def test_proposal_embeds_template_preamble(self):
+        existing, template = "## A\n\nmine\n", "# T\n\nintro\n\n## A\n\nmine\n"
+        plan = mm.plan_merge(mm.ParsedDocument.parse(existing), mm.ParsedDocument.parse(template))
+        proposal = json.loads(json.dumps(mm.proposal_to_json(plan, "e.md", "t.md")))
+        self.assertEqual(proposal["preamble"]["source"], "template")
+        self.assertIn("intro", plan.render())
+        self.assertEqual(mm.apply_proposal(proposal, existing, None), plan.render())
+
+    def test_cli_propose_format_json(self):
+        e = write_tmp("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n")
+        t = write_tmp("# T\n\n## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n")
+        try:
+            r = run_cli("propose", e, t, "--format", "json")
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            proposal = json.loads(r.stdout)
+            self.assertEqual(proposal["format"], mm.PROPOSAL_FORMAT)
+            self.assertEqual(proposal["sections"][0]["status"], "kept_existing")
+            self.assertEqual(run_cli("propose", e, t, "--format", "xml").returncode, 1)
+        finally:
+            os.unlink(e)
+            os.unlink(t)
+
+    def test_cli_apply_proposal_rejects_stale_input(self):
+        e = write_tmp("# T\n\n## A\n\nbody\n")
+        t = write_tmp("# T\n\n## A\n\nbody\n\n## B\n\nx\n")
+        j = e + ".proposal.json"
+        try:
+            self.assertEqual(run_cli("propose", e, t, "--json", j).returncode, 0)
+            with open(e, "a", encoding="utf-8") as f:
+                f.write("\nedited after propose\n")
+            r = run_cli("apply-proposal", e, j)
+            self.assertEqual(r.returncode, 1)
+            self.assertIn("changed", r.stderr)
+        finally:
+            for p in (e, t, j):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    def test_cli_auto_clean(self):
+        e = write_tmp("# T\n\n## A\n\nbody\n")
+        t = write_tmp("# T\n\n## A\n\nbody\n\n## B\n\nx\n")
+        out, conflicts, proposal = e + ".merged", e + ".conflicts.json", e + ".proposal.md"
+        try:
+            r = run_cli("auto", e, t, "--output", out, "--conflicts", conflicts, "--proposal", proposal)
+            self.assertEqual(r.returncode, 0, msg=r.stderr)
+            self.assertEqual(Path(out).read_text("utf-8"), mm.merge_files(
+                Path(e).read_text("utf-8"), Path(t).read_text("utf-8"))[0])
+            report = json.loads(Path(conflicts).read_text("utf-8"))
+            self.assertEqual(report["status"], "merged")
+            self.assertEqual(report["sections"], {"kept_existing": 1, "added": 1})
+            self.assertFalse(os.path.exists(proposal))
+        finally:
+            for p in (e, t, out, conflicts, proposal):
+                if os.path.exists(p):
+                    os.unlink(p)
+
+    def test_cli_auto_conflict(self):
+        e = write_tmp("# T\n\n## Архитектура\n\ncode project src/ lib/ tests/\n")
+        t = write_tmp("# T\n\n## Архитектура\n\nknowledge tree book/ chapters/ fragments/\n")
+        out, proposal, proposal_json = e + ".merged", e + ".proposal.md", e + ".proposal.json"
+        try:
+            r = run_cli("auto", e, t, "--output", out, "--proposal", proposal,
+                        "--proposal-json", proposal_json)
+            self.assertEqual(r.returncode, 2)
+            self.assertIn("Архитектура", r.stderr)
+            self.assertFalse(os.path.exists(out))
+            self.assertIn("Merge Proposal", Path(proposal).read_text("utf-8"))
+            self.assertEqual(run_cli("apply-proposal", e, proposal).returncode, 0)
+        finally:
+            for p in (e, t, out, proposal, proposal_json):
+                if os.path.exists(p):
+                    os.unlink(p)
+
     def test_cli_missing_file(self):
         r = run_cli("merge", "/no/such/file.md", "/also/missing.md")
         self.assertEqual(r.returncode, 1)